@@ -0,0 +1,243 @@
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.conf import settings
+
+from survey import catalog, changes, versioning
+from survey.filters import EXPERIENCE_FIELDS
+from survey.models import SurveyChange, SurveyResult
+
+# 설문 교차 집계 (GET /api/v1/survey/crosstab/)
+# 집계에 쓰는 컬럼만 NumPy 배열 (설문 하나에 약 30 byte) 로 메모리에 올려두고, group by 는 np.bincount 로 한 번에 계산합니다.
+# 문자열 컬럼 (major, grade) 은 정수 코드로 바꿔 두고, OS 는 os_id 를 그대로 씁니다. (이름은 survey.catalog 에서)
+# 설문이 바뀌면 (SURVEY 버전이 바뀌면) 스냅샷의 seq 뒤의 변경 기록 (SurveyChange, survey.changes) 에 나온 설문만 다시 읽습니다.
+CATEGORICAL_DIMENSIONS = ('major', 'grade')
+COLUMNS = ('id', 'timestamp', 'os_id', *EXPERIENCE_FIELDS, *CATEGORICAL_DIMENSIONS)
+LOAD_CHUNK_SIZE = 10000
+WEEK_SECONDS = 7 * 24 * 3600
+# 1970-01-01 은 목요일이므로, 주의 시작 (월요일) 에 맞추려면 3일을 더합니다.
+WEEK_OFFSET = 3 * 24 * 3600
+
+
+class Snapshot:
+    """Column arrays of every SurveyResult, in id order."""
+
+    def __init__(self):
+        self.ids = np.empty(0, np.int64)
+        self.timestamps = np.empty(0, np.int64)  # epoch seconds
+        self.os = np.empty(0, np.int32)  # os_id, OS 가 없으면 -1
+        self.experience = {field: np.empty(0, np.int8) for field in EXPERIENCE_FIELDS}
+        self.codes = {dimension: np.empty(0, np.int32) for dimension in CATEGORICAL_DIMENSIONS}
+        self.categories = {dimension: {} for dimension in CATEGORICAL_DIMENSIONS}  # 값 -> 코드
+        self.unique = {}
+        self.version = None
+        self.seq = 0  # 반영한 마지막 변경 기록
+        self.built_at = time.monotonic()
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def last_id(self):
+        return int(self.ids[-1]) if len(self.ids) else 0
+
+    def extended(self, rows):
+        """A new Snapshot with `rows` (values_list tuples of COLUMNS) appended; self is left unchanged."""
+        snapshot = Snapshot()
+        snapshot.version, snapshot.seq, snapshot.built_at = self.version, self.seq, self.built_at
+        snapshot.categories = {dimension: dict(values) for dimension, values in self.categories.items()}
+        if not rows:
+            snapshot.__dict__.update(ids=self.ids, timestamps=self.timestamps, os=self.os,
+                                     experience=self.experience, codes=self.codes)
+            return snapshot
+
+        ids, timestamps, os_ids, python, rdb, programming, majors, grades = zip(*rows)
+        snapshot.ids = np.concatenate([self.ids, np.array(ids, np.int64)])
+        timestamps = np.array([int(timestamp.timestamp()) for timestamp in timestamps], np.int64)
+        snapshot.timestamps = np.concatenate([self.timestamps, timestamps])
+        snapshot.os = np.concatenate([self.os, np.array([-1 if pk is None else pk for pk in os_ids], np.int32)])
+        snapshot.experience = {
+            field: np.concatenate([self.experience[field], np.array(values, np.int8)])
+            for field, values in zip(EXPERIENCE_FIELDS, (python, rdb, programming))
+        }
+        snapshot.codes = {}
+        for dimension, values in zip(CATEGORICAL_DIMENSIONS, (majors, grades)):
+            categories = snapshot.categories[dimension]
+            codes = np.array([categories.setdefault(value, len(categories)) for value in values], np.int32)
+            snapshot.codes[dimension] = np.concatenate([self.codes[dimension], codes])
+        return snapshot
+
+    def replaced(self, ids, rows):
+        """A new Snapshot with the surveys `ids` replaced by `rows` (their current values; none if deleted)."""
+        snapshot = self.extended(rows)
+        keep = np.concatenate([~np.isin(self.ids, np.array(list(ids), np.int64)), np.ones(len(rows), bool)])
+        # 바뀐 설문은 id 순서의 중간에 있으므로 다시 id 순으로 정렬합니다.
+        select = np.flatnonzero(keep)
+        select = select[np.argsort(snapshot.ids[select], kind='stable')]
+        snapshot.ids, snapshot.timestamps = snapshot.ids[select], snapshot.timestamps[select]
+        snapshot.os = snapshot.os[select]
+        snapshot.experience = {field: values[select] for field, values in snapshot.experience.items()}
+        snapshot.codes = {dimension: codes[select] for dimension, codes in snapshot.codes.items()}
+        return snapshot
+
+    def load(self):
+        """Read the surveys after last_id, LOAD_CHUNK_SIZE at a time; return the extended Snapshot."""
+        snapshot = self
+        while True:
+            rows = list(SurveyResult.objects.filter(id__gt=snapshot.last_id).order_by('id')
+                        .values_list(*COLUMNS)[:LOAD_CHUNK_SIZE])
+            snapshot = snapshot.extended(rows)
+            if len(rows) < LOAD_CHUNK_SIZE:
+                return snapshot
+
+    def refreshed(self):
+        """
+        A new Snapshot with the changes recorded after self.seq applied, or None if there are too many of them.
+
+        Applying a change re-reads the survey's current row, so applying one twice is harmless; seq only moves up to
+        the first unsettled gap, and changes after it are applied again on the next refresh.
+        """
+        batch = list(SurveyChange.objects.filter(seq__gt=self.seq).order_by('seq')[:LOAD_CHUNK_SIZE])
+        if len(batch) == LOAD_CHUNK_SIZE:
+            return None
+        ids = {change.survey_id for change in batch}
+        rows = list(SurveyResult.objects.filter(id__in=ids).order_by('id').values_list(*COLUMNS)) if ids else []
+        snapshot = self.replaced(ids, rows)
+        settled = changes.settled(self.seq, batch)
+        snapshot.seq = settled[-1].seq if settled else self.seq
+        return snapshot
+
+    def dimension(self, name):
+        """(codes, labels) of a dimension: codes[i] is the index in labels of the i-th survey's value."""
+        if name in CATEGORICAL_DIMENSIONS:
+            labels = [None] * len(self.categories[name])
+            for value, code in self.categories[name].items():
+                labels[code] = value
+            return self.codes[name], labels
+
+        # np.unique 는 정렬하므로, 같은 Snapshot 에서는 한 번만 계산합니다. (Snapshot 의 배열은 바뀌지 않습니다)
+        if name not in self.unique:
+            column = {'os': self.os, 'week': (self.timestamps + WEEK_OFFSET) // WEEK_SECONDS}.get(name)
+            column = self.experience[name] if column is None else column
+            values, codes = np.unique(column, return_inverse=True)
+            self.unique[name] = codes, [int(value) for value in values]
+        codes, values = self.unique[name]
+        if name == 'os':
+            # OS 이름은 바뀔 수 있으므로 매번 catalog 에서 찾습니다.
+            names = {pk: os.name for pk, os in catalog.get_catalog()['by_id'].items()}
+            return codes, [None if pk < 0 else names.get(pk, str(pk)) for pk in values]
+        if name == 'week':
+            return codes, [week_label(week) for week in values]
+        return codes, values
+
+    def mask(self, filters):
+        """Boolean array of the surveys matching survey.filters.SurveyResultFilterSerializer's validated data."""
+        mask = np.ones(len(self), bool)
+        if 'os' in filters:
+            ids = [os.id for os in catalog.list_operating_systems() if os.name in set(filters['os'])]
+            mask &= np.isin(self.os, ids)
+        for dimension in CATEGORICAL_DIMENSIONS:
+            if dimension in filters:
+                codes = [self.categories[dimension][value] for value in filters[dimension]
+                         if value in self.categories[dimension]]
+                mask &= np.isin(self.codes[dimension], codes)
+        for field in EXPERIENCE_FIELDS:
+            if f'{field}_min' in filters:
+                mask &= self.experience[field] >= filters[f'{field}_min']
+            if f'{field}_max' in filters:
+                mask &= self.experience[field] <= filters[f'{field}_max']
+        if 'since' in filters:
+            mask &= self.timestamps >= filters['since'].timestamp()
+        if 'until' in filters:
+            mask &= self.timestamps < filters['until'].timestamp()
+        return mask
+
+
+def week_label(week):
+    # 주의 시작 (월요일, UTC) 날짜
+    start = datetime(1970, 1, 1, tzinfo=dt_timezone.utc) + timedelta(seconds=week * WEEK_SECONDS - WEEK_OFFSET)
+    return start.date().isoformat()
+
+
+def build():
+    snapshot = Snapshot()
+    # 읽기 전에 seq 를 정해 두므로, 읽는 동안 생긴 변경은 다음 refreshed() 에서 (다시) 반영됩니다.
+    snapshot.seq = changes.settled_seq()
+    return snapshot.load()
+
+
+_snapshot = None
+_lock = threading.Lock()
+
+
+def get_snapshot():
+    """The current Snapshot, brought up to date with the changes recorded since it was last read."""
+    global _snapshot
+    version = versioning.get_versions(versioning.SURVEY)[versioning.SURVEY][0]
+    current = _snapshot
+    if current is not None and current.version == version:
+        return current
+    # 읽는 동안에는 lock 을 잡지 않습니다. 여러 요청이 동시에 읽을 수도 있지만, 어느 스냅샷을 써도 됩니다.
+    snapshot = None
+    if current is not None and time.monotonic() - current.built_at <= settings.SURVEY_ANALYTICS_REBUILD_INTERVAL:
+        snapshot = current.refreshed()
+    if snapshot is None:
+        # 처음이거나, 밀린 변경이 너무 많거나, 기록되지 않는 변경 (.update() 등) 을 반영하려고 가끔은 처음부터 다시 읽습니다.
+        snapshot = build()
+    snapshot.version = version
+    with _lock:
+        if _snapshot is current:
+            _snapshot = snapshot
+    return snapshot
+
+
+def clear():
+    global _snapshot
+    with _lock:
+        _snapshot = None
+
+
+def crosstab(rows, columns=None, value=None, aggregate='count', normalize=None, filters=None):
+    """
+    Group the surveys by `rows` (and `columns`) and aggregate each group.
+
+    aggregate is 'count', or 'sum' / 'mean' of the `value` experience field. normalize ('all', 'rows', 'columns')
+    turns counts into shares. Groups without any survey are left out of the labels.
+    """
+    snapshot = get_snapshot()
+    mask = snapshot.mask(filters or {})
+    row_codes, row_labels = snapshot.dimension(rows)
+    column_codes, column_labels = snapshot.dimension(columns) if columns else (np.zeros(len(snapshot), np.int64), [None])
+
+    width = len(column_labels)
+    cells = row_codes[mask].astype(np.int64) * width + column_codes[mask]
+    size = len(row_labels) * width
+    counts = np.bincount(cells, minlength=size).reshape(-1, width).astype(float)
+    if aggregate == 'count':
+        table = counts
+        if normalize == 'all':
+            table = table / max(table.sum(), 1)
+        elif normalize == 'rows':
+            table = table / np.maximum(table.sum(axis=1, keepdims=True), 1)
+        elif normalize == 'columns':
+            table = table / np.maximum(table.sum(axis=0, keepdims=True), 1)
+    else:
+        sums = np.bincount(cells, weights=snapshot.experience[value][mask], minlength=size).reshape(-1, width)
+        table = sums if aggregate == 'sum' else np.divide(sums, counts, out=np.full_like(sums, np.nan), where=counts > 0)
+
+    # 빈 행과 열은 뺍니다.
+    keep_rows, keep_columns = counts.sum(axis=1) > 0, counts.sum(axis=0) > 0
+    table = table[keep_rows][:, keep_columns]
+    cells = [[None if np.isnan(cell) else round(float(cell), 6) for cell in row] for row in table]
+    return {
+        'rows': {'dimension': rows, 'labels': [label for label, keep in zip(row_labels, keep_rows) if keep]},
+        'columns': {
+            'dimension': columns, 'labels': [label for label, keep in zip(column_labels, keep_columns) if keep],
+        } if columns else None,
+        'value': value,
+        'aggregate': aggregate,
+        'total': int(mask.sum()),
+        'cells': cells if columns else [row[0] for row in cells],
+    }
@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+
+from survey import versioning
+from survey.models import OperatingSystem
+
+CATALOG_CACHE_KEY = 'survey:os-catalog'
+
+
+def get_catalog():
+    """
+    Return {'by_id': {id: os}, 'by_name': {name: os}, 'version': ...} for every OperatingSystem.
+
+    The catalog is tiny and rarely changes, so it is read with one query and kept in the cache
+    until an OperatingSystem is saved or deleted (see survey.signals).
+    """
+    catalog = cache.get(CATALOG_CACHE_KEY)
+    if catalog is None:
+        # replica 에서 읽는 요청이라도 primary 에서 읽습니다. 캐시를 비운 직후에 아직 반영되지 않은 replica 에서 읽으면
+        # 예전 목록이 OS_CATALOG_CACHE_TIMEOUT 동안 캐시에 남습니다.
+        versions = versioning.get_versions(versioning.OPERATING_SYSTEM, using=DEFAULT_DB_ALIAS)
+        catalog = {'by_id': {}, 'by_name': {}, 'version': versions}
+        for operating_system in OperatingSystem.objects.using(DEFAULT_DB_ALIAS).order_by('id'):
+            catalog['by_id'][operating_system.id] = operating_system
+            # 같은 이름이 여러 개라면 가장 먼저 만들어진 것을 씁니다.
+            catalog['by_name'].setdefault(operating_system.name, operating_system)
+        cache.set(CATALOG_CACHE_KEY, catalog, settings.OS_CATALOG_CACHE_TIMEOUT)
+    return catalog
+
+
+def invalidate():
+    cache.delete(CATALOG_CACHE_KEY)
+
+
+def list_operating_systems():
+    return list(get_catalog()['by_id'].values())
+
+
+def get_operating_system(pk):
+    try:
+        return get_catalog()['by_id'].get(int(pk))
+    except (TypeError, ValueError):
+        return None
+
+
+def get_operating_system_by_name(name):
+    return get_catalog()['by_name'].get(name)
@@ -0,0 +1,77 @@
+import base64
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from survey.models import SurveyChange
+
+# 설문 변경 피드 (GET /api/v1/survey/changes/?cursor=...)
+# 설문이 생기고, 바뀌고, 지워질 때마다 SurveyChange 에 seq 순서로 기록하고 (survey.signals, survey.importer.insert_surveys),
+# 피드는 cursor (마지막으로 받은 seq) 뒤의 기록만 읽으므로 비용이 테이블 크기가 아니라 변경 수에 비례합니다.
+# 설문을 .update() 로 바꾸거나, OS 가 지워져 os 가 NULL 이 되는 것은 기록되지 않습니다.
+
+
+def record(survey_ids, kind):
+    SurveyChange.objects.bulk_create([SurveyChange(survey_id=pk, kind=kind) for pk in survey_ids])
+
+
+def encode_cursor(seq):
+    return base64.urlsafe_b64encode(f'seq:{seq}'.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return the seq encoded in `cursor` (0 when there is none); raise ValueError if it is malformed."""
+    if not cursor:
+        return 0
+    try:
+        prefix, seq = base64.urlsafe_b64decode(cursor.encode()).decode().split(':')
+        seq = int(seq)
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError(cursor)
+    if prefix != 'seq' or seq < 0:
+        raise ValueError(cursor)
+    return seq
+
+
+def changes_after(seq, limit):
+    """
+    Up to `limit` SurveyChanges after `seq`, in seq order.
+
+    seq is allocated when a change is inserted, not when its transaction commits, so a change can become visible after
+    a later one has already been served. The feed stops at a gap in seq until the change after the gap is
+    SURVEY_CHANGES_SETTLE_SECONDS old; by then the missing seq is either committed or rolled back for good.
+    """
+    return settled(seq, list(SurveyChange.objects.filter(seq__gt=seq).order_by('seq')[:limit]))
+
+
+def settled(seq, changes):
+    """The leading part of `changes` (read in seq order after `seq`) up to the first unsettled gap in seq."""
+    settled_at = timezone.now() - timedelta(seconds=settings.SURVEY_CHANGES_SETTLE_SECONDS)
+    expected = seq + 1
+    for i, change in enumerate(changes):
+        if change.seq != expected and change.created_at > settled_at:
+            return changes[:i]
+        expected = change.seq + 1
+    return changes
+
+
+def settled_seq():
+    """
+    A seq every earlier change of which is either visible or gone for good.
+
+    That is the last change older than SURVEY_CHANGES_SETTLE_SECONDS; MAX(seq) is not, since a change with a smaller
+    seq may still commit after it.
+    """
+    settled_at = timezone.now() - timedelta(seconds=settings.SURVEY_CHANGES_SETTLE_SECONDS)
+    seq = SurveyChange.objects.filter(created_at__lte=settled_at).order_by('-seq').values_list('seq', flat=True).first()
+    return seq or 0
+
+
+def latest(changes):
+    """The last change of each survey in `changes`, in seq order."""
+    by_survey = {}
+    for change in changes:
+        by_survey.pop(change.survey_id, None)
+        by_survey[change.survey_id] = change
+    return list(by_survey.values())
@@ -0,0 +1,208 @@
+import asyncio
+import logging
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from django.db import DatabaseError
+
+from survey import changes
+from survey.fast_serializers import survey_result_serializer
+from survey.models import SurveyChange, SurveyResult
+from waffle_backend.asyncdb import database_sync_to_async
+from waffle_backend.renderers import FastJSONRenderer
+
+# 새 설문을 Server-Sent Events 로 보내는 스트림 (GET /api/v1/async/survey/events/)
+# 연결마다 스레드를 잡아두는 Django 의 뷰로는 수천 개의 연결을 열어둘 수 없으므로, waffle_backend/asgi.py 에서
+# Django 앞에 둔 ASGI 앱 (survey_events_app) 이 직접 처리합니다.
+# 프로세스마다 Broadcaster 하나가 SurveyChange 를 poll 하고, 이벤트를 한 번만 만들어 모든 연결의 큐에 넣습니다.
+# 큐가 가득 찬 (받는 속도가 느린) 연결은 큐에 남은 이벤트까지 보내고 끊습니다. EventSource 는 마지막으로 받은 id 를 Last-Event-ID 로 보내며
+# 다시 연결하고, 그 뒤의 이벤트는 DB 에서 다시 읽어 보내므로 빠지는 이벤트는 없습니다.
+SURVEY_EVENTS_PATH = '/api/v1/async/survey/events/'
+EVENTS_BATCH_SIZE = 500
+HEARTBEAT = b': ping\n\n'
+
+logger = logging.getLogger(__name__)
+
+
+def encode_event(seq, survey):
+    return b'id: %d\nevent: survey\ndata: %s\n\n' % (seq, FastJSONRenderer().render(survey))
+
+
+@database_sync_to_async
+def load_events(seq, limit=EVENTS_BATCH_SIZE):
+    """([(seq, event bytes)] of the surveys created after `seq`, seq of the last change read)."""
+    batch = changes.changes_after(seq, limit)
+    created = [change for change in batch if change.kind == SurveyChange.CREATED]
+    id_of = survey_result_serializer.getter('id')
+    rows = SurveyResult.objects.filter(id__in=[change.survey_id for change in created])
+    rows = {id_of(row): row for row in rows.values_list(*survey_result_serializer.columns)}
+    events = [
+        (change.seq, encode_event(change.seq, survey_result_serializer.build(rows[change.survey_id])))
+        for change in created if change.survey_id in rows  # 그 사이에 지워진 설문은 보내지 않습니다.
+    ]
+    return events, batch[-1].seq if batch else seq
+
+
+@database_sync_to_async
+def start_seq():
+    """
+    The seq a new Broadcaster starts after: the last settled seq, then on through the changes up to the first gap.
+
+    Starting at MAX(seq) would skip a change that commits later into an earlier gap; starting at the settled seq alone
+    would send the connections that have just come in the surveys of the last SURVEY_CHANGES_SETTLE_SECONDS.
+    """
+    seq = changes.settled_seq()
+    while True:
+        batch = changes.changes_after(seq, EVENTS_BATCH_SIZE)
+        if batch:
+            seq = batch[-1].seq
+        if len(batch) < EVENTS_BATCH_SIZE:
+            return seq
+
+
+class Subscriber:
+
+    def __init__(self):
+        self.queue = asyncio.Queue(settings.SURVEY_EVENTS_QUEUE_SIZE)
+        self.closed = False
+        # 밀린 이벤트를 DB 에서 읽는 동안은 False 이고, Broadcaster 가 큐에 넣지 않습니다.
+        self.live = False
+        self.overflowed = False
+
+    def put(self, item):
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # 큐에 남은 이벤트까지 보내고 끊습니다. 그 뒤의 이벤트는 클라이언트가 마지막으로 받은 id 로 다시 연결해서 받습니다.
+            self.overflowed = True
+
+    def close(self):
+        self.closed = True
+        self.put(None)  # get() 에서 기다리고 있다면 깨웁니다.
+
+
+class Broadcaster:
+
+    def __init__(self):
+        self.subscribers = set()
+        self.seq = 0
+        self.task = None
+        self.started = None  # run() 이 시작 seq 를 읽으면 set 됩니다.
+
+    def subscribe(self):
+        subscriber = Subscriber()
+        self.subscribers.add(subscriber)
+        # poll 은 연결이 있는 동안만 돕니다. (테스트처럼 event loop 가 바뀌면 새 loop 에서 다시 시작합니다)
+        loop = asyncio.get_running_loop()
+        if self.task is None or self.task.done() or self.task.get_loop() is not loop:
+            self.started = asyncio.Event()
+            self.task = loop.create_task(self.run())
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+
+    def publish(self, item):
+        for subscriber in list(self.subscribers):
+            if subscriber.live:
+                subscriber.put(item)
+
+    async def run(self):
+        try:
+            self.seq = await start_seq()
+            self.started.set()
+            idle = 0.0
+            while self.subscribers:
+                await asyncio.sleep(settings.SURVEY_EVENTS_POLL_INTERVAL)
+                try:
+                    events, self.seq = await load_events(self.seq)
+                except DatabaseError:
+                    # 잠깐의 DB 오류로 모든 연결을 끊지 않고, 다음 poll 에서 같은 자리부터 다시 읽습니다.
+                    logger.exception('survey events poll failed')
+                    continue
+                for event in events:
+                    self.publish(event)
+                # 프록시가 조용한 연결을 끊지 않도록 가끔 주석 줄을 보냅니다.
+                idle = 0.0 if events else idle + settings.SURVEY_EVENTS_POLL_INTERVAL
+                if idle >= settings.SURVEY_EVENTS_HEARTBEAT:
+                    idle = 0.0
+                    self.publish((None, HEARTBEAT))
+        except Exception:
+            logger.exception('survey events broadcaster failed')
+            # 모든 연결을 끊습니다. 클라이언트가 다시 연결하면 poll 도 다시 시작됩니다.
+            self.started.set()
+            for subscriber in list(self.subscribers):
+                subscriber.close()
+
+
+broadcaster = Broadcaster()
+
+
+def last_event_id(scope):
+    headers = dict(scope['headers'])
+    value = headers.get(b'last-event-id', b'').decode('latin-1')
+    if not value:
+        # EventSource 를 쓰지 않는 클라이언트는 ?last_event_id= 로 넘길 수 있습니다.
+        value = parse_qs(scope.get('query_string', b'').decode('latin-1')).get('last_event_id', [''])[0]
+    try:
+        return max(int(value), 0)
+    except ValueError:
+        return None
+
+
+async def watch_disconnect(receive, subscriber):
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            subscriber.close()
+            return
+
+
+async def survey_events_app(scope, receive, send):
+    """ASGI app streaming new surveys as `text/event-stream`; resumes after the Last-Event-ID header if given."""
+    if scope['method'] != 'GET':
+        await send({'type': 'http.response.start', 'status': 405, 'headers': [(b'allow', b'GET')]})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+
+    await send({'type': 'http.response.start', 'status': 200, 'headers': [
+        (b'content-type', b'text/event-stream; charset=utf-8'),
+        (b'cache-control', b'no-cache'),
+        (b'x-accel-buffering', b'no'),  # nginx 가 버퍼링하지 않도록
+    ]})
+    subscriber = broadcaster.subscribe()
+    watcher = asyncio.ensure_future(watch_disconnect(receive, subscriber))
+    try:
+        await broadcaster.started.wait()
+        await send({'type': 'http.response.body', 'body': b'retry: %d\n\n' % settings.SURVEY_EVENTS_RETRY_MS,
+                    'more_body': True})
+        # Broadcaster 가 이미 읽은 곳까지는 (끊긴 동안의 이벤트) 큐를 거치지 않고 이 연결이 DB 에서 직접 읽어 보냅니다.
+        # 밀린 이벤트가 많아도 큐가 넘치지 않습니다. 따라잡은 뒤부터 Broadcaster 가 큐에 넣습니다.
+        sent = last_event_id(scope)
+        if sent is None:
+            sent = broadcaster.seq
+        while sent < broadcaster.seq and not subscriber.closed:
+            events, seq = await load_events(sent)
+            for _, event in events:
+                await send({'type': 'http.response.body', 'body': event, 'more_body': True})
+            if seq == sent:
+                # seq 의 빈 자리가 확정되기를 기다립니다. (Broadcaster 는 이미 지나갔으므로 여기서 읽어야 합니다)
+                await asyncio.sleep(settings.SURVEY_EVENTS_POLL_INTERVAL)
+            sent = seq
+        # 위의 조건 확인과 여기 사이에는 await 가 없으므로, 그 사이에 publish 되어 빠지는 이벤트는 없습니다.
+        subscriber.live = True
+        while not subscriber.closed and not (subscriber.overflowed and subscriber.queue.empty()):
+            item = await subscriber.queue.get()
+            if item is None:
+                break
+            seq, event = item
+            if seq is not None and seq <= sent:
+                continue
+            await send({'type': 'http.response.body', 'body': event, 'more_body': True})
+        if not watcher.done():
+            await send({'type': 'http.response.body', 'body': b''})
+    finally:
+        broadcaster.unsubscribe(subscriber)
+        watcher.cancel()
@@ -0,0 +1,55 @@
+import csv
+import json
+
+from django.utils import timezone
+
+from survey.pagination import KEYSET_ORDERING, seek
+from survey.tsv import TSV_DATETIME_FORMAT
+
+# example_surveyresult.tsv 와 같은 컬럼, 같은 순서
+EXPORT_COLUMNS = (
+    'timestamp', 'os', 'python', 'rdb', 'programming', 'major', 'grade', 'backend_reason', 'waffle_reason',
+    'say_something',
+)
+EXPORT_CHUNK_SIZE = 2000
+
+
+def export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield EXPORT_COLUMNS tuples for every survey in `queryset`, newest first.
+
+    Rows are read chunk_size at a time, each chunk seeking past the last (timestamp, id) of the previous one.
+    MySQLdb buffers the whole result of a query on the client, so a single `.iterator()` would not keep memory flat.
+    """
+    queryset = queryset.order_by(*KEYSET_ORDERING).values_list(
+        'id', 'timestamp', 'os__name', 'python', 'rdb', 'programming', 'major', 'grade', 'backend_reason',
+        'waffle_reason', 'say_something',
+    )
+    position = None
+    while True:
+        chunk = queryset if position is None else seek(queryset, position)
+        rows = list(chunk[:chunk_size])
+        for row in rows:
+            yield (timezone.localtime(row[1]).strftime(TSV_DATETIME_FORMAT), ) + row[2:]
+        if len(rows) < chunk_size:
+            return
+        position = rows[-1][1], rows[-1][0]
+
+
+class Echo:
+    # csv.writer 가 쓰는 값을 버퍼에 쌓지 않고 그대로 돌려받기 위한 file-like 객체 (Django 문서의 streaming CSV 예제)
+
+    def write(self, value):
+        return value
+
+
+def csv_stream(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(EXPORT_COLUMNS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def ndjson_stream(rows):
+    for row in rows:
+        yield json.dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False) + '\n'
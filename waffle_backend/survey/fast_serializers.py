@@ -0,0 +1,199 @@
+import functools
+from operator import itemgetter
+
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+
+# 목록 API 용 읽기 전용 직렬화.
+# SurveyResultSerializer 는 행마다 OperatingSystemSerializer, UserSerializer 를 새로 만들고 필드를 하나씩 거칩니다.
+# 여기서는 필요한 컬럼을 .values_list() 로 한 번에 읽고, 미리 만들어둔 getter 로 튜플에서 바로 dict 를 만듭니다.
+# 결과는 SurveyResultSerializer 와 같아야 합니다. (survey/tests.py 에서 비교)
+
+
+def iso_datetime(value):
+    # DRF DateTimeField.to_representation 과 같은 형식 (현재 timezone 의 ISO 8601, UTC 는 'Z')
+    if not value:
+        return None
+    value = timezone.localtime(value) if timezone.is_aware(value) else timezone.make_aware(value)
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+class Column:
+
+    def __init__(self, name, source=None, to_representation=None, hidden=False):
+        self.name = name
+        self.source = source or name
+        self.to_representation = to_representation
+        # 읽기만 하고 결과에는 넣지 않는 컬럼 (Nested 의 NULL 확인용 primary key)
+        self.hidden = hidden
+
+
+class Nested:
+    """
+    A related object rendered as a nested dict, read through the `source` relation.
+
+    The first of `fields` must be the related primary key; when it is NULL the whole object is `null`.
+    """
+
+    def __init__(self, name, fields, source=None, null=None):
+        self.name = name
+        self.fields = fields
+        self.source = source or name
+        self.null = null
+
+
+class ValuesSerializer:
+    """
+    Serialize rows of `queryset.values_list(*serializer.columns)` to dicts, without any per-row objects.
+
+    `extra_columns` are selected as well (if not already) without being serialized, e.g. for pagination.
+    """
+
+    def __init__(self, fields, extra_columns=()):
+        self.fields = fields
+        self.extra_columns = extra_columns
+        self.columns, self.build = self.compile(fields, '')
+        self.columns += [column for column in extra_columns if column not in self.columns]
+
+    def compile(self, fields, prefix):
+        columns, names, getters = [], [], []
+        for field in fields:
+            if isinstance(field, Nested):
+                start = len(columns)
+                nested_columns, build = self.compile(field.fields, f'{prefix}{field.source}__')
+                columns += nested_columns
+                getter = self.nested_getter(start, start + len(nested_columns), build, field.null)
+            else:
+                getter = itemgetter(len(columns))
+                if field.to_representation is not None:
+                    getter = self.converted_getter(getter, field.to_representation)
+                columns.append(prefix + field.source)
+                if field.hidden:
+                    continue
+            names.append(field.name)
+            getters.append(getter)
+
+        pairs = tuple(zip(names, getters))
+
+        def build(row):
+            return {name: get(row) for name, get in pairs}
+
+        return columns, build
+
+    @staticmethod
+    def converted_getter(getter, to_representation):
+        return lambda row: to_representation(getter(row))
+
+    @staticmethod
+    def nested_getter(start, end, build, null):
+        def getter(row):
+            part = row[start:end]
+            if part[0] is None:
+                return dict(null) if isinstance(null, dict) else null
+            return build(part)
+        return getter
+
+    def getter(self, *columns):
+        """itemgetter for the given columns of a row."""
+        return itemgetter(*(self.columns.index(column) for column in columns))
+
+    def to_representation(self, rows):
+        build = self.build
+        return [build(row) for row in rows]
+
+    def sparse(self, fields=None, expand=None):
+        """
+        Serializer for a subset of the fields.
+
+        `fields` are names like 'id' or 'os.name' (None: all). Related objects named in `expand` (None: all) are
+        nested, the others are rendered as their primary key without a join. Naming a nested field expands it.
+        """
+        selected = None
+        if fields is not None:
+            selected = {}
+            for name in fields:
+                head, _, rest = name.partition('.')
+                if not rest:
+                    selected[head] = None
+                elif selected.get(head, ()) is not None:
+                    selected[head] = selected.get(head, ()) + (rest, )
+
+        by_name = {field.name: field for field in self.fields}
+        unknown = [name for name in selected or () if name not in by_name]
+        unknown += [name for name in expand or () if not isinstance(by_name.get(name), Nested)]
+        if unknown:
+            raise ParseError(f"Unknown fields: {', '.join(unknown)}")
+
+        fields = []
+        for field in self.fields:
+            if selected is not None and field.name not in selected:
+                continue
+            names = None if selected is None else selected[field.name]
+            if isinstance(field, Nested):
+                pk = field.fields[0]
+                if names is None and expand is not None and field.name not in expand:
+                    fields.append(Column(field.name, f'{field.source}__{pk.source}'))
+                    continue
+                if names is not None:
+                    field = self.sparse_nested(field, names)
+            elif names:
+                raise ParseError(f"'{field.name}' has no fields")
+            fields.append(field)
+        return ValuesSerializer(fields, self.extra_columns)
+
+    @staticmethod
+    def sparse_nested(field, names):
+        by_name = {nested.name: nested for nested in field.fields}
+        unknown = [f'{field.name}.{name}' for name in names if name not in by_name]
+        if unknown:
+            raise ParseError(f"Unknown fields: {', '.join(unknown)}")
+        pk = field.fields[0]
+        # NULL 인지 확인하려면 primary key 는 고르지 않았어도 읽어야 합니다.
+        fields = [pk if pk.name in names else Column(pk.name, pk.source, hidden=True)]
+        fields += [nested for nested in field.fields[1:] if nested.name in names]
+        null = field.null
+        if isinstance(null, dict):
+            null = {name: value for name, value in null.items() if name in names}
+        return Nested(field.name, fields, field.source, null)
+
+
+OPERATING_SYSTEM_FIELDS = (Column('id'), Column('name'), Column('description'), Column('price'))
+USER_FIELDS = (
+    Column('id'), Column('username'), Column('email'), Column('last_login', to_representation=iso_datetime),
+    Column('date_joined', to_representation=iso_datetime), Column('first_name'), Column('last_name'),
+)
+
+# 커서 페이지네이션 (SurveyResultCursorPagination) 에 필요한 컬럼
+SURVEY_RESULT_POSITION = ('timestamp', 'id')
+
+survey_result_serializer = ValuesSerializer((
+    Column('id'),
+    # OS 가 지워진 설문 (os=NULL) 에 대해 OperatingSystemSerializer(None).data 가 돌려주는 값
+    Nested('os', OPERATING_SYSTEM_FIELDS, null={'name': '', 'description': '', 'price': None}),
+    Nested('user', USER_FIELDS),
+    Column('python'),
+    Column('rdb'),
+    Column('programming'),
+    Column('major'),
+    Column('grade'),
+    Column('backend_reason'),
+    Column('waffle_reason'),
+    Column('say_something'),
+    Column('timestamp', to_representation=iso_datetime),
+), extra_columns=SURVEY_RESULT_POSITION)
+
+
+def split_names(value):
+    return None if value is None else tuple(name.strip() for name in value.split(',') if name.strip())
+
+
+@functools.lru_cache(maxsize=256)
+def sparse_survey_result_serializer(fields=None, expand=None):
+    """survey_result_serializer limited by the `?fields=` and `?expand=` query parameters (comma separated)."""
+    if fields is None and expand is None:
+        return survey_result_serializer
+    # 빈 ?fields= 는 모든 필드, 빈 ?expand= 는 아무것도 펼치지 않는다는 뜻입니다.
+    return survey_result_serializer.sparse(split_names(fields) or None, split_names(expand))
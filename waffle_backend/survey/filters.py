@@ -0,0 +1,66 @@
+from rest_framework import serializers
+from rest_framework.filters import BaseFilterBackend
+
+from survey import catalog
+
+# 각 필터는 survey.models.SurveyResult.Meta.indexes 의 (컬럼, timestamp, id) 인덱스를 탑니다. (survey/tests.py 에서 EXPLAIN 으로 확인)
+# 같은 값 안에서는 인덱스가 이미 최신순 (KEYSET_ORDERING) 이므로, 커서 이동도 인덱스 안에서 끝납니다.
+# 필터 값이 잘못되면 400 을 돌려줍니다.
+EXPERIENCE_FIELDS = ('python', 'rdb', 'programming')
+# 교차 집계 (survey.analytics.crosstab) 의 행과 열로 쓸 수 있는 값. week 는 timestamp 가 속한 주 (월요일 시작)
+CROSSTAB_DIMENSIONS = ('os', ) + EXPERIENCE_FIELDS + ('major', 'grade', 'week')
+
+
+class SurveyResultFilterSerializer(serializers.Serializer):
+    # ?os=MacOS&os=Windows 처럼 같은 파라미터를 여러 번 주면 그중 하나에 해당하는 설문을 찾습니다.
+    os = serializers.ListField(child=serializers.CharField(), required=False)
+    major = serializers.ListField(child=serializers.CharField(), required=False)
+    grade = serializers.ListField(child=serializers.CharField(), required=False)
+    python_min = serializers.IntegerField(min_value=1, max_value=5, required=False)
+    python_max = serializers.IntegerField(min_value=1, max_value=5, required=False)
+    rdb_min = serializers.IntegerField(min_value=1, max_value=5, required=False)
+    rdb_max = serializers.IntegerField(min_value=1, max_value=5, required=False)
+    programming_min = serializers.IntegerField(min_value=1, max_value=5, required=False)
+    programming_max = serializers.IntegerField(min_value=1, max_value=5, required=False)
+    # since <= timestamp < until
+    since = serializers.DateTimeField(required=False)
+    until = serializers.DateTimeField(required=False)
+
+
+def validated_filters(params):
+    serializer = SurveyResultFilterSerializer(data=params)
+    serializer.is_valid(raise_exception=True)
+    return serializer.validated_data
+
+
+def filter_surveys(queryset, params):
+    """Filter SurveyResults by the query parameters of SurveyResultFilterSerializer."""
+    filters = validated_filters(params)
+
+    if 'os' in filters:
+        # OS 는 이름으로 받고, JOIN 없이 os_id 로 찾습니다. (같은 이름의 OS 가 여러 개일 수 있습니다)
+        names = set(filters['os'])
+        queryset = queryset.filter(os_id__in=[
+            operating_system.id for operating_system in catalog.list_operating_systems()
+            if operating_system.name in names
+        ])
+    for field in ('major', 'grade'):
+        if field in filters:
+            queryset = queryset.filter(**{f'{field}__in': filters[field]})
+    for field in EXPERIENCE_FIELDS:
+        if f'{field}_min' in filters or f'{field}_max' in filters:
+            # 값이 1~5 뿐이므로 범위를 IN 으로 바꿉니다. 한쪽만 열린 범위 (>= 4) 는 옵티마이저가 인덱스 대신
+            # (timestamp, id) 를 순서대로 훑는 쪽을 고르기 쉽지만, IN 은 값마다 인덱스의 한 구간만 읽습니다.
+            values = range(filters.get(f'{field}_min', 1), filters.get(f'{field}_max', 5) + 1)
+            queryset = queryset.filter(**{f'{field}__in': list(values)})
+    if 'since' in filters:
+        queryset = queryset.filter(timestamp__gte=filters['since'])
+    if 'until' in filters:
+        queryset = queryset.filter(timestamp__lt=filters['until'])
+    return queryset
+
+
+class SurveyResultFilterBackend(BaseFilterBackend):
+
+    def filter_queryset(self, request, queryset, view):
+        return filter_surveys(queryset, request.query_params)
@@ -0,0 +1,172 @@
+import hashlib
+import os
+import time
+from pathlib import Path
+
+from django.db import connections, transaction
+
+from survey import catalog, changes, search, stats, versioning
+from survey.models import OperatingSystem, SurveyChange, SurveyImportCheckpoint, SurveyResult
+from survey.tsv import parse_ranges, split_ranges
+
+DEFAULT_BATCH_SIZE = 1000
+# 파일이 바뀌었는지 확인할 때 해시하는 앞부분 크기
+HEAD_BYTES = 64 * 1024
+
+
+def resolve_operating_systems(names):
+    """Map OS names to ids, creating the missing ones with one bulk INSERT."""
+    by_name = catalog.get_catalog()['by_name']
+    ids = {name: by_name[name].id for name in names if name in by_name}
+    missing = set(names) - set(ids)
+    if not missing:
+        return ids
+
+    # 다른 프로세스에서 만들어져 캐시에만 없을 수 있으므로 DB 를 한 번 더 확인합니다.
+    # 같은 이름이 여러 개라면 가장 먼저 만들어진 것을 씁니다.
+    for pk, name in OperatingSystem.objects.filter(name__in=missing).order_by('-id').values_list('id', 'name'):
+        ids[name] = pk
+    missing -= set(ids)
+    if missing:
+        OperatingSystem.objects.bulk_create([OperatingSystem(name=name) for name in missing])
+        for pk, name in OperatingSystem.objects.filter(name__in=missing).order_by('-id').values_list('id', 'name'):
+            ids[name] = pk
+        # bulk_create 는 post_save 를 보내지 않으므로 캐시와 버전은 직접 갱신합니다.
+        versioning.bump(versioning.OPERATING_SYSTEM)
+        catalog.invalidate()
+    return ids
+
+
+def exclude_existing(rows):
+    """Drop rows whose 'fingerprint' is already stored (or repeated within `rows`)."""
+    fingerprints = [row['fingerprint'] for row in rows]
+    seen = set(SurveyResult.objects.filter(fingerprint__in=fingerprints).values_list('fingerprint', flat=True))
+    fresh = []
+    for row in rows:
+        if row['fingerprint'] in seen:
+            continue
+        seen.add(row['fingerprint'])
+        fresh.append(row)
+    return fresh
+
+
+def insert_surveys(surveys, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    bulk_create `surveys` and do what the SurveyResult post_save signal would have done. Call inside a transaction.
+
+    Every survey needs a fingerprint; on MySQL it is how their ids are found afterwards.
+    """
+    if not surveys:
+        return
+    SurveyResult.objects.bulk_create(surveys, batch_size=batch_size)
+    if any(survey.id is None for survey in surveys):
+        # MySQL 은 bulk_create 한 행의 id 를 돌려주지 않으므로 fingerprint 로 찾습니다.
+        ids = dict(SurveyResult.objects.filter(fingerprint__in=[survey.fingerprint for survey in surveys])
+                   .values_list('fingerprint', 'id'))
+        for survey in surveys:
+            survey.id = ids[survey.fingerprint]
+    stats.record_surveys(surveys)
+    search.index_surveys(surveys)
+    changes.record([survey.id for survey in surveys], SurveyChange.CREATED)
+    versioning.bump(versioning.SURVEY)
+
+
+class SurveyImporter:
+    # TSV 를 구간 (survey.tsv.split_ranges) 단위로 파싱하고, batch_size 개씩 모아 bulk_create 합니다.
+    # workers > 1 이면 파싱은 여러 프로세스가 나눠 하고, DB 에 쓰는 것은 이 프로세스 하나만 합니다.
+    # batch 하나가 한 트랜잭션이고, 그 batch 까지 읽은 byte offset 도 같은 트랜잭션에서 checkpoint 에 기록합니다.
+    # 따라서 중간에 끊겨도 다음 실행은 마지막으로 커밋된 batch 뒤부터 이어서 읽고,
+    # 이미 들어간 행은 fingerprint 로 걸러지므로 같은 파일을 여러 번 실행해도 행이 중복되지 않습니다.
+
+    def __init__(self, batch_size=DEFAULT_BATCH_SIZE, progress=None, progress_every=0, workers=1):
+        self.batch_size = batch_size
+        self.workers = workers
+        self.progress = progress
+        self.progress_every = progress_every
+        self.imported = 0
+        self.skipped = 0
+        self.resumed_from = 0
+        self.started_at = None
+        self.tail_fingerprint = ''
+        self.stale_tail = ''
+
+    @property
+    def rate(self):
+        elapsed = time.monotonic() - self.started_at
+        return self.imported / elapsed if elapsed > 0 else 0.0
+
+    def run(self, tsv_file, resume=True):
+        self.started_at = time.monotonic()
+        self.checkpoint, _ = SurveyImportCheckpoint.objects.get_or_create(source=str(Path(tsv_file).resolve()))
+
+        with open(tsv_file, 'rb') as f:
+            self.head = f.read(HEAD_BYTES)
+            offset = self.checkpoint.offset if resume else 0
+            if offset > os.fstat(f.fileno()).st_size or self.head_digest(offset) != self.checkpoint.head_digest:
+                # 파일이 잘렸거나 다른 파일로 바뀌었습니다. 처음부터 읽되, 이미 있는 행은 fingerprint 로 건너뜁니다.
+                offset = 0
+            self.resumed_from = offset
+            if offset:
+                self.stale_tail = self.checkpoint.tail_fingerprint
+
+            f.seek(offset)
+            if offset == 0:
+                f.readline()  # header
+            offset = f.tell()
+
+        self.read(tsv_file, offset)
+        return self.imported
+
+    def head_digest(self, offset):
+        return hashlib.sha1(self.head[:offset]).hexdigest()
+
+    def read(self, tsv_file, offset):
+        tasks = [(str(tsv_file), begin, end) for begin, end in split_ranges(tsv_file, offset)]
+        if self.workers > 1:
+            # fork 된 worker 가 DB 연결을 물려받지 않도록 미리 닫아둡니다. (다음 쿼리 때 다시 연결됩니다)
+            connections.close_all()
+
+        batch = []
+        for rows, range_offset, tail_fingerprint in parse_ranges(tasks, self.workers):
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= self.batch_size:
+                    # 아직 이 구간을 다 쓰지 않았으므로 offset 은 이전 구간 끝까지만 기록합니다.
+                    self.write(batch, offset)
+                    batch = []
+            offset = range_offset
+            if tail_fingerprint:
+                # 끝에 줄바꿈이 없는 마지막 줄은 아직 쓰이는 중일 수 있어서 offset 에 포함되지 않습니다.
+                # 다음 실행에서 다시 읽었을 때 줄이 달라져 있으면 지금 넣은 행을 지웁니다.
+                self.tail_fingerprint = tail_fingerprint
+        self.write(batch, offset)
+
+    def write(self, rows, offset):
+        if self.stale_tail and self.stale_tail in (row['fingerprint'] for row in rows):
+            self.stale_tail = ''
+        rows = self.exclude_existing(rows)
+        os_ids = resolve_operating_systems({row['os_name'] for row in rows})
+        surveys = []
+        for row in rows:
+            row = dict(row)
+            row['os_id'] = os_ids[row.pop('os_name')]
+            surveys.append(SurveyResult(**row))
+
+        with transaction.atomic():
+            if self.stale_tail:
+                SurveyResult.objects.filter(fingerprint=self.stale_tail).delete()
+                self.stale_tail = ''
+            insert_surveys(surveys, self.batch_size)
+            self.checkpoint.offset = offset
+            self.checkpoint.head_digest = self.head_digest(offset)
+            self.checkpoint.tail_fingerprint = self.tail_fingerprint
+            self.checkpoint.save(update_fields=['offset', 'head_digest', 'tail_fingerprint', 'updated_at'])
+
+        previous, self.imported = self.imported, self.imported + len(surveys)
+        if self.progress and self.progress_every and previous // self.progress_every != self.imported // self.progress_every:
+            self.progress(self)
+
+    def exclude_existing(self, rows):
+        fresh = exclude_existing(rows)
+        self.skipped += len(rows) - len(fresh)
+        return fresh
@@ -0,0 +1,152 @@
+import json
+import sqlite3
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import DataError, IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from survey.importer import exclude_existing, insert_surveys, resolve_operating_systems
+from survey.models import SurveyResult
+
+# SURVEY_INGESTION_MODE = 'queue' 일 때, 설문 제출은 DB 에 바로 INSERT 하지 않고 로컬 SQLite 파일에 쌓아둡니다.
+# 요청은 로컬 파일에 commit 되는 즉시 202 로 응답하고, drain_survey_queue 명령이 쌓인 설문을 모아 DB 에 bulk INSERT 합니다.
+# 큐의 설문은 DB 에 들어간 뒤에 지우므로, drain 이 중간에 죽으면 같은 설문을 다시 읽을 수 있습니다.
+# 그래서 설문마다 fingerprint 를 붙여 두고, 이미 들어간 설문은 건너뜁니다.
+# 저장할 수 없는 설문은 큐의 failed 테이블로 옮깁니다. 그대로 두면 매번 같은 설문에서 실패해 뒤의 설문까지 막힙니다.
+
+
+class SurveyQueue:
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+
+    @property
+    def connection(self):
+        # sqlite3 연결은 스레드 사이에 공유할 수 없으므로 스레드마다 엽니다.
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            # commit 마다 fsync 합니다. 202 를 받은 설문은 서버가 죽어도 남아있어야 합니다.
+            connection.execute('PRAGMA synchronous=FULL')
+            connection.execute('CREATE TABLE IF NOT EXISTS queue (id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL)')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS failed (id INTEGER PRIMARY KEY, payload TEXT NOT NULL, error TEXT NOT NULL)'
+            )
+            self.local.connection = connection
+        return connection
+
+    def put(self, payload):
+        return self.connection.execute('INSERT INTO queue (payload) VALUES (?)', (json.dumps(payload), )).lastrowid
+
+    def peek(self, limit):
+        """Return up to `limit` of the oldest (id, payload) entries without removing them."""
+        rows = self.connection.execute('SELECT id, payload FROM queue ORDER BY id LIMIT ?', (limit, )).fetchall()
+        return [(pk, json.loads(payload)) for pk, payload in rows]
+
+    def ack(self, last_id, failed=()):
+        """Remove the entries up to `last_id`, moving the (id, error) pairs of `failed` to the failed table."""
+        connection = self.connection
+        connection.execute('BEGIN')
+        try:
+            connection.executemany(
+                'INSERT OR REPLACE INTO failed (id, payload, error) SELECT id, payload, ? FROM queue WHERE id = ?',
+                [(error, pk) for pk, error in failed],
+            )
+            connection.execute('DELETE FROM queue WHERE id <= ?', (last_id, ))
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def failed(self, limit):
+        """Return up to `limit` of the oldest (id, payload, error) entries that could not be stored."""
+        rows = self.connection.execute('SELECT id, payload, error FROM failed ORDER BY id LIMIT ?', (limit, )).fetchall()
+        return [(pk, json.loads(payload), error) for pk, payload, error in rows]
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM queue').fetchone()[0]
+
+
+_queue = None
+
+
+def get_queue():
+    global _queue
+    if _queue is None or _queue.path != settings.SURVEY_INGESTION_QUEUE_PATH:
+        _queue = SurveyQueue(settings.SURVEY_INGESTION_QUEUE_PATH)
+    return _queue
+
+
+def enqueue(validated_data, user):
+    payload = dict(validated_data)
+    payload.update(
+        user_id=user.id,
+        # 제출 시각은 DB 에 들어가는 시각이 아니라 요청을 받은 시각입니다.
+        timestamp=timezone.now().isoformat(),
+        fingerprint=uuid.uuid4().hex,
+    )
+    return get_queue().put(payload)
+
+
+def survey_of(payload):
+    """An unsaved SurveyResult (os still a name, as `os_name`) of a queued payload; raise ValidationError if invalid."""
+    try:
+        row = dict(payload)
+        os_name = row.pop('os_name')
+        timestamp = parse_datetime(row.pop('timestamp'))
+        survey = SurveyResult(timestamp=timestamp, **row)
+    except (KeyError, TypeError, ValueError) as error:
+        raise ValidationError(f'{type(error).__name__}: {error}')
+    if not isinstance(os_name, str) or not os_name:
+        raise ValidationError({'os_name': '운영체제 이름이 없습니다.'})
+    if timestamp is None:
+        raise ValidationError({'timestamp': '제출 시각이 없습니다.'})
+    # 관계 필드는 행마다 DB 를 읽어야 하므로 검사하지 않습니다. (잘못되었다면 INSERT 에서 실패합니다)
+    survey.clean_fields(exclude=['os', 'user'])
+    survey.os_name = os_name
+    return survey
+
+
+def drain(queue, batch_size):
+    """Move up to `batch_size` queued surveys into SurveyResult; return how many queue entries were consumed."""
+    entries = queue.peek(batch_size)
+    if not entries:
+        return 0
+
+    valid, failed = [], []
+    for pk, payload in entries:
+        try:
+            valid.append((pk, survey_of(payload)))
+        except ValidationError as error:
+            failed.append((pk, str(error)))
+
+    fresh = {row['fingerprint'] for row in exclude_existing([{'fingerprint': survey.fingerprint} for _, survey in valid])}
+    surveys = []
+    for pk, survey in valid:
+        if survey.fingerprint in fresh:
+            fresh.discard(survey.fingerprint)
+            surveys.append((pk, survey))
+    os_ids = resolve_operating_systems({survey.os_name for _, survey in surveys})
+    for _, survey in surveys:
+        survey.os_id = os_ids[survey.os_name]
+    try:
+        with transaction.atomic():
+            insert_surveys([survey for _, survey in surveys], batch_size)
+    except (DataError, IntegrityError):
+        # 어느 설문 때문인지 모르므로 하나씩 다시 넣습니다. (rollback 된 INSERT 가 채운 id 는 지웁니다)
+        for pk, survey in surveys:
+            survey.id, survey._state.adding = None, True
+            try:
+                with transaction.atomic():
+                    insert_surveys([survey])
+            except (DataError, IntegrityError) as error:
+                failed.append((pk, f'{type(error).__name__}: {error}'))
+
+    queue.ack(entries[-1][0], failed)
+    return len(entries)
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+
+from waffle_backend.benchmark import open_slow_clients, run_load
+
+
+class Command(BaseCommand):
+    help = "Compare survey read throughput of a WSGI and an ASGI deployment of this project, with and without slow clients"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wsgi-url', default='http://127.0.0.1:8000',
+                            help="e.g. gunicorn waffle_backend.wsgi -w 4")
+        parser.add_argument('--asgi-url', default='http://127.0.0.1:8001',
+                            help="e.g. uvicorn waffle_backend.asgi:application --workers 1")
+        parser.add_argument('--wsgi-path', default='/api/v1/survey/?page_size=10')
+        parser.add_argument('--asgi-path', default='/api/v1/async/survey/?page_size=10')
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+        parser.add_argument('--slow-clients', type=int, default=1000,
+                            help="idle connections held open during the second round (0 to skip)")
+        parser.add_argument('--duration', type=float, default=10.0, help="seconds per measurement")
+
+    def handle(self, *args, **options):
+        deployments = (
+            ('wsgi', options['wsgi_url'].rstrip('/') + options['wsgi_path']),
+            ('asgi', options['asgi_url'].rstrip('/') + options['asgi_path']),
+        )
+        rounds = [0] + ([options['slow_clients']] if options['slow_clients'] else [])
+
+        self.stdout.write(f"{'server':<6} {'slow':>5} {'clients':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        for name, url in deployments:
+            for slow in rounds:
+                close = open_slow_clients(url, slow)
+                try:
+                    for concurrency in options['concurrency']:
+                        result = run_load(url, concurrency, options['duration'])
+                        self.stdout.write(
+                            f"{name:<6} {slow:>5} {concurrency:>7} {result.rate:>9.1f} "
+                            f"{result.percentile(50) * 1000:>8.1f} {result.percentile(99) * 1000:>8.1f} "
+                            f"{result.errors:>7}"
+                        )
+                finally:
+                    close()
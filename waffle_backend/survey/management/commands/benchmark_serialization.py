@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from survey.fast_serializers import survey_result_serializer
+from survey.models import SurveyResult
+from survey.pagination import KEYSET_ORDERING
+from survey.serializers import SurveyResultSerializer
+from waffle_backend.renderers import FastJSONRenderer, orjson
+
+
+def measure(func, repeat):
+    # repeat 번 실행한 것 중 가장 빠른 시간
+    best = None
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - started_at
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+class Command(BaseCommand):
+    help = "Benchmark the survey list page: DRF serializer vs survey.fast_serializers, JSONRenderer vs orjson"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000, help="rows per page (the list API allows up to 1000)")
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        queryset = SurveyResult.objects.order_by(*KEYSET_ORDERING)
+        count = min(queryset.count(), rows)
+        if not count:
+            raise CommandError("No survey results. Run download_survey first.")
+
+        # 쿼리 + 직렬화 (목록 API 가 하는 일)
+        paths = (
+            ('serializer', lambda: SurveyResultSerializer(queryset.select_related('os', 'user')[:rows], many=True).data),
+            ('fast', lambda: survey_result_serializer.to_representation(
+                queryset.values_list(*survey_result_serializer.columns)[:rows])),
+        )
+        self.stdout.write(f"{count} rows, best of {repeat}")
+        self.stdout.write(f"{'serialize':>10} {'seconds':>8} {'rows/s':>10} {'speedup':>8}")
+        baseline = None
+        for name, serialize in paths:
+            elapsed, data = measure(serialize, repeat)
+            baseline = baseline or elapsed
+            self.stdout.write(f"{name:>10} {elapsed:>8.4f} {count / elapsed:>10.0f} {baseline / elapsed:>7.2f}x")
+
+        if orjson is None:
+            self.stdout.write("orjson is not installed; FastJSONRenderer falls back to JSONRenderer")
+            return
+        self.stdout.write(f"{'render':>10} {'seconds':>8} {'rows/s':>10} {'speedup':>8}")
+        baseline = None
+        for name, renderer in (('json', JSONRenderer()), ('orjson', FastJSONRenderer())):
+            elapsed, _ = measure(lambda: renderer.render({'next': None, 'results': data}), repeat)
+            baseline = baseline or elapsed
+            self.stdout.write(f"{name:>10} {elapsed:>8.4f} {count / elapsed:>10.0f} {baseline / elapsed:>7.2f}x")
@@ -0,0 +1,64 @@
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand
+
+from survey.tsv import TSV_DATETIME_FORMAT, parse_ranges, split_ranges
+
+HEADER = '\t'.join([
+    '타임스탬프', '운영체제', 'Python', 'RDB', '프로그래밍', '전공', '학년', 'Backend 세미나를 택한 이유', '와플스튜디오에 함께하려는 이유',
+    '하고 싶은 말',
+])
+OS_NAMES = ('MacOS', 'Windows', 'Ubuntu (Linux)')
+MAJORS = ('컴퓨터공학부', '컴퓨터공학부 주전공', '타 전공', '경영학과', '수리과학부')
+GRADES = ('1학년', '2학년', '3학년', '4학년', '졸업')
+WORDS = ('서버', '개발', '백엔드', '장고', 'Django', 'REST', 'API', '데이터베이스', 'MySQL', '재미있을', '것', '같아서')
+
+
+def generate_tsv(path, rows, seed=0):
+    rand = random.Random(seed)
+    start = datetime(2021, 8, 26)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(HEADER + '\n')
+        for i in range(rows):
+            timestamp = start + timedelta(seconds=i * 7 + rand.randrange(7))
+            text = [' '.join(rand.choices(WORDS, k=rand.randrange(0, 15))) for _ in range(3)]
+            f.write('\t'.join([
+                timestamp.strftime(TSV_DATETIME_FORMAT), rand.choice(OS_NAMES),
+                str(rand.randint(1, 5)), str(rand.randint(1, 5)), str(rand.randint(1, 5)),
+                rand.choice(MAJORS), rand.choice(GRADES), *text,
+            ]) + '\n')
+
+
+class Command(BaseCommand):
+    help = "Benchmark TSV parsing throughput of download_survey --workers 1..N on a generated file (no DB writes)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1000000, help="rows of the generated TSV file")
+        parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+        parser.add_argument('--file', help="benchmark this TSV file instead of generating one")
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = options['file']
+            if path is None:
+                path = os.path.join(tmp, 'surveys.tsv')
+                self.stdout.write(f"Generating {options['rows']} rows in {path} ...")
+                generate_tsv(path, options['rows'])
+
+            with open(path, 'rb') as f:
+                f.readline()  # header
+                tasks = [(path, begin, end) for begin, end in split_ranges(path, f.tell())]
+
+            self.stdout.write(f"{'workers':>7} {'seconds':>8} {'rows/s':>10} {'speedup':>8}")
+            baseline = None
+            for workers in range(1, options['max_workers'] + 1):
+                started_at = time.perf_counter()
+                rows = sum(len(result[0]) for result in parse_ranges(tasks, workers))
+                elapsed = time.perf_counter() - started_at
+                rate = rows / elapsed
+                baseline = baseline or rate
+                self.stdout.write(f"{workers:>7} {elapsed:>8.2f} {rate:>10.0f} {rate / baseline:>7.2f}x")
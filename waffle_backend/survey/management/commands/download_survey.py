@@ -1,44 +1,60 @@
-from pathlib import Path
-
-from datetime import datetime
 from django.core.management.base import BaseCommand
-from django.utils import timezone
 
 from waffle_backend import settings
-from survey.models import OperatingSystem, SurveyResult
+from survey.importer import DEFAULT_BATCH_SIZE, SurveyImporter
+from survey.models import OperatingSystem
 
 
-def download_survey():
-    # NOTE: if you run this command multiple times, rows of 'survey_surveyresult' table will be added repeatedly.
-    #       to block that behavior, uncomment below lines.
-    #
-    # if SurveyResult.objects.all().exists():
-    #     raise Exception("There already exists data. Perhaps you are downloading it multiple times")
+def download_survey(tsv_file=None, batch_size=DEFAULT_BATCH_SIZE, progress=None, progress_every=0, resume=True,
+                    workers=1):
+    # NOTE: running this command multiple times is safe. Rows already imported are skipped by their fingerprint,
+    #       and an interrupted (or since appended) file is resumed from the byte offset recorded in
+    #       SurveyImportCheckpoint. Pass resume=False (--restart) to re-read the whole file.
 
-    path = settings.BASE_DIR
-    if not path:
-        raise Exception("Please specify path of directory including 'example_surveyresult.tsv'!")
-    tsv_file = f"{path}/example_surveyresult.tsv"
+    if tsv_file is None:
+        path = settings.BASE_DIR
+        if not path:
+            raise Exception("Please specify path of directory including 'example_surveyresult.tsv'!")
+        tsv_file = f"{path}/example_surveyresult.tsv"
 
     OperatingSystem.objects.get_or_create(name='Windows', price=200000, description="Most favorite OS in South Korea")
     OperatingSystem.objects.get_or_create(name='MacOS', price=300000, description="Most favorite OS of Seminar Instructors")
     OperatingSystem.objects.get_or_create(name='Ubuntu (Linux)', price=0, description="Linus Benedict Torvalds")
 
-    with open(tsv_file) as f:
-        for idx, line in enumerate(f, start=1):
-            if idx < 2:
-                continue
-
-            data = line.split('\t')
-
-            operating_system, created = OperatingSystem.objects.get_or_create(name=data[1])
-            t = SurveyResult.objects.create(timestamp=timezone.make_aware(datetime.strptime(data[0], '%Y-%m-%d %H:%M:%S')),
-                                        os=operating_system, python=int(data[2]), rdb=int(data[3]),
-                                        programming=int(data[4]), major=data[5], grade=data[6],
-                                        backend_reason=data[7], waffle_reason=data[8], say_something=data[9])
+    importer = SurveyImporter(batch_size=batch_size, progress=progress, progress_every=progress_every, workers=workers)
+    importer.run(tsv_file, resume=resume)
+    return importer
 
 
 class Command(BaseCommand):
+    help = "Import survey results from a TSV export (default: example_surveyresult.tsv)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', help="path of the TSV file to import")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE,
+                            help="rows per bulk INSERT / transaction")
+        parser.add_argument('--progress-every', type=int, default=10000,
+                            help="report progress every N imported rows (0 to disable)")
+        parser.add_argument('--restart', action='store_true',
+                            help="ignore the saved checkpoint and re-read the whole file (existing rows are still skipped)")
+        parser.add_argument('--workers', type=int, default=1,
+                            help="number of processes parsing the file in parallel (rows are still written by one)")
 
     def handle(self, *args, **options):
-        download_survey()
+        importer = download_survey(
+            tsv_file=options['file'],
+            batch_size=options['batch_size'],
+            progress=self.report_progress,
+            progress_every=options['progress_every'],
+            resume=not options['restart'],
+            workers=options['workers'],
+        )
+        if importer.resumed_from:
+            self.stdout.write(f"Resumed from byte offset {importer.resumed_from}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {importer.imported} rows, skipped {importer.skipped} already imported "
+            f"({importer.rate:.0f} rows/s)"
+        ))
+
+    def report_progress(self, importer):
+        self.stdout.write(f"{importer.imported} rows imported ({importer.rate:.0f} rows/s)")
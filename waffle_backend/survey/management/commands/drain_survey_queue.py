@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections
+
+from survey import ingestion
+
+
+class Command(BaseCommand):
+    help = "Move surveys queued by SURVEY_INGESTION_MODE='queue' into the database with batched inserts"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="surveys per bulk INSERT / transaction")
+        parser.add_argument('--interval', type=float, default=1.0, help="seconds to wait when the queue is empty")
+        parser.add_argument('--once', action='store_true', help="exit when the queue is empty instead of waiting")
+
+    def handle(self, *args, **options):
+        queue = ingestion.get_queue()
+        drained = 0
+        while True:
+            try:
+                count = self.drain(queue, options['batch_size'])
+            except DatabaseError as error:
+                # DB 가 잠깐 끊겼을 수 있으므로, 연결을 정리하고 잠시 뒤 같은 설문부터 다시 시도합니다.
+                self.stderr.write(f"Drain failed, retrying: {error}")
+                time.sleep(options['interval'])
+                continue
+            drained += count
+            if count:
+                self.stdout.write(f"{drained} surveys drained")
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+        if queue.failed(1):
+            self.stderr.write(f"Some queued surveys could not be stored; they are kept in the failed table of {queue.path}")
+        self.stdout.write(self.style.SUCCESS(f"Drained {drained} surveys"))
+
+    def drain(self, queue, batch_size):
+        # 요청 밖에서 오래 도는 loop 이므로, 요청마다 Django 가 하는 것처럼 끊겼거나 CONN_MAX_AGE 가 지난 연결을 닫습니다.
+        close_old_connections()
+        try:
+            return ingestion.drain(queue, batch_size)
+        finally:
+            close_old_connections()
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from survey import search
+from survey.models import SurveySearchTerm
+
+
+class Command(BaseCommand):
+    help = "Rebuild the survey free-text search index (SurveySearchPosting, SurveySearchTerm) from all survey results"
+
+    def handle(self, *args, **options):
+        search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt survey search index ({SurveySearchTerm.objects.count()} tokens)"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from survey import stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the survey statistics summary table (SurveyStatBucket) from all survey results"
+
+    def handle(self, *args, **options):
+        stats.rebuild()
+        self.stdout.write(self.style.SUCCESS("Rebuilt survey statistics"))
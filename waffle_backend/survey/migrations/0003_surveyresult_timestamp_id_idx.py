@@ -0,0 +1,17 @@
+# Generated by Django 3.2.6 on 2026-10-16 22:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0002_auto_20210910_1509'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='surveyresult',
+            index=models.Index(fields=['timestamp', 'id'], name='survey_timestamp_id_idx'),
+        ),
+    ]
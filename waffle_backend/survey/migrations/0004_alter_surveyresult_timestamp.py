@@ -0,0 +1,19 @@
+# Generated by Django 3.2.6 on 2026-10-16 22:39
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0003_surveyresult_timestamp_id_idx'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='surveyresult',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
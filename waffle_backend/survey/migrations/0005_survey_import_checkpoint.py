@@ -0,0 +1,29 @@
+# Generated by Django 3.2.6 on 2026-10-16 22:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0004_alter_surveyresult_timestamp'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SurveyImportCheckpoint',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=255, unique=True)),
+                ('offset', models.PositiveBigIntegerField(default=0)),
+                ('head_digest', models.CharField(blank=True, max_length=40)),
+                ('tail_fingerprint', models.CharField(blank=True, max_length=40)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='surveyresult',
+            name='fingerprint',
+            field=models.CharField(editable=False, max_length=40, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 3.2.6 on 2026-10-16 22:45
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_stat_buckets(apps, schema_editor):
+    SurveyResult = apps.get_model('survey', 'SurveyResult')
+    SurveyStatBucket = apps.get_model('survey', 'SurveyStatBucket')
+    db_alias = schema_editor.connection.alias
+
+    buckets = []
+    for dimension in ('os', 'python', 'rdb', 'programming', 'major', 'grade'):
+        field = 'os_id' if dimension == 'os' else dimension
+        for value, count in SurveyResult.objects.using(db_alias).values_list(field).annotate(count=Count('id')).order_by():
+            buckets.append(SurveyStatBucket(dimension=dimension, key=str(value or ''), count=count))
+    SurveyStatBucket.objects.using(db_alias).bulk_create(buckets)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0005_survey_import_checkpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SurveyStatBucket',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=20)),
+                ('key', models.CharField(max_length=100)),
+                ('count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='surveystatbucket',
+            constraint=models.UniqueConstraint(fields=('dimension', 'key'), name='survey_stat_bucket_unique'),
+        ),
+        migrations.RunPython(fill_stat_buckets, migrations.RunPython.noop),
+    ]
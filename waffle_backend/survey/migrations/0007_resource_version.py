@@ -0,0 +1,30 @@
+# Generated by Django 3.2.6 on 2026-10-16 22:48
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def create_versions(apps, schema_editor):
+    ResourceVersion = apps.get_model('survey', 'ResourceVersion')
+    db_alias = schema_editor.connection.alias
+    ResourceVersion.objects.using(db_alias).bulk_create([ResourceVersion(name=name) for name in ('survey', 'os', 'user')])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0006_survey_stat_bucket'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceVersion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('counter', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(create_versions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 3.2.6 on 2026-10-16 23:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0007_resource_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='surveyresult',
+            index=models.Index(fields=['os', 'timestamp', 'id'], name='survey_os_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='surveyresult',
+            index=models.Index(fields=['major', 'timestamp', 'id'], name='survey_major_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='surveyresult',
+            index=models.Index(fields=['grade', 'timestamp', 'id'], name='survey_grade_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='surveyresult',
+            index=models.Index(fields=['python', 'timestamp', 'id'], name='survey_python_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='surveyresult',
+            index=models.Index(fields=['rdb', 'timestamp', 'id'], name='survey_rdb_timestamp_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='surveyresult',
+            index=models.Index(fields=['programming', 'timestamp', 'id'], name='survey_prog_timestamp_idx'),
+        ),
+    ]
@@ -0,0 +1,80 @@
+# Generated by Django 3.2.6 on 2026-10-16 23:14
+
+import re
+from collections import Counter
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# 이후에 survey.search 가 바뀌어도 이 migration 이 하는 일은 바뀌지 않도록, 이 시점의 토크나이저를 복사해 둡니다.
+SEARCH_FIELDS = ('backend_reason', 'waffle_reason', 'say_something')
+MAX_TOKEN_LENGTH = 50
+WORD_RE = re.compile(r'[a-z0-9]+|[^\W\d_a-z]+')
+
+
+def tokenize(text):
+    for word in WORD_RE.findall(text.lower()):
+        if word.isascii() or len(word) == 1:
+            yield word[:MAX_TOKEN_LENGTH]
+        else:
+            for i in range(len(word) - 1):
+                yield word[i:i + 2]
+
+
+def fill_search_index(apps, schema_editor):
+    SurveyResult = apps.get_model('survey', 'SurveyResult')
+    SurveySearchPosting = apps.get_model('survey', 'SurveySearchPosting')
+    SurveySearchTerm = apps.get_model('survey', 'SurveySearchTerm')
+    db_alias = schema_editor.connection.alias
+
+    documents = Counter()
+    last_id = 0
+    while True:
+        rows = list(SurveyResult.objects.using(db_alias).filter(id__gt=last_id).order_by('id')
+                    .values_list('id', *SEARCH_FIELDS)[:2000])
+        if not rows:
+            break
+        postings = []
+        for survey_id, *texts in rows:
+            tokens = Counter()
+            for text in texts:
+                tokens.update(tokenize(text or ''))
+            postings += [SurveySearchPosting(token=token, survey_id=survey_id, count=count) for token, count in tokens.items()]
+            documents.update(tokens.keys())
+        SurveySearchPosting.objects.using(db_alias).bulk_create(postings, batch_size=5000, ignore_conflicts=True)
+        last_id = rows[-1][0]
+    SurveySearchTerm.objects.using(db_alias).bulk_create(
+        [SurveySearchTerm(token=token, document_count=count) for token, count in documents.items()], batch_size=5000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0008_surveyresult_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SurveySearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=50, unique=True)),
+                ('document_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SurveySearchPosting',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=50)),
+                ('count', models.PositiveIntegerField(default=1)),
+                ('survey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='survey.surveyresult')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='surveysearchposting',
+            constraint=models.UniqueConstraint(fields=('token', 'survey'), name='survey_search_posting_unique'),
+        ),
+        migrations.RunPython(fill_search_index, migrations.RunPython.noop),
+    ]
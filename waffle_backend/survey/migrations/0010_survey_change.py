@@ -0,0 +1,40 @@
+# Generated by Django 3.2.6 on 2026-10-16 23:23
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+def record_existing_surveys(apps, schema_editor):
+    # 이미 있는 설문은 created 기록을 id 순서대로 남겨서, 처음 동기화하는 클라이언트가 cursor 없이 전체를 받을 수 있게 합니다.
+    SurveyResult = apps.get_model('survey', 'SurveyResult')
+    SurveyChange = apps.get_model('survey', 'SurveyChange')
+    db_alias = schema_editor.connection.alias
+
+    last_id = 0
+    while True:
+        ids = list(SurveyResult.objects.using(db_alias).filter(id__gt=last_id).order_by('id')
+                   .values_list('id', flat=True)[:5000])
+        if not ids:
+            break
+        SurveyChange.objects.using(db_alias).bulk_create([SurveyChange(survey_id=pk, kind='created') for pk in ids])
+        last_id = ids[-1]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('survey', '0009_survey_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SurveyChange',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('survey_id', models.IntegerField()),
+                ('kind', models.CharField(choices=[('created', 'created'), ('updated', 'updated'), ('deleted', 'deleted')], max_length=10)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.RunPython(record_existing_surveys, migrations.RunPython.noop),
+    ]
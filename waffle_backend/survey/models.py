@@ -1,5 +1,6 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, router, transaction
+from django.utils import timezone
 
 
 class OperatingSystem(models.Model):
@@ -26,5 +27,94 @@ class SurveyResult(models.Model):
     backend_reason = models.CharField(max_length=500)
     waffle_reason = models.CharField(max_length=500, blank=True)
     say_something = models.CharField(max_length=500, blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
-    user = models.ForeignKey(get_user_model(), null=True, on_delete=models.DO_NOTHING)
\ No newline at end of file
+    # auto_now_add 는 bulk_create 로 넣는 값까지 덮어쓰므로, TSV 에 기록된 시각을 보존하기 위해 default 를 씁니다.
+    timestamp = models.DateTimeField(default=timezone.now)
+    user = models.ForeignKey(get_user_model(), null=True, on_delete=models.DO_NOTHING)
+    # bulk_create 로 넣은 행의 식별값. TSV 에서 가져온 행은 내용 해시 (survey.tsv.fingerprint_of) 로,
+    # 같은 행을 두 번 넣지 않기 위해 씁니다. batch API 로 넣은 행은 임의의 값으로, 넣은 뒤 id 를 찾는 데 씁니다.
+    fingerprint = models.CharField(max_length=40, null=True, unique=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # survey.pagination 의 keyset 페이지네이션 (최신순) 용
+            models.Index(fields=['timestamp', 'id'], name='survey_timestamp_id_idx'),
+            # 목록 필터 (survey.filters) 용. 필터 컬럼 뒤에 (timestamp, id) 를 두어 필터한 결과도 정렬된 순서로 읽습니다.
+            models.Index(fields=['os', 'timestamp', 'id'], name='survey_os_timestamp_idx'),
+            models.Index(fields=['major', 'timestamp', 'id'], name='survey_major_timestamp_idx'),
+            models.Index(fields=['grade', 'timestamp', 'id'], name='survey_grade_timestamp_idx'),
+            models.Index(fields=['python', 'timestamp', 'id'], name='survey_python_timestamp_idx'),
+            models.Index(fields=['rdb', 'timestamp', 'id'], name='survey_rdb_timestamp_idx'),
+            models.Index(fields=['programming', 'timestamp', 'id'], name='survey_prog_timestamp_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        # post_save 의 통계 bucket UPDATE 등 (survey.signals) 이 실패하면 설문도 저장되지 않도록 한 트랜잭션으로 씁니다.
+        # 삭제는 Django 가 signal 까지 한 트랜잭션으로 처리합니다. 바깥 트랜잭션이 있으면 (survey.views) 그 안에서 씁니다.
+        using = kwargs.get('using') or router.db_for_write(SurveyResult, instance=self)
+        with transaction.atomic(using=using, savepoint=False):
+            super().save(*args, **kwargs)
+
+
+class SurveyImportCheckpoint(models.Model):
+    # 파일별로 어디까지 (byte offset) 가져왔는지 기록해두고, 다음 실행 때 그 뒤부터 읽습니다.
+    source = models.CharField(max_length=255, unique=True)
+    offset = models.PositiveBigIntegerField(default=0)
+    # 파일 앞부분의 해시. 파일이 통째로 바뀌었다면 offset 을 믿을 수 없으므로 처음부터 다시 읽습니다.
+    head_digest = models.CharField(max_length=40, blank=True)
+    # 줄바꿈 없이 끝난 마지막 줄의 fingerprint. 그 줄은 offset 에 포함되지 않아 다음 실행에서 다시 읽습니다.
+    tail_fingerprint = models.CharField(max_length=40, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class SurveyStatBucket(models.Model):
+    # 설문 통계 요약 테이블. (dimension, key) 별 설문 수를 survey.stats 가 설문이 생기고 지워질 때마다 갱신합니다.
+    # 예) ('os', '1'), ('python', '4'), ('grade', '3학년')
+    dimension = models.CharField(max_length=20)
+    key = models.CharField(max_length=100)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'key'], name='survey_stat_bucket_unique'),
+        ]
+
+
+class ResourceVersion(models.Model):
+    # API 응답의 ETag / Last-Modified 를 만들기 위한 변경 카운터 (survey.versioning)
+    # 데이터가 바뀔 때마다 counter 를 올리므로, 응답을 만들지 않고도 클라이언트가 가진 데이터가 최신인지 알 수 있습니다.
+    name = models.CharField(max_length=50, unique=True)
+    counter = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+
+class SurveySearchTerm(models.Model):
+    # 검색 토큰별로 그 토큰이 나오는 설문 수. 검색 결과의 순위 (흔한 토큰일수록 가중치가 낮음) 에 씁니다. (survey.search)
+    token = models.CharField(max_length=50, unique=True)
+    document_count = models.IntegerField(default=0)
+
+
+class SurveySearchPosting(models.Model):
+    # 설문 자유 응답 (backend_reason, waffle_reason, say_something) 의 역색인. 토큰이 어느 설문에 몇 번 나오는지 기록합니다.
+    token = models.CharField(max_length=50)
+    survey = models.ForeignKey(SurveyResult, on_delete=models.CASCADE, related_name='+')
+    count = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        constraints = [
+            # (token, survey) 순서라 토큰 하나의 설문 목록을 인덱스에서 바로 읽습니다.
+            models.UniqueConstraint(fields=['token', 'survey'], name='survey_search_posting_unique'),
+        ]
+
+
+class SurveyChange(models.Model):
+    # 설문 변경 기록. 변경 피드 (GET /api/v1/survey/changes/) 는 마지막으로 받은 seq 뒤의 기록만 읽습니다. (survey.changes)
+    # 지워진 설문도 id 를 남겨야 하므로 (tombstone) SurveyResult 를 FK 로 참조하지 않습니다.
+    CREATED = 'created'
+    UPDATED = 'updated'
+    DELETED = 'deleted'
+    KINDS = ((CREATED, CREATED), (UPDATED, UPDATED), (DELETED, DELETED))
+
+    seq = models.BigAutoField(primary_key=True)
+    survey_id = models.IntegerField()
+    kind = models.CharField(max_length=10, choices=KINDS)
+    created_at = models.DateTimeField(default=timezone.now)
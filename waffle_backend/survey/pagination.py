@@ -0,0 +1,116 @@
+import base64
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+# 최신순 정렬. (timestamp, id) 복합 인덱스를 그대로 타도록 두 컬럼 모두 같은 방향으로 정렬합니다.
+KEYSET_ORDERING = ('-timestamp', '-id')
+
+
+def encode_cursor(position):
+    timestamp, pk = position
+    raw = f'{timestamp.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Return the (timestamp, id) position encoded in `cursor`; raise ValueError if it is malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        timestamp, pk = raw.rsplit('|', 1)
+        timestamp, pk = parse_datetime(timestamp), int(pk)
+    except (TypeError, ValueError, UnicodeError):
+        raise ValueError(cursor)
+    if timestamp is None:
+        raise ValueError(cursor)
+    return timestamp, pk
+
+
+def seek(queryset, position):
+    """Rows strictly after `position` in KEYSET_ORDERING, without any OFFSET."""
+    timestamp, pk = position
+    return queryset.filter(
+        Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=pk),
+        timestamp__lte=timestamp,
+    )
+
+
+class SurveyResultCursorPagination(BasePagination):
+    # OFFSET 기반 페이지네이션은 앞 페이지들을 모두 읽고 버려야 해서 뒤로 갈수록 느려집니다.
+    # 마지막으로 본 (timestamp, id) 다음부터 인덱스를 타고 읽으므로 몇 번째 페이지든 비용이 같습니다.
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None, position=None):
+        """
+        Return one page of `queryset`.
+
+        `position(row)` gives the (timestamp, id) of a row; by default rows are SurveyResult instances,
+        pass it when paginating .values_list() tuples.
+        """
+        position = position or (lambda survey: (survey.timestamp, survey.id))
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        cursor = request.query_params.get(self.cursor_query_param)
+        queryset = queryset.order_by(*KEYSET_ORDERING)
+        if cursor:
+            try:
+                queryset = seek(queryset, decode_cursor(cursor))
+            except ValueError:
+                raise NotFound(self.invalid_cursor_message)
+
+        # 한 개를 더 읽어서 다음 페이지가 있는지 COUNT 없이 확인합니다.
+        results = list(queryset[:self.page_size + 1])
+        self.next_cursor = encode_cursor(position(results[self.page_size - 1])) if len(results) > self.page_size else None
+        return results[:self.page_size]
+
+    def get_page_size(self, request):
+        page_size = settings.SURVEY_PAGE_SIZE
+        if self.page_size_query_param in request.query_params:
+            try:
+                page_size = _positive_int(request.query_params[self.page_size_query_param], strict=True)
+            except (KeyError, ValueError):
+                pass
+        return min(page_size, settings.SURVEY_MAX_PAGE_SIZE)
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+
+class SurveySearchPagination(PageNumberPagination):
+    # 검색 결과 (survey.search) 는 관련도 순으로 정렬된 id 목록이라 페이지 번호로 나눕니다.
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    truncated = False
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        # 후보가 SURVEY_SEARCH_MAX_CANDIDATES 에서 잘렸으면 count 는 최신 후보 안에서의 수이고, 더 오래된 설문은 찾지 않았습니다.
+        response.data['truncated'] = self.truncated
+        return response
@@ -0,0 +1,167 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Count, F, Sum
+
+from survey.models import SurveyResult, SurveySearchPosting, SurveySearchTerm, SurveyStatBucket
+
+# 설문 자유 응답 검색 (GET /api/v1/survey/search/?q=...)
+# 토큰 -> 설문 역색인 (SurveySearchPosting) 과 토큰별 설문 수 (SurveySearchTerm) 를 설문이 생기고 지워질 때마다 갱신하고,
+# 검색은 질의 토큰의 posting 만 읽으므로 LIKE '%...%' 처럼 테이블 전체를 훑지 않습니다.
+SEARCH_FIELDS = ('backend_reason', 'waffle_reason', 'say_something')
+MAX_TOKEN_LENGTH = 50
+# 영문/숫자 단어, 또는 그 밖의 문자 (한글 등) 가 이어진 구간
+WORD_RE = re.compile(r'[a-z0-9]+|[^\W\d_a-z]+')
+
+
+def tokenize(text):
+    """
+    Yield the search tokens of `text`.
+
+    English words and numbers are tokens as they are (lower-cased). Korean has no reliable word boundaries without
+    a morphological analyzer, so other runs of letters are split into overlapping bigrams ('백엔드' -> '백엔', '엔드').
+    """
+    for word in WORD_RE.findall(text.lower()):
+        if word.isascii() or len(word) == 1:
+            yield word[:MAX_TOKEN_LENGTH]
+        else:
+            for i in range(len(word) - 1):
+                yield word[i:i + 2]
+
+
+def collation_key(token):
+    """
+    The token without accents: what MySQL's default (accent and case insensitive) collation compares.
+
+    There, looking up the token 'é' returns the indexed 'e' row, so rows read back are matched to the query tokens by this.
+    """
+    return ''.join(char for char in unicodedata.normalize('NFD', token) if not unicodedata.combining(char))
+
+
+def survey_tokens(survey):
+    tokens = Counter()
+    for field in SEARCH_FIELDS:
+        tokens.update(tokenize(getattr(survey, field) or ''))
+    return tokens
+
+
+def index_surveys(surveys):
+    """Add saved `surveys` to the index. Call inside a transaction."""
+    postings, documents = [], Counter()
+    for survey in surveys:
+        tokens = survey_tokens(survey)
+        postings += [(token, survey.id, count) for token, count in tokens.items()]
+        documents.update(tokens.keys())
+    insert_postings(postings)
+    add_document_counts(documents)
+
+
+def insert_postings(postings, batch_size=5000):
+    # 설문 하나에 posting 이 수십 개라 import 때는 수십만 행이 됩니다. bulk_create 는 행마다 모델 객체를 만들고
+    # 값을 변환하는 데 INSERT 보다 오래 걸리므로, (token, survey_id, count) 튜플을 executemany 로 바로 넣습니다.
+    # MySQL 의 기본 collation 은 악센트를 구분하지 않아 다른 토큰이 같은 값으로 취급될 수 있으므로 (e, é) 충돌은 무시합니다.
+    connection = connections[router.db_for_write(SurveySearchPosting)]
+    quote = connection.ops.quote_name
+    sql = (
+        f"{connection.ops.insert_statement(ignore_conflicts=True)} {quote(SurveySearchPosting._meta.db_table)} "
+        f"({quote('token')}, {quote('survey_id')}, {quote('count')}) VALUES (%s, %s, %s)"
+    )
+    with connection.cursor() as cursor:
+        for start in range(0, len(postings), batch_size):
+            cursor.executemany(sql, postings[start:start + batch_size])
+
+
+def unindex_surveys(survey_ids):
+    """Remove surveys from the index (by what was indexed, not by their current text)."""
+    postings = SurveySearchPosting.objects.filter(survey_id__in=survey_ids)
+    documents = Counter(dict(postings.values_list('token').annotate(count=Count('id')).order_by()))
+    postings.delete()
+    add_document_counts({token: -count for token, count in documents.items()})
+
+
+def add_document_counts(deltas):
+    if not deltas:
+        return
+    SurveySearchTerm.objects.bulk_create(
+        [SurveySearchTerm(token=token) for token, delta in deltas.items() if delta > 0],
+        batch_size=5000, ignore_conflicts=True,
+    )
+    # 대부분의 토큰은 +1 (또는 -1) 이므로, 변화량이 같은 토큰끼리 UPDATE 한 번으로 갱신합니다.
+    by_delta = {}
+    for token, delta in deltas.items():
+        by_delta.setdefault(delta, []).append(token)
+    for delta, tokens in by_delta.items():
+        SurveySearchTerm.objects.filter(token__in=tokens).update(document_count=F('document_count') + delta)
+
+
+def rebuild(chunk_size=2000):
+    with transaction.atomic():
+        SurveySearchPosting.objects.all().delete()
+        SurveySearchTerm.objects.all().delete()
+        documents = Counter()
+        last_id = 0
+        while True:
+            surveys = SurveyResult.objects.filter(id__gt=last_id).order_by('id').only('id', *SEARCH_FIELDS)
+            surveys = list(surveys[:chunk_size])
+            if not surveys:
+                break
+            postings = []
+            for survey in surveys:
+                tokens = survey_tokens(survey)
+                postings += [(token, survey.id, count) for token, count in tokens.items()]
+                documents.update(tokens.keys())
+            insert_postings(postings)
+            last_id = surveys[-1].id
+        SurveySearchTerm.objects.bulk_create(
+            [SurveySearchTerm(token=token, document_count=count) for token, count in documents.items()], batch_size=5000,
+        )
+
+
+def search(query):
+    """
+    Return (ids of surveys containing every token of `query`, most relevant first, whether they were truncated).
+
+    Candidates are read from the posting list of the rarest token only (at most SURVEY_SEARCH_MAX_CANDIDATES of them,
+    newest first), then narrowed down by the other tokens, so the cost depends on how rare the query is rather than
+    on the size of the table. Results are ranked by tf-idf: (1 + log tf) * log(1 + N / df) summed over the tokens.
+    When the rarest token appears in more surveys than that, older surveys are not searched, and `truncated` is True.
+    """
+    tokens = set(tokenize(query))
+    if not tokens:
+        return [], False
+    found = {}
+    for token, count in SurveySearchTerm.objects.filter(token__in=tokens).values_list('token', 'document_count'):
+        found[token] = count
+        found.setdefault(collation_key(token), count)
+    document_counts = {token: found.get(token, found.get(collation_key(token))) for token in tokens}
+    if any(count is None or count <= 0 for count in document_counts.values()):
+        return [], False
+    # 읽어 온 posting 의 토큰 -> 질의 토큰 (collation 이 같다고 보는 다른 철자로 돌아올 수 있습니다)
+    query_token = {collation_key(token): token for token in tokens}
+    query_token.update({token: token for token in tokens})
+
+    total = SurveyStatBucket.objects.filter(dimension='os').aggregate(total=Sum('count'))['total'] or 1
+    weights = {token: math.log(1 + total / count) for token, count in document_counts.items()}
+    rarest = min(tokens, key=document_counts.get)
+    truncated = document_counts[rarest] > settings.SURVEY_SEARCH_MAX_CANDIDATES
+
+    postings = (SurveySearchPosting.objects.filter(token=rarest).order_by('-survey_id')
+                .values_list('survey_id', 'count')[:settings.SURVEY_SEARCH_MAX_CANDIDATES])
+    scores = {survey_id: (1 + math.log(count)) * weights[rarest] for survey_id, count in postings}
+    matched = Counter()
+    others = tokens - {rarest}
+    if others and scores:
+        for survey_id, token, count in SurveySearchPosting.objects.filter(
+                token__in=others, survey_id__in=list(scores)).values_list('survey_id', 'token', 'count'):
+            token = query_token.get(token, query_token.get(collation_key(token)))
+            scores[survey_id] += (1 + math.log(count)) * weights[token]
+            matched[survey_id] += 1
+    ids = sorted(
+        (survey_id for survey_id in scores if matched[survey_id] == len(others)),
+        key=lambda survey_id: (-scores[survey_id], -survey_id),
+    )
+    return ids, truncated
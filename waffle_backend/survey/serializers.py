@@ -1,5 +1,7 @@
 from rest_framework import serializers
 
+from survey import catalog
+from survey.filters import CROSSTAB_DIMENSIONS, EXPERIENCE_FIELDS
 from survey.models import OperatingSystem, SurveyResult
 from user.serializers import UserSerializer
 
@@ -37,7 +39,10 @@ class SurveyResultSerializer(serializers.ModelSerializer):
         return None
 
     def create(self, validated_data):
-        os, created = OperatingSystem.objects.get_or_create(name=validated_data.pop('os_name'))
+        os_name = validated_data.pop('os_name')
+        os = catalog.get_operating_system_by_name(os_name)
+        if os is None:
+            os, created = OperatingSystem.objects.get_or_create(name=os_name)
         validated_data['os'] = os
         validated_data['user'] = self.context['request'].user
         return super().create(validated_data)
@@ -52,4 +57,25 @@ class OperatingSystemSerializer(serializers.ModelSerializer):
             'name',
             'description',
             'price',
-        )
\ No newline at end of file
+        )
+
+
+class CrosstabSerializer(serializers.Serializer):
+    # GET /api/v1/survey/crosstab/ 의 query parameter (survey.analytics.crosstab)
+    rows = serializers.ChoiceField(CROSSTAB_DIMENSIONS)
+    columns = serializers.ChoiceField(CROSSTAB_DIMENSIONS, required=False)
+    value = serializers.ChoiceField(EXPERIENCE_FIELDS, required=False)
+    aggregate = serializers.ChoiceField(('count', 'sum', 'mean'), default='count')
+    normalize = serializers.ChoiceField(('all', 'rows', 'columns'), required=False)
+
+    def validate(self, data):
+        if data.get('columns') == data['rows']:
+            raise serializers.ValidationError('rows 와 columns 는 달라야 합니다.')
+        if data['aggregate'] == 'count':
+            if 'value' in data:
+                raise serializers.ValidationError('value 는 aggregate 가 sum 이나 mean 일 때만 씁니다.')
+        elif 'value' not in data:
+            raise serializers.ValidationError(f"aggregate={data['aggregate']} 에는 value 가 필요합니다.")
+        elif 'normalize' in data:
+            raise serializers.ValidationError('normalize 는 aggregate=count 일 때만 씁니다.')
+        return data
@@ -0,0 +1,68 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from survey import catalog, changes, search, stats, versioning
+from survey.models import OperatingSystem, SurveyChange, SurveyResult
+
+
+@receiver(pre_save, sender=SurveyResult)
+def survey_saving(sender, instance, using, **kwargs):
+    # 수정이라면 통계 bucket 을 옮길 수 있도록 저장되기 전의 값을 읽어둡니다.
+    if not instance._state.adding and instance.pk is not None:
+        instance._stat_previous = (
+            SurveyResult.objects.using(using).filter(pk=instance.pk).only(*stats.STAT_DIMENSIONS).first()
+        )
+
+
+@receiver(post_save, sender=SurveyResult)
+def survey_saved(sender, instance, created, **kwargs):
+    previous = instance.__dict__.pop('_stat_previous', None)
+    if created:
+        stats.record_surveys([instance])
+    else:
+        if previous is not None:
+            stats.record_update(previous, instance)
+        # 응답 내용이 바뀌었을 수 있으므로 색인을 다시 만듭니다.
+        search.unindex_surveys([instance.id])
+    search.index_surveys([instance])
+    changes.record([instance.id], SurveyChange.CREATED if created else SurveyChange.UPDATED)
+    versioning.bump(versioning.SURVEY)
+
+
+@receiver(pre_delete, sender=SurveyResult)
+def survey_deleting(sender, instance, **kwargs):
+    # posting 은 CASCADE 로 지워지지만, 토큰별 설문 수는 지워지기 전에 읽어서 줄여야 합니다.
+    search.unindex_surveys([instance.id])
+
+
+@receiver(post_delete, sender=SurveyResult)
+def survey_deleted(sender, instance, **kwargs):
+    stats.record_surveys([instance], sign=-1)
+    changes.record([instance.id], SurveyChange.DELETED)
+    versioning.bump(versioning.SURVEY)
+
+
+@receiver(post_save, sender=OperatingSystem)
+def operating_system_saved(sender, instance, **kwargs):
+    versioning.bump(versioning.OPERATING_SYSTEM)
+    catalog.invalidate()
+
+
+@receiver(post_delete, sender=OperatingSystem)
+def operating_system_deleted(sender, instance, **kwargs):
+    versioning.bump(versioning.OPERATING_SYSTEM)
+    catalog.invalidate()
+    stats.forget_operating_system(instance.id)
+    # 이 OS 를 쓰던 설문들의 os 가 NULL 이 되었습니다.
+    versioning.bump(versioning.SURVEY)
+
+
+@receiver(post_save, sender=get_user_model())
+def user_saved(sender, instance, update_fields=None, **kwargs):
+    # 설문 응답에 유저 정보가 들어가므로 설문 API 의 ETag 도 바뀌어야 합니다.
+    # 로그인마다 last_login 만 저장하는 것 (update_last_login) 은 건너뜁니다. 로그인마다 ETag 가 바뀌면 304 로 답할 수
+    # 없으므로, 설문 응답의 last_login 은 다른 변경으로 버전이 바뀔 때까지 예전 값일 수 있습니다.
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    versioning.bump(versioning.USER)
@@ -0,0 +1,110 @@
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, F, Q, When
+
+from survey import catalog
+from survey.models import SurveyResult, SurveyStatBucket
+
+# 통계 요약 테이블 (SurveyStatBucket) 은 설문을 저장하고 지우는 트랜잭션 안에서 signal 로 갱신합니다. (survey.signals)
+# signal 을 보내지 않는 변경 (.update(), SQL 로 직접 고친 설문) 뒤에는 manage.py rebuild_survey_stats 로 다시 계산합니다.
+DEGREE_DIMENSIONS = ('python', 'rdb', 'programming')
+STAT_DIMENSIONS = ('os', ) + DEGREE_DIMENSIONS + ('major', 'grade')
+
+
+def bucket_keys(survey):
+    # os 는 id 로 (OS 이름은 바뀔 수 있으므로), OS 가 없는 설문은 '' 로 셉니다.
+    yield 'os', str(survey.os_id or '')
+    for dimension in DEGREE_DIMENSIONS:
+        yield dimension, str(getattr(survey, dimension))
+    yield 'major', survey.major
+    yield 'grade', survey.grade
+
+
+def record_surveys(surveys, sign=1):
+    """Add (sign=1) or remove (sign=-1) `surveys` from the summary buckets."""
+    deltas = Counter()
+    for survey in surveys:
+        for bucket in bucket_keys(survey):
+            deltas[bucket] += sign
+    increment(deltas)
+
+
+def record_update(previous, survey):
+    """Move `survey` from the buckets of its `previous` values to the buckets of its current ones."""
+    deltas = Counter(bucket_keys(survey))
+    deltas.subtract(bucket_keys(previous))
+    increment(deltas)
+
+
+def increment(deltas):
+    deltas = {bucket: delta for bucket, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    # 이미 있는 bucket 은 UPDATE 한 번으로 모두 갱신합니다.
+    condition = Q()
+    for dimension, key in deltas:
+        condition |= Q(dimension=dimension, key=key)
+    updated = SurveyStatBucket.objects.filter(condition).update(count=Case(
+        *[When(dimension=dimension, key=key, then=F('count') + delta) for (dimension, key), delta in deltas.items()],
+        default=F('count'),
+    ))
+    if updated == len(deltas):
+        return
+
+    existing = set(SurveyStatBucket.objects.filter(condition).values_list('dimension', 'key'))
+    for (dimension, key), delta in deltas.items():
+        if (dimension, key) in existing:
+            continue
+        try:
+            with transaction.atomic():
+                SurveyStatBucket.objects.create(dimension=dimension, key=key, count=delta)
+        except IntegrityError:
+            # 그 사이에 다른 요청이 같은 bucket 을 만들었습니다.
+            SurveyStatBucket.objects.filter(dimension=dimension, key=key).update(count=F('count') + delta)
+
+
+def forget_operating_system(os_id):
+    # OS 가 지워지면 그 OS 의 설문은 os=NULL 이 되므로 (SET_NULL) 해당 bucket 을 '' 로 옮깁니다.
+    bucket = SurveyStatBucket.objects.filter(dimension='os', key=str(os_id)).first()
+    if bucket is not None:
+        bucket.delete()
+        increment({('os', ''): bucket.count})
+
+
+def rebuild():
+    with transaction.atomic():
+        SurveyStatBucket.objects.all().delete()
+        buckets = []
+        for dimension in STAT_DIMENSIONS:
+            field = 'os_id' if dimension == 'os' else dimension
+            for value, count in SurveyResult.objects.values_list(field).annotate(count=Count('id')).order_by():
+                buckets.append(SurveyStatBucket(dimension=dimension, key=str(value or ''), count=count))
+        SurveyStatBucket.objects.bulk_create(buckets)
+
+
+def summary():
+    """Statistics of all surveys, read from the summary buckets only."""
+    buckets = {dimension: {} for dimension in STAT_DIMENSIONS}
+    for dimension, key, count in SurveyStatBucket.objects.filter(count__gt=0).values_list('dimension', 'key', 'count'):
+        buckets[dimension][key] = count
+
+    names = {pk: os.name for pk, os in catalog.get_catalog()['by_id'].items()}
+    result = {
+        'total': sum(buckets['os'].values()),
+        'os': [
+            {'id': int(key) if key else None, 'name': names.get(int(key)) if key else None, 'count': count}
+            for key, count in sorted(buckets['os'].items(), key=lambda item: -item[1])
+        ],
+    }
+    for dimension in DEGREE_DIMENSIONS:
+        histogram = {str(degree): buckets[dimension].get(str(degree), 0) for degree, _ in SurveyResult.EXPERIENCE_DEGREE}
+        total = sum(histogram.values())
+        result[dimension] = {
+            'histogram': histogram,
+            'average': sum(int(degree) * count for degree, count in histogram.items()) / total if total else None,
+        }
+    for dimension in ('major', 'grade'):
+        result[dimension] = dict(sorted(buckets[dimension].items(), key=lambda item: -item[1]))
+    return result
@@ -1,4 +1,52 @@
-from django.test import TestCase, Client
+import asyncio
+import csv
+import json
+import os
+import re
+import tempfile
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, OperationalError, connection, connections, transaction
+from django.db.models import Avg
+from django.http import HttpResponse, QueryDict
+from django.test import (
+    AsyncClient, Client, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from survey import analytics, catalog, ingestion, search, stats
+from survey.events import SURVEY_EVENTS_PATH, broadcaster, load_events, survey_events_app
+from survey.export import EXPORT_COLUMNS
+from survey.fast_serializers import survey_result_serializer
+from survey.filters import filter_surveys
+from survey.importer import SurveyImporter, insert_surveys
+from survey.models import (
+    OperatingSystem, ResourceVersion, SurveyChange, SurveyResult, SurveySearchPosting, SurveySearchTerm,
+    SurveyStatBucket,
+)
+from survey.pagination import KEYSET_ORDERING
+from survey.serializers import SurveyResultSerializer
+from survey.tsv import parse_ranges, split_ranges
+from user import authentication
+from user.serializers import jwt_token_of
+from waffle_backend import asgi
+from waffle_backend.db_pool.pool import ConnectionPool, PoolTimeout, get_pool, pools
+from waffle_backend.renderers import FastJSONRenderer
+from waffle_backend.routers import STICKY_COOKIE, ReplicaRouter, replica_routing_middleware
+
+User = get_user_model()
 
 
 # Create your tests here.
@@ -10,3 +58,1241 @@ class AssignmentCheck(TestCase):
     def test_check(self):
         response = self.client.get('/api/v1/os/')
         print(response.status_code, response.content)
+
+
+class SurveyQueryBudgetMixin:
+    # 각 API 가 테이블 크기와 무관하게 정해진 개수의 쿼리만 실행하는지 확인합니다.
+    # 쿼리 수가 늘어나면 (N+1 등) 이 테스트가 깨지도록 하는 것이 목적입니다.
+    rows = None
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.os = OperatingSystem.objects.create(name='MacOS', price=300000)
+        User.objects.bulk_create(
+            [User(email=f'user{i}@waffle.com', username=f'user{i}') for i in range(cls.rows)],
+            batch_size=1000,
+        )
+        users = list(User.objects.order_by('id'))
+        SurveyResult.objects.bulk_create(
+            [
+                SurveyResult(os=cls.os, user=user, python=3, rdb=2, programming=4, major='컴퓨터공학부', grade='3학년',
+                             backend_reason='reason', waffle_reason='waffle', say_something='hello')
+                for user in users
+            ],
+            batch_size=1000,
+        )
+        stats.rebuild()
+        cls.user = users[0]
+        cls.survey = SurveyResult.objects.first()
+
+    def setUp(self):
+        self.auth_client = Client(HTTP_AUTHORIZATION=f'JWT {jwt_token_of(self.user)}')
+        # 테스트 사이의 rollback 은 signal 을 보내지 않으므로 캐시를 직접 비우고, OS 목록을 미리 읽어둡니다.
+        cache.clear()
+        authentication.clear()
+        catalog.get_catalog()
+
+    def test_survey_list(self):
+        # 버전 조회 (ETag), 목록 조회
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/v1/survey/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), min(self.rows, 100))
+
+    def test_survey_list_max_page(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/v1/survey/', {'page_size': 1000})
+        self.assertEqual(len(response.json()['results']), min(self.rows, 1000))
+
+    def test_survey_list_next_page(self):
+        next_url = self.client.get('/api/v1/survey/', {'page_size': 1}).json()['next']
+        if next_url is None:
+            return
+        with self.assertNumQueries(2):
+            response = self.client.get(next_url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_survey_retrieve(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/v1/survey/{self.survey.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user']['id'], self.survey.user_id)
+
+    def test_survey_create(self):
+        data = {
+            'os': 'MacOS', 'python': 3, 'rdb': 2, 'programming': 4, 'major': '컴퓨터공학부', 'grade': '3학년',
+            'backend_reason': 'reason',
+        }
+        # 인증(유저 조회), INSERT, 통계 UPDATE, 검색 색인 (posting INSERT, 토큰 INSERT, 토큰 UPDATE), 변경 기록 INSERT,
+        # 버전 UPDATE (+ 테스트 트랜잭션의 SAVEPOINT / RELEASE). OS 는 캐시에서 찾습니다.
+        with self.assertNumQueries(10):
+            response = self.auth_client.post('/api/v1/survey/', data)
+        self.assertEqual(response.status_code, 201)
+
+    def test_survey_create_queued(self):
+        with tempfile.TemporaryDirectory() as path, override_settings(
+                SURVEY_INGESTION_MODE='queue', SURVEY_INGESTION_QUEUE_PATH=f'{path}/queue.sqlite3'):
+            # 인증만 DB 를 읽고, 설문은 로컬 큐에만 저장됩니다.
+            with self.assertNumQueries(1):
+                response = self.auth_client.post('/api/v1/survey/', {
+                    'os': 'MacOS', 'python': 5, 'rdb': 4, 'programming': 3, 'major': '컴퓨터공학부', 'grade': '4학년',
+                    'backend_reason': 'reason',
+                })
+            self.assertEqual(response.status_code, 202)
+
+            queue = ingestion.get_queue()
+            [(_, payload)] = queue.peek(10)
+            self.assertEqual(ingestion.drain(queue, 1000), 1)
+            self.assertEqual(len(queue), 0)
+            # ack 전에 drain 이 끊겨 같은 설문을 다시 읽더라도 중복으로 들어가지 않습니다.
+            queue.put(payload)
+            self.assertEqual(ingestion.drain(queue, 1000), 1)
+            self.assertEqual(SurveyResult.objects.count(), self.rows + 1)
+            self.assertEqual(SurveyResult.objects.latest('id').user_id, self.user.id)
+
+    def test_survey_batch(self):
+        item = {
+            'python': 3, 'rdb': 2, 'programming': 4, 'major': '컴퓨터공학부', 'grade': '3학년', 'backend_reason': 'reason',
+        }
+        items = [dict(item, os='MacOS') for _ in range(50)] + [dict(item, os='Windows'), dict(item, python=7)]
+        response = self.auth_client.post('/api/v1/survey/batch/', items, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()['created']), 51)
+        self.assertEqual(response.json()['errors'][0]['index'], 51)
+
+        # 처음 보는 OS (Windows) 가 생겼으므로 OS 목록을 다시 읽어둡니다.
+        catalog.get_catalog()
+        # 설문 수와 관계없이: 설문 INSERT, id 조회, 통계 UPDATE, 검색 색인 INSERT 2번과 UPDATE, 변경 기록 INSERT,
+        # 버전 UPDATE (+ 테스트 트랜잭션의 SAVEPOINT / RELEASE). 인증은 첫 요청에서 캐시된 유저를 씁니다.
+        with self.assertNumQueries(10):
+            response = self.auth_client.post('/api/v1/survey/batch/', items[:50], content_type='application/json')
+        self.assertEqual(len(response.json()['created']), 50)
+
+    def test_survey_stats(self):
+        # 버전 조회 (ETag), 통계 bucket 조회 (OS 이름은 캐시에서 찾습니다)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/v1/survey/stats/')
+        self.assertEqual(response.json()['total'], self.rows)
+
+    def test_survey_stats_update(self):
+        survey = SurveyResult.objects.order_by('id').first()
+        survey.os = OperatingSystem.objects.create(name='Windows')
+        survey.python = 1 if survey.python == 5 else 5
+        survey.major = '경영학과'
+        survey.save()
+        response = self.client.get('/api/v1/survey/stats/').json()
+        self.assertEqual(response['total'], self.rows)
+        self.assertIn({'id': survey.os_id, 'name': 'Windows', 'count': 1}, response['os'])
+        self.assertEqual(response['major']['경영학과'], 1)
+        # 처음부터 다시 센 결과와 같습니다.
+        stats.rebuild()
+        self.assertEqual(self.client.get('/api/v1/survey/stats/').json(), response)
+
+    def test_survey_list_not_modified(self):
+        etag = self.client.get('/api/v1/survey/')['ETag']
+        # 버전 조회만 하고 목록은 읽지 않습니다.
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/survey/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        SurveyResult.objects.create(os=self.os, python=1, rdb=1, programming=1, major='major', grade='grade')
+        response = self.client.get('/api/v1/survey/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_top_50(self):
+        # 버전 조회, 목록 조회 (OS 는 join)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/v1/template')
+        self.assertEqual(response.status_code, 200)
+        # 렌더링된 목록은 캐시에서 읽습니다.
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/v1/template')
+        newest = SurveyResult.objects.order_by('-timestamp', '-id').first()
+        self.assertContains(response, f'/api/v1/survey/{newest.id}/')
+        self.assertContains(response, '<li>', count=min(self.rows, 50))
+
+        survey = SurveyResult.objects.create(os=self.os, python=1, rdb=1, programming=1, major='major', grade='grade')
+        self.assertContains(self.client.get('/api/v1/template'), f'/api/v1/survey/{survey.id}/')
+
+    def test_os_list(self):
+        # OS API 는 인증이 필요합니다. (인증 시 유저 조회 1회, OS 는 캐시에서 읽습니다)
+        with self.assertNumQueries(1):
+            response = self.auth_client.get('/api/v1/os/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_os_cache_invalidation(self):
+        OperatingSystem.objects.create(name='Windows')
+        response = self.auth_client.get('/api/v1/os/')
+        self.assertEqual([os['name'] for os in response.json()], ['MacOS', 'Windows'])
+
+    def test_os_list_not_modified(self):
+        etag = self.auth_client.get('/api/v1/os/')['ETag']
+        # 인증도 캐시된 토큰과 유저로 끝나므로 DB 를 전혀 읽지 않습니다.
+        with self.assertNumQueries(0):
+            response = self.auth_client.get('/api/v1/os/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_os_retrieve(self):
+        # OS API 는 인증이 필요합니다. (인증 시 유저 조회 1회, OS 는 캐시에서 읽습니다)
+        with self.assertNumQueries(1):
+            response = self.auth_client.get(f'/api/v1/os/{self.os.id}/')
+        self.assertEqual(response.status_code, 200)
+
+
+class SurveyQueryBudgetOneRowTest(SurveyQueryBudgetMixin, TestCase):
+    rows = 1
+
+
+class SurveyQueryBudgetHundredRowsTest(SurveyQueryBudgetMixin, TestCase):
+    rows = 100
+
+
+class SurveyQueryBudgetTenThousandRowsTest(SurveyQueryBudgetMixin, TestCase):
+    rows = 10000
+
+
+class FastSerializerTest(TestCase):
+    # survey.fast_serializers 는 SurveyResultSerializer 와 똑같은 결과를 내야 합니다.
+
+    @classmethod
+    def setUpTestData(cls):
+        os = OperatingSystem.objects.create(name='MacOS', price=300000, description='mac')
+        cls.user = User.objects.create_user(email='waffle@waffle.com', password='password', username='waffle')
+        cls.survey = SurveyResult.objects.create(
+            os=os, user=cls.user, python=3, rdb=2, programming=4, major='컴퓨터공학부', grade='3학년',
+            backend_reason='reason', say_something='안녕하세요',
+        )
+        # OS 가 지워졌거나 유저 없이 import 된 설문
+        SurveyResult.objects.create(os=None, user=None, python=1, rdb=1, programming=1, major='', grade='')
+
+    def test_same_as_serializer(self):
+        surveys = SurveyResult.objects.order_by('id')
+        expected = SurveyResultSerializer(surveys.select_related('os', 'user'), many=True).data
+        rows = surveys.values_list(*survey_result_serializer.columns)
+        self.assertEqual(survey_result_serializer.to_representation(rows), expected)
+        # orjson 으로 렌더링해도 JSONRenderer 와 같은 byte 가 나옵니다.
+        self.assertEqual(FastJSONRenderer().render(expected), JSONRenderer().render(expected))
+
+    def test_renderer_compatibility(self):
+        payloads = [
+            {'text': 'line\u2028separator\u2029paragraph', 'nested': [('tuple', 1, True, None)]},
+            {'floats': [0.5, 1e16, 1e-07, -0.0], 'decimal': Decimal('1.10')},
+            {'at': datetime(2021, 9, 1, 12, 0, 0, 123456, tzinfo=dt_timezone.utc), 'big': 2 ** 70, 1: 'int key'},
+        ]
+        for payload in payloads:
+            self.assertEqual(FastJSONRenderer().render(payload), JSONRenderer().render(payload))
+        # STRICT_JSON (기본값) 이면 둘 다 NaN / Infinity 를 거부합니다.
+        for value in (float('nan'), float('inf')):
+            with self.assertRaises(ValueError):
+                JSONRenderer().render({'value': value})
+            with self.assertRaises(ValueError):
+                FastJSONRenderer().render({'value': value})
+
+    def test_sparse_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/survey/', {'fields': 'id,os.name,timestamp'})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([set(survey) for survey in results], [{'id', 'os', 'timestamp'}] * 2)
+        # OS 가 없는 설문은 OperatingSystemSerializer(None) 처럼 빈 값입니다.
+        self.assertCountEqual([survey['os'] for survey in results], [{'name': 'MacOS'}, {'name': ''}])
+        # 고르지 않은 컬럼은 읽지 않고, user 테이블은 JOIN 하지 않습니다.
+        sql = queries.captured_queries[-1]['sql']
+        self.assertNotIn('backend_reason', sql)
+        self.assertNotIn('user', sql.split('FROM')[1])
+
+    def test_expand(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/v1/survey/{self.survey.id}/', {'expand': 'os'})
+        data = response.json()
+        self.assertEqual(data['os']['name'], 'MacOS')
+        # 펼치지 않은 관계는 id 로만 나옵니다.
+        self.assertEqual(data['user'], self.user.id)
+        self.assertEqual(queries.captured_queries[-1]['sql'].count('JOIN'), 1)  # OS 만 JOIN
+
+        response = self.client.get(f'/api/v1/survey/{self.survey.id}/', {'expand': '', 'fields': 'os,user'})
+        self.assertEqual(response.json(), {'os': self.survey.os_id, 'user': self.user.id})
+
+    def test_unknown_fields(self):
+        for params in ({'fields': 'id,password'}, {'fields': 'os.secret'}, {'expand': 'python'}):
+            response = self.client.get('/api/v1/survey/', params)
+            self.assertEqual(response.status_code, 400)
+
+
+def uses_index(queryset):
+    # EXPLAIN 으로 테이블 (또는 인덱스 전체) 를 훑지 않고 인덱스에서 찾는지 확인합니다.
+    if connection.vendor == 'mysql':
+        access_types = re.findall(r'"access_type": "(\w+)"', queryset.explain(format='json'))
+        return bool(access_types) and not {'ALL', 'index'} & set(access_types)
+    plan = [line for line in queryset.explain().splitlines() if 'survey_surveyresult' in line]
+    return bool(plan) and all('SEARCH' in line and 'INDEX' in line for line in plan)
+
+
+class SurveyFilterTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        mac = OperatingSystem.objects.create(name='MacOS')
+        windows = OperatingSystem.objects.create(name='Windows')
+        start = timezone.now() - timedelta(days=100)
+        SurveyResult.objects.bulk_create([
+            SurveyResult(os=(mac, windows)[i % 2], python=i % 5 + 1, rdb=i // 5 % 5 + 1, programming=i // 25 % 5 + 1,
+                         major=('컴퓨터공학부', '경영학과', '수리과학부')[i % 3], grade=f'{i % 4 + 1}학년',
+                         timestamp=start + timedelta(hours=i))
+            for i in range(2000)
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def filtered(self, params):
+        return filter_surveys(SurveyResult.objects.all(), QueryDict(urlencode(params, doseq=True)))
+
+    def test_filter(self):
+        response = self.client.get('/api/v1/survey/', {
+            'os': 'MacOS', 'python_min': 4, 'grade': '3학년', 'page_size': 1000, 'fields': 'id',
+        })
+        self.assertEqual(response.status_code, 200)
+        expected = SurveyResult.objects.filter(os__name='MacOS', python__gte=4, grade='3학년')
+        self.assertCountEqual([survey['id'] for survey in response.json()['results']],
+                              expected.values_list('id', flat=True))
+
+        since = SurveyResult.objects.order_by('timestamp')[10].timestamp
+        self.assertEqual(self.filtered({'since': since, 'until': since + timedelta(hours=5)}).count(), 5)
+        self.assertEqual(self.filtered({'major': ['경영학과', '수리과학부'], 'rdb_min': 2, 'rdb_max': 3}).count(),
+                         SurveyResult.objects.exclude(major='컴퓨터공학부').filter(rdb__in=(2, 3)).count())
+
+    def test_invalid_filter(self):
+        for params in ({'python_min': 6}, {'rdb_max': 'high'}, {'since': 'yesterday'}):
+            response = self.client.get('/api/v1/survey/', params)
+            self.assertEqual(response.status_code, 400)
+
+    def test_filters_use_index(self):
+        if connection.vendor not in ('mysql', 'sqlite'):
+            self.skipTest('EXPLAIN format')
+        for params in (
+            {'os': 'MacOS'}, {'major': '경영학과'}, {'grade': '3학년'}, {'python_min': 4}, {'rdb_max': 2},
+            {'programming_min': 2, 'programming_max': 3}, {'since': timezone.now() - timedelta(days=50)},
+            {'os': 'MacOS', 'python_min': 4, 'grade': '3학년'},
+        ):
+            # 목록 API 와 같은 정렬, 같은 LIMIT
+            queryset = self.filtered(params).order_by(*KEYSET_ORDERING)[:101]
+            self.assertTrue(uses_index(queryset), f'{params}: {queryset.explain()}')
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class CatalogReplicaTest(TransactionTestCase):
+    databases = '__all__'
+
+    def test_catalog_from_primary(self):
+        cache.clear()
+        authentication.clear()
+        OperatingSystem.objects.create(name='MacOS')
+        user = User.objects.create_user(email='waffle@waffle.com', password='password', username='waffle')
+        client = Client(HTTP_AUTHORIZATION=f'JWT {jwt_token_of(user)}')
+        # replica 로 보낸 요청이라도 캐시에 넣을 OS 목록과 버전은 primary 에서 읽습니다.
+        with CaptureQueriesContext(connections['replica1']) as replica, \
+                CaptureQueriesContext(connections['default']) as primary:
+            response = client.get('/api/v1/os/')
+        self.assertEqual([os['name'] for os in response.json()], ['MacOS'])
+        tables = (OperatingSystem._meta.db_table, ResourceVersion._meta.db_table)
+        self.assertFalse([query for query in replica if any(table in query['sql'] for table in tables)])
+        self.assertEqual(len(primary), 2)
+
+
+class SurveyImportTest(TestCase):
+    # download_survey 가 쓰는 survey.importer.SurveyImporter 와 survey.tsv 의 파싱
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = f'{directory.name}/surveys.tsv'
+        cache.clear()
+
+    def line(self, i, say_something=None):
+        return '\t'.join([
+            f'2021-09-{i % 28 + 1:02d} 12:00:00', 'MacOS', '3', '2', '4', '컴퓨터공학부', '3학년', f'reason {i}', 'waffle',
+            say_something or f'say {i}',
+        ])
+
+    def write(self, lines, mode='w'):
+        with open(self.path, mode, encoding='utf-8') as f:
+            if mode == 'w':
+                f.write('timestamp\tos\tpython\trdb\tprogramming\tmajor\tgrade\tbackend_reason\twaffle_reason\t'
+                        'say_something\n')
+            f.write(''.join(lines))
+
+    def test_batches(self):
+        self.write([self.line(i) + '\n' for i in range(5)])
+        with CaptureQueriesContext(connection) as queries:
+            importer = SurveyImporter(batch_size=2)
+            importer.run(self.path)
+        table = connection.ops.quote_name(SurveyResult._meta.db_table)
+        inserts = [query for query in queries if query['sql'].startswith(f'INSERT INTO {table}')]
+        # 2 + 2 + 1 행을 bulk INSERT 세 번으로
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual(importer.imported, 5)
+        self.assertEqual(SurveyResult.objects.count(), 5)
+        self.assertEqual(SurveyChange.objects.count(), 5)
+
+        # checkpoint 를 무시하고 다시 읽어도 이미 있는 행은 fingerprint 로 건너뜁니다.
+        importer = SurveyImporter(batch_size=2)
+        importer.run(self.path, resume=False)
+        self.assertEqual((importer.imported, importer.skipped), (0, 5))
+        self.assertEqual(SurveyResult.objects.count(), 5)
+
+    def test_resume_after_failure(self):
+        self.write([self.line(i) + '\n' for i in range(5)])
+
+        class FailingImporter(SurveyImporter):
+            def write(self, rows, offset):
+                if self.imported:
+                    raise RuntimeError('interrupted')
+                super().write(rows, offset)
+
+        with self.assertRaises(RuntimeError):
+            FailingImporter(batch_size=2).run(self.path)
+        self.assertEqual(SurveyResult.objects.count(), 2)
+
+        importer = SurveyImporter(batch_size=2)
+        importer.run(self.path)
+        self.assertEqual((importer.imported, importer.skipped), (3, 2))
+        self.assertEqual(sorted(SurveyResult.objects.values_list('say_something', flat=True)),
+                         [f'say {i}' for i in range(5)])
+
+    def test_resume_appended(self):
+        self.write([self.line(i) + '\n' for i in range(3)])
+        SurveyImporter().run(self.path)
+        size = os.path.getsize(self.path)
+
+        self.write([self.line(i) + '\n' for i in range(3, 5)], mode='a')
+        importer = SurveyImporter()
+        importer.run(self.path)
+        # 처음부터 다시 읽지 않고 지난번에 끝난 곳부터 읽습니다.
+        self.assertEqual(importer.resumed_from, size)
+        self.assertEqual((importer.imported, importer.skipped), (2, 0))
+        self.assertEqual(SurveyResult.objects.count(), 5)
+
+    def test_truncated_tail(self):
+        # 아직 쓰이는 중인 마지막 줄 (줄바꿈 없음) 도 파싱할 수 있으면 넣지만,
+        self.write([self.line(0) + '\n', self.line(1, say_something='unfin')])
+        SurveyImporter().run(self.path)
+        self.assertEqual(sorted(SurveyResult.objects.values_list('say_something', flat=True)), ['say 0', 'unfin'])
+
+        # 줄이 마저 쓰여 달라졌다면 다음 실행에서 지우고 완성된 줄로 바꿉니다.
+        self.write([self.line(0) + '\n', self.line(1, say_something='unfinished') + '\n', self.line(2) + '\n'])
+        importer = SurveyImporter()
+        importer.run(self.path)
+        self.assertEqual(importer.imported, 2)
+        self.assertEqual(sorted(SurveyResult.objects.values_list('say_something', flat=True)),
+                         ['say 0', 'say 2', 'unfinished'])
+
+    def test_parallel_parse(self):
+        self.write([self.line(i) + '\n' for i in range(50)] + [self.line(50)])
+        with open(self.path, 'rb') as f:
+            start = len(f.readline())
+        # 구간을 작게 나눠 여러 worker 가 나눠 파싱해도 결과와 순서는 같습니다.
+        tasks = [(self.path, begin, end) for begin, end in split_ranges(self.path, start, range_bytes=500)]
+        self.assertGreater(len(tasks), 4)
+        parallel = list(parse_ranges(tasks, workers=3))
+        self.assertEqual(parallel, list(parse_ranges(tasks, workers=1)))
+        rows = [row for rows, _, _ in parallel for row in rows]
+        self.assertEqual([row['say_something'] for row in rows], [f'say {i}' for i in range(51)])
+        self.assertEqual(parallel[-1][2], rows[-1]['fingerprint'])
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class SurveyExportTest(TransactionTestCase):
+    # 응답을 다 읽기 전에 요청이 끝나므로, replica 에서 읽는지 보려면 트랜잭션 없이 실행해야 합니다.
+    databases = '__all__'
+
+    def setUp(self):
+        cache.clear()
+        os = OperatingSystem.objects.create(name='MacOS')
+        for i in range(3):
+            SurveyResult.objects.create(
+                os=os, python=i + 1, rdb=2, programming=4, major='컴퓨터공학부', grade='3학년', backend_reason='reason',
+                waffle_reason='waffle, "quoted"', say_something=f'say {i}',
+                timestamp=timezone.make_aware(datetime(2021, 9, i + 1, 12)),
+            )
+
+    def export(self, fmt):
+        response = self.client.get(f'/api/v1/survey/export/{fmt}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="surveys.{fmt}"')
+        with CaptureQueriesContext(connections['replica1']) as replica, \
+                CaptureQueriesContext(connections['default']) as primary:
+            content = b''.join(response.streaming_content).decode()
+        # 본문은 요청이 끝난 뒤에 읽히지만 요청에서 정한 replica 를 씁니다.
+        self.assertEqual(len(replica), 1)
+        self.assertEqual(len(primary), 0)
+        return response, content
+
+    def test_csv(self):
+        response, content = self.export('csv')
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.reader(content.splitlines()))
+        self.assertEqual(rows, [list(EXPORT_COLUMNS)] + [
+            [f'2021-09-0{i + 1} 12:00:00', 'MacOS', str(i + 1), '2', '4', '컴퓨터공학부', '3학년', 'reason',
+             'waffle, "quoted"', f'say {i}']
+            for i in reversed(range(3))
+        ])
+
+    def test_ndjson(self):
+        response, content = self.export('ndjson')
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson; charset=utf-8')
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual([row['say_something'] for row in rows], ['say 2', 'say 1', 'say 0'])
+        self.assertEqual(rows[0], {
+            'timestamp': '2021-09-03 12:00:00', 'os': 'MacOS', 'python': 3, 'rdb': 2, 'programming': 4,
+            'major': '컴퓨터공학부', 'grade': '3학년', 'backend_reason': 'reason', 'waffle_reason': 'waffle, "quoted"',
+            'say_something': 'say 2',
+        })
+
+
+class SurveyWriteTest(TransactionTestCase):
+    # 설문과 signal 이 쓰는 요약 테이블들이 함께 커밋되는지 (또는 함께 롤백되는지) 보려면 실제로 커밋해야 합니다.
+
+    def setUp(self):
+        cache.clear()
+        authentication.clear()
+        OperatingSystem.objects.create(name='MacOS')
+        self.user = User.objects.create_user(email='waffle@waffle.com', password='password', username='waffle')
+        self.client = Client(HTTP_AUTHORIZATION=f'JWT {jwt_token_of(self.user)}', raise_request_exception=False)
+
+    def counts(self):
+        return SurveyResult.objects.count(), SurveyChange.objects.count(), SurveySearchPosting.objects.count()
+
+    def test_create_rolled_back(self):
+        data = {'os': 'MacOS', 'python': 3, 'rdb': 2, 'programming': 4, 'major': '컴퓨터공학부', 'grade': '3학년',
+                'backend_reason': 'reason'}
+        with mock.patch('survey.changes.record', side_effect=DatabaseError('lock wait timeout')):
+            response = self.client.post('/api/v1/survey/', data)
+        self.assertEqual(response.status_code, 500)
+        # 변경 기록을 쓰지 못했다면 설문도 저장되지 않습니다.
+        self.assertEqual(self.counts(), (0, 0, 0))
+
+        self.assertEqual(self.client.post('/api/v1/survey/', data).status_code, 201)
+        self.assertEqual(self.counts()[:2], (1, 1))
+
+    def test_stats_rolled_back(self):
+        os = OperatingSystem.objects.get()
+        survey = SurveyResult.objects.create(os=os, python=3, rdb=3, programming=3, major='컴퓨터공학부', grade='3학년')
+        buckets = set(SurveyStatBucket.objects.values_list('dimension', 'key', 'count'))
+        # bucket UPDATE 가 실패하면 (잠금 대기 시간 초과 등) 설문의 추가와 수정도 저장되지 않습니다.
+        with mock.patch('survey.stats.increment', side_effect=DatabaseError('lock wait timeout')):
+            with self.assertRaises(DatabaseError):
+                SurveyResult.objects.create(os=os, python=1, rdb=1, programming=1, major='경영학과', grade='1학년')
+            survey.major = '경영학과'
+            with self.assertRaises(DatabaseError):
+                survey.save()
+        self.assertEqual(list(SurveyResult.objects.values_list('major', flat=True)), ['컴퓨터공학부'])
+        self.assertEqual(set(SurveyStatBucket.objects.values_list('dimension', 'key', 'count')), buckets)
+
+
+class SurveyIngestionTest(TransactionTestCase):
+    # SURVEY_INGESTION_MODE='queue' 의 로컬 큐를 DB 로 옮기는 drain.
+    # 관계 (FK) 오류는 SQLite 에서 커밋할 때 확인되므로 TransactionTestCase 를 씁니다.
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        queue_path = override_settings(SURVEY_INGESTION_QUEUE_PATH=f'{directory.name}/queue.sqlite3')
+        queue_path.enable()
+        self.addCleanup(queue_path.disable)
+        cache.clear()
+        OperatingSystem.objects.create(name='MacOS')
+        self.user = User.objects.create_user(email='waffle@waffle.com', password='password', username='waffle')
+        self.queue = ingestion.get_queue()
+
+    def payload(self, **fields):
+        payload = {
+            'os_name': 'MacOS', 'python': 3, 'rdb': 2, 'programming': 4, 'major': '컴퓨터공학부', 'grade': '3학년',
+            'backend_reason': 'reason', 'user_id': self.user.id, 'timestamp': timezone.now().isoformat(),
+            'fingerprint': uuid.uuid4().hex,
+        }
+        payload.update(fields)
+        return payload
+
+    def test_failed_surveys(self):
+        good = [self.payload(say_something='first'), self.payload(say_something='last')]
+        self.queue.put(good[0])
+        invalid = self.queue.put(self.payload(python=9))
+        missing = self.queue.put({key: value for key, value in self.payload().items() if key != 'os_name'})
+        orphan = self.queue.put(self.payload(user_id=self.user.id + 1))
+        self.queue.put(good[1])
+
+        # 저장할 수 없는 설문은 failed 테이블로 옮기고, 나머지는 저장합니다.
+        self.assertEqual(ingestion.drain(self.queue, 100), 5)
+        self.assertEqual(len(self.queue), 0)
+        self.assertEqual(sorted(SurveyResult.objects.values_list('say_something', flat=True)), ['first', 'last'])
+        failed = self.queue.failed(10)
+        self.assertEqual([pk for pk, _, _ in failed], [invalid, missing, orphan])
+        self.assertIn('python', failed[0][2])
+        self.assertIn('os_name', failed[1][2])
+        self.assertIn('IntegrityError', failed[2][2])
+        self.assertEqual(failed[0][1]['python'], 9)
+        self.assertEqual(ingestion.drain(self.queue, 100), 0)
+
+    def test_command_retries(self):
+        self.queue.put(self.payload())
+        drain, calls = ingestion.drain, []
+
+        def flaky_drain(queue, batch_size):
+            calls.append(batch_size)
+            if len(calls) == 1:
+                raise OperationalError('server has gone away')
+            return drain(queue, batch_size)
+
+        stderr = StringIO()
+        with mock.patch.object(ingestion, 'drain', flaky_drain), \
+                mock.patch('survey.management.commands.drain_survey_queue.close_old_connections') as close:
+            call_command('drain_survey_queue', '--once', '--interval=0', stdout=StringIO(), stderr=stderr)
+        # DB 오류가 나도 멈추지 않고, drain 할 때마다 앞뒤로 연결을 정리합니다.
+        self.assertIn('retrying', stderr.getvalue())
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(close.call_count, 2 * len(calls))
+        self.assertEqual(SurveyResult.objects.count(), 1)
+
+
+class SurveySearchTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.os = OperatingSystem.objects.create(name='MacOS')
+        stats.rebuild()
+
+    def setUp(self):
+        cache.clear()
+        catalog.get_catalog()
+
+    def create(self, **fields):
+        return SurveyResult.objects.create(os=self.os, python=3, rdb=3, programming=3, major='컴퓨터공학부', grade='3학년',
+                                           **fields)
+
+    def search(self, query):
+        return [survey['id'] for survey in self.client.get('/api/v1/survey/search/', {'q': query}).json()['results']]
+
+    def index(self):
+        postings = SurveySearchPosting.objects.values_list('token', 'survey_id', 'count')
+        return set(postings), dict(SurveySearchTerm.objects.filter(document_count__gt=0).values_list('token', 'document_count'))
+
+    def test_tokenize(self):
+        self.assertEqual(list(search.tokenize('백엔드 Django가 좋아요!! REST-API')),
+                         ['백엔', '엔드', 'django', '가', '좋아', '아요', 'rest', 'api'])
+
+    def test_search(self):
+        django = self.create(backend_reason='Django 로 백엔드 개발, 앱 개발을 해보고 싶어서', say_something='Django Django')
+        backend = self.create(backend_reason='백엔드 개발자가 되고 싶어서')
+        self.create(backend_reason='서버 공부', waffle_reason='재미있을 것 같아서')
+
+        # 모든 토큰이 나오는 설문만, tf-idf 순으로 ('개발' 이 두 번 나오는 설문이 먼저)
+        self.assertEqual(self.search('백엔드 개발'), [django.id, backend.id])
+        self.assertEqual(self.search('django'), [django.id])
+        self.assertEqual(self.search('백엔드 서버'), [])
+        self.assertEqual(self.search('없는말'), [])
+        self.assertEqual(self.client.get('/api/v1/survey/search/', {'q': ' '}).status_code, 400)
+
+        # 색인은 설문이 지워지고 import 될 때도 갱신됩니다.
+        django.delete()
+        self.assertEqual(self.search('백엔드'), [backend.id])
+        with transaction.atomic():
+            insert_surveys([SurveyResult(os=self.os, python=1, rdb=1, programming=1, major='', grade='',
+                                         backend_reason='Django', fingerprint='imported')])
+        self.assertEqual(self.search('Django'), [SurveyResult.objects.get(fingerprint='imported').id])
+
+        # 다시 만든 색인과 같아야 합니다.
+        incremental = self.index()
+        search.rebuild()
+        self.assertEqual(self.index(), incremental)
+
+    def test_search_queries(self):
+        for i in range(30):
+            self.create(backend_reason=f'백엔드 개발 {i}')
+        # 테이블 크기와 관계없이: 버전 조회 (ETag), 토큰별 설문 수, 전체 설문 수, 가장 드문 토큰의 posting,
+        # 나머지 토큰의 posting, 설문 조회
+        with self.assertNumQueries(6):
+            response = self.client.get('/api/v1/survey/search/', {'q': '백엔드 개발', 'page_size': 10})
+        self.assertEqual(response.json()['count'], 30)
+        self.assertEqual(len(response.json()['results']), 10)
+        self.assertFalse(response.json()['truncated'])
+
+    def test_accent_insensitive_collation(self):
+        survey = self.create(backend_reason='e 커피')
+        other = self.create(backend_reason='e')
+        # MySQL 의 기본 collation 처럼 'é' 로 찾으면 색인된 'e' 행이 돌아오는 경우
+        terms = mock.MagicMock()
+        terms.filter.return_value.values_list.return_value = [('e', 2), ('커피', 1)]
+        postings = mock.MagicMock()
+        postings.filter.return_value.order_by.return_value.values_list.return_value.__getitem__.return_value = [
+            (survey.id, 1)]
+        postings.filter.return_value.values_list.return_value = [(survey.id, 'e', 1)]
+        with mock.patch.object(SurveySearchTerm, 'objects', terms), \
+                mock.patch.object(SurveySearchPosting, 'objects', postings):
+            self.assertEqual(search.search('é 커피'), ([survey.id], False))
+            postings.filter.return_value.order_by.return_value.values_list.return_value.__getitem__.return_value = [
+                (other.id, 1), (survey.id, 1)]
+            self.assertEqual(search.search('é'), ([other.id, survey.id], False))
+
+    @override_settings(SURVEY_SEARCH_MAX_CANDIDATES=5)
+    def test_search_truncated(self):
+        surveys = [self.create(backend_reason=f'백엔드 개발 {i}') for i in range(8)]
+        # 가장 드문 토큰의 최신 설문 5개만 후보가 되고, 잘렸다는 것을 응답에 알립니다.
+        response = self.client.get('/api/v1/survey/search/', {'q': '백엔드'}).json()
+        self.assertEqual(response['count'], 5)
+        self.assertTrue(response['truncated'])
+        self.assertEqual({survey['id'] for survey in response['results']}, {survey.id for survey in surveys[3:]})
+        response = self.client.get('/api/v1/survey/search/', {'q': '백엔드 7'}).json()
+        self.assertEqual((response['count'], response['truncated']), (1, False))
+
+
+class CrosstabTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.mac = OperatingSystem.objects.create(name='MacOS')
+        windows = OperatingSystem.objects.create(name='Windows')
+        start = timezone.now() - timedelta(days=30)
+        SurveyResult.objects.bulk_create([
+            SurveyResult(os=(cls.mac, windows, None)[i % 3], python=i % 5 + 1, rdb=i // 5 % 5 + 1,
+                         programming=i * 7 % 5 + 1, major=('컴퓨터공학부', '경영학과')[i % 2], grade=f'{i % 4 + 1}학년',
+                         timestamp=start + timedelta(hours=i * 5))
+            for i in range(120)
+        ])
+        stats.rebuild()
+
+    def setUp(self):
+        cache.clear()
+        analytics.clear()
+
+    def crosstab(self, **params):
+        response = self.client.get('/api/v1/survey/crosstab/', params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_mean(self):
+        result = self.crosstab(rows='major', columns='grade', aggregate='mean', value='programming')
+        expected = {
+            (row['major'], row['grade']): row['mean']
+            for row in SurveyResult.objects.values('major', 'grade').annotate(mean=Avg('programming')).order_by()
+        }
+        for major, cells in zip(result['rows']['labels'], result['cells']):
+            for grade, cell in zip(result['columns']['labels'], cells):
+                # 설문이 없는 칸은 null
+                if (major, grade) in expected:
+                    self.assertAlmostEqual(cell, expected[major, grade], places=5)
+                else:
+                    self.assertIsNone(cell)
+        self.assertEqual(result['total'], 120)
+
+    def test_share_and_filters(self):
+        result = self.crosstab(rows='week', columns='os', normalize='rows')
+        self.assertCountEqual(result['columns']['labels'], ['MacOS', 'Windows', None])
+        for cells in result['cells']:
+            self.assertAlmostEqual(sum(cells), 1, places=5)
+
+        # 목록과 같은 필터
+        result = self.crosstab(rows='os', os='MacOS', python_min=4)
+        self.assertEqual(result['rows']['labels'], ['MacOS'])
+        self.assertEqual(result['cells'], [SurveyResult.objects.filter(os=self.mac, python__gte=4).count()])
+
+    def test_incremental_snapshot(self):
+        self.crosstab(rows='grade')
+        SurveyResult.objects.create(os=self.mac, python=5, rdb=5, programming=5, major='수리과학부', grade='졸업')
+        # 버전 조회 (ETag), 버전 조회, 스냅샷 뒤의 변경 기록, 바뀐 설문만 읽기
+        with self.assertNumQueries(4):
+            result = self.crosstab(rows='major')
+        self.assertEqual(result['total'], 121)
+        self.assertIn('수리과학부', result['rows']['labels'])
+
+        # 바뀌지 않았다면 스냅샷을 그대로 씁니다.
+        with self.assertNumQueries(2):
+            self.crosstab(rows='grade', columns='python')
+
+        # 설문 수가 그대로인 변경 (수정, 삭제 + 추가) 도 변경 기록으로 찾아 반영합니다.
+        first = SurveyResult.objects.order_by('id').first()
+        first.major = '물리학과'
+        first.save()
+        result = self.crosstab(rows='major')
+        self.assertEqual(result['cells'][result['rows']['labels'].index('물리학과')], 1)
+        SurveyResult.objects.get(major='수리과학부').delete()
+        SurveyResult.objects.create(os=self.mac, python=1, rdb=1, programming=1, major='자유전공학부', grade='1학년')
+        result = self.crosstab(rows='major')
+        self.assertEqual(result['total'], 121)
+        self.assertCountEqual(result['rows']['labels'], ['컴퓨터공학부', '경영학과', '자유전공학부', '물리학과'])
+        self.assertEqual(result['cells'][result['rows']['labels'].index('물리학과')], 1)
+        # id 순서도 그대로입니다.
+        ids = analytics.get_snapshot().ids
+        self.assertEqual(list(ids), sorted(ids))
+
+    def test_invalid(self):
+        for params in ({}, {'rows': 'name'}, {'rows': 'os', 'columns': 'os'}, {'rows': 'os', 'aggregate': 'mean'},
+                       {'rows': 'os', 'aggregate': 'sum', 'value': 'rdb', 'normalize': 'rows'}):
+            self.assertEqual(self.client.get('/api/v1/survey/crosstab/', params).status_code, 400)
+
+
+class SurveyChangesTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.os = OperatingSystem.objects.create(name='MacOS')
+
+    def create(self, **fields):
+        return SurveyResult.objects.create(os=self.os, python=3, rdb=3, programming=3, major='컴퓨터공학부', grade='3학년',
+                                           **fields)
+
+    def changes(self, cursor=None, **params):
+        if cursor is not None:
+            params['cursor'] = cursor
+        response = self.client.get('/api/v1/survey/changes/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_changes(self):
+        first, second = self.create(), self.create()
+        feed = self.changes()
+        self.assertEqual([(change['type'], change['id']) for change in feed['changes']],
+                         [('created', first.id), ('created', second.id)])
+        self.assertEqual(feed['changes'][0]['survey']['os']['name'], 'MacOS')
+        self.assertFalse(feed['has_more'])
+        cursor = feed['cursor']
+
+        # cursor 뒤의 변경만, 지워진 설문은 id 만 (tombstone)
+        second.say_something = 'hello'
+        second.save()
+        deleted_id = first.id
+        first.delete()
+        with transaction.atomic():
+            insert_surveys([SurveyResult(os=self.os, python=1, rdb=1, programming=1, major='', grade='', fingerprint='a')])
+        feed = self.changes(cursor, fields='say_something')
+        imported = SurveyResult.objects.get(fingerprint='a')
+        self.assertEqual(feed['changes'], [
+            {'type': 'updated', 'id': second.id, 'survey': {'say_something': 'hello'}},
+            {'type': 'deleted', 'id': deleted_id},
+            {'type': 'created', 'id': imported.id, 'survey': {'say_something': ''}},
+        ])
+        self.assertEqual(self.changes(feed['cursor'])['changes'], [])
+
+    def test_bounded_batches(self):
+        for _ in range(5):
+            self.create()
+        cursor, received = None, []
+        while True:
+            # 버전 조회 없이: 변경 기록, 설문 조회
+            with self.assertNumQueries(2):
+                feed = self.changes(cursor, page_size=2)
+            received += [change['id'] for change in feed['changes']]
+            cursor = feed['cursor']
+            if not feed['has_more']:
+                break
+        self.assertEqual(received, list(SurveyResult.objects.order_by('id').values_list('id', flat=True)))
+
+    def test_uncommitted_gap(self):
+        first = self.create()
+        gap = SurveyChange.objects.create(survey_id=0, kind=SurveyChange.CREATED)
+        self.create()
+        # 앞 seq 의 트랜잭션이 아직 커밋되지 않은 것처럼, 빈 자리 뒤의 최근 기록은 기다립니다.
+        gap.delete()
+        self.assertEqual([change['id'] for change in self.changes()['changes']], [first.id])
+        with override_settings(SURVEY_CHANGES_SETTLE_SECONDS=0):
+            self.assertEqual(len(self.changes()['changes']), 2)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/v1/survey/changes/', {'cursor': 'nope'}).status_code, 404)
+
+
+class AsyncReadTest(TransactionTestCase):
+    # async 뷰의 DB 작업은 다른 스레드에서 실행되므로, 그 스레드가 데이터를 볼 수 있도록 트랜잭션을 커밋합니다.
+    # replica 가 설정되어 있으면 GET 은 replica (테스트에서는 default 의 mirror) 에서 읽습니다.
+    databases = '__all__'
+
+    def setUp(self):
+        os = OperatingSystem.objects.create(name='MacOS', price=300000)
+        self.user = User.objects.create_user(email='waffle@waffle.com', password='password', username='waffle')
+        for i in range(3):
+            SurveyResult.objects.create(os=os, user=self.user, python=3, rdb=2, programming=4, major='컴퓨터공학부',
+                                        grade='3학년', backend_reason='reason', waffle_reason='waffle', say_something=str(i))
+        self.survey = SurveyResult.objects.first()
+        cache.clear()
+        authentication.clear()
+
+    async def test_survey_list(self):
+        client = AsyncClient()
+        # Django 3.2 의 AsyncClient 는 data 인자와 HTTP_* 헤더를 제대로 넘기지 못하므로 URL 과 헤더 이름을 직접 씁니다.
+        response = await client.get('/api/v1/async/survey/?page_size=2')
+        self.assertEqual(response.status_code, 200)
+        # sync 버전과 같은 응답을 돌려줍니다.
+        expected = (await sync_to_async(Client().get)('/api/v1/survey/', {'page_size': 2})).json()
+        self.assertEqual(response.json()['results'], expected['results'])
+
+        response = await client.get(response.json()['next'])
+        self.assertEqual(len(response.json()['results']), 1)
+
+        response = await client.get('/api/v1/async/survey/', if_none_match=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    async def test_survey_retrieve(self):
+        response = await AsyncClient().get(f'/api/v1/async/survey/{self.survey.id}/')
+        self.assertEqual(response.json()['id'], self.survey.id)
+        response = await AsyncClient().get('/api/v1/async/survey/0/')
+        self.assertEqual(response.status_code, 404)
+
+    async def test_os(self):
+        self.assertEqual((await AsyncClient().get('/api/v1/async/os/')).status_code, 401)
+        client, token = AsyncClient(), f'JWT {jwt_token_of(self.user)}'
+        response = await client.get('/api/v1/async/os/', authorization=token)
+        print(response.status_code, response.content); self.assertEqual([os['name'] for os in response.json()], ['MacOS'])
+        response = await client.get(f"/api/v1/async/os/{response.json()[0]['id']}/", authorization=token)
+        self.assertEqual(response.json()['name'], 'MacOS')
+
+    async def test_top_50(self):
+        response = await AsyncClient().get('/api/v1/async/template')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, f'/api/v1/survey/{self.survey.id}/')
+
+
+class EventStream:
+    """Drive survey.events' ASGI app like a client that reads the stream (send() blocks while `paused` is clear)."""
+
+    def __init__(self, headers=(), method='GET', application=None):
+        self.scope = {'type': 'http', 'method': method, 'path': SURVEY_EVENTS_PATH, 'query_string': b'',
+                      'headers': [(name.encode(), value.encode()) for name, value in headers]}
+        self.messages = asyncio.Queue()
+        self.disconnected = asyncio.Event()
+        self.reading = asyncio.Event()
+        self.reading.set()
+        self.task = asyncio.ensure_future((application or survey_events_app)(self.scope, self.receive, self.send))
+
+    async def receive(self):
+        await self.disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        await self.reading.wait()
+        await self.messages.put(message)
+
+    async def start(self):
+        return await asyncio.wait_for(self.messages.get(), 5)
+
+    async def event(self):
+        """The next `event: survey` of the stream as (id, survey), skipping comments and the retry line."""
+        while True:
+            message = await asyncio.wait_for(self.messages.get(), 5)
+            if message['body'].startswith(b'id: '):
+                fields = dict(line.split(': ', 1) for line in message['body'].decode().strip().split('\n'))
+                return int(fields['id']), json.loads(fields['data'])
+
+    async def close(self):
+        self.disconnected.set()
+        await asyncio.wait_for(self.task, 5)
+
+
+@override_settings(SURVEY_EVENTS_POLL_INTERVAL=0.01)
+class SurveyEventsTest(TransactionTestCase):
+    # 스트림은 DB 를 다른 스레드에서 읽으므로 TransactionTestCase 를 씁니다.
+    # flush 는 seq 를 되돌리지 않으므로, 빈 테이블에서 시작한 스트림이 seq 의 빈 자리를 기다리지 않게 합니다.
+    reset_sequences = True
+
+    def setUp(self):
+        self.os = OperatingSystem.objects.create(name='MacOS')
+
+    def create(self):
+        return SurveyResult.objects.create(os=self.os, python=3, rdb=3, programming=3, major='컴퓨터공학부', grade='3학년')
+
+    async def test_stream(self):
+        stream = EventStream(application=asgi.application)
+        start = await stream.start()
+        self.assertEqual(start['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream; charset=utf-8'), start['headers'])
+        await asyncio.wait_for(broadcaster.started.wait(), 5)
+
+        survey = await sync_to_async(self.create)()
+        seq, data = await stream.event()
+        self.assertEqual(data['id'], survey.id)
+        self.assertEqual(data['os']['name'], 'MacOS')
+        self.assertEqual(seq, await sync_to_async(lambda: SurveyChange.objects.get(survey_id=survey.id).seq)())
+        await stream.close()
+        self.assertEqual(broadcaster.subscribers, set())
+
+        stream = EventStream(method='POST')
+        self.assertEqual((await stream.start())['status'], 405)
+
+    async def test_resume(self):
+        first, second = await sync_to_async(self.create)(), await sync_to_async(self.create)()
+        first_seq = await sync_to_async(lambda: SurveyChange.objects.get(survey_id=first.id).seq)()
+        # 다시 연결하면 Last-Event-ID 뒤의 설문부터, 빠짐없이 한 번씩 받습니다.
+        stream = EventStream(headers=[('last-event-id', str(first_seq))])
+        await stream.start()
+        self.assertEqual((await stream.event())[1]['id'], second.id)
+        third = await sync_to_async(self.create)()
+        self.assertEqual((await stream.event())[1]['id'], third.id)
+        await stream.close()
+
+    @override_settings(SURVEY_EVENTS_QUEUE_SIZE=2)
+    async def test_slow_client(self):
+        fast, slow = EventStream(), EventStream()
+        await fast.start(), await slow.start()
+        await asyncio.wait_for(broadcaster.started.wait(), 5)
+        slow.reading.clear()
+
+        surveys = []
+        for _ in range(5):
+            surveys.append(await sync_to_async(self.create)())
+            self.assertEqual((await fast.event())[1]['id'], surveys[-1].id)
+        # 받지 못하는 클라이언트는 큐가 가득 차면 큐에 남은 이벤트까지 받고 끊기고, 다른 클라이언트는 영향을 받지 않습니다.
+        slow.reading.set()
+        await asyncio.wait_for(slow.task, 5)
+        self.assertEqual([(await slow.event())[1]['id'] for _ in range(2)], [survey.id for survey in surveys[:2]])
+        self.assertEqual(len(broadcaster.subscribers), 1)
+        await fast.close()
+
+    def create_with_gap(self):
+        """Create two surveys with a gap in seq between their changes; return (first, gap seq, second)."""
+        first = self.create()
+        gap = SurveyChange.objects.create(survey_id=0, kind=SurveyChange.CREATED)
+        gap_seq = gap.seq
+        gap.delete()
+        return first, gap_seq, self.create()
+
+    async def test_late_commit(self):
+        _, gap_seq, second = await sync_to_async(self.create_with_gap)()
+        stream = EventStream()
+        await stream.start()
+        await asyncio.wait_for(broadcaster.started.wait(), 5)
+
+        # 연결하기 전의 설문은 받지 않지만, 빈 자리에 나중에 커밋된 변경과 그 뒤의 변경은 받습니다.
+        def commit_into_gap():
+            third = self.create()
+            SurveyChange.objects.filter(survey_id=third.id).update(seq=gap_seq)
+            return third
+        third = await sync_to_async(commit_into_gap)()
+        self.assertEqual([(await stream.event())[1]['id'] for _ in range(2)], [third.id, second.id])
+        await stream.close()
+
+    @override_settings(SURVEY_EVENTS_POLL_INTERVAL=0.05)
+    async def test_resume_at_gap(self):
+        first, _, second = await sync_to_async(self.create_with_gap)()
+        first_seq = await sync_to_async(lambda: SurveyChange.objects.get(survey_id=first.id).seq)()
+        with override_settings(SURVEY_CHANGES_SETTLE_SECONDS=0):
+            other = EventStream()
+            await other.start()
+            await asyncio.wait_for(broadcaster.started.wait(), 5)
+        self.assertEqual(broadcaster.seq, first_seq + 2)
+
+        # Broadcaster 가 이미 지나간 빈 자리에서는, 확정될 때까지 poll 간격마다 다시 읽습니다. (쉬지 않고 읽지 않습니다)
+        calls = []
+
+        async def counting_load_events(seq, *args):
+            calls.append(seq)
+            return await load_events(seq, *args)
+        with mock.patch('survey.events.load_events', counting_load_events):
+            stream = EventStream(headers=[('last-event-id', str(first_seq))])
+            await stream.start()
+            await asyncio.sleep(0.3)
+            self.assertLess(calls.count(first_seq), 15)
+            with override_settings(SURVEY_CHANGES_SETTLE_SECONDS=0):
+                self.assertEqual((await stream.event())[1]['id'], second.id)
+        await stream.close()
+        await other.close()
+
+    @override_settings(SURVEY_EVENTS_QUEUE_SIZE=5)
+    async def test_burst(self):
+        surveys = await sync_to_async(lambda: [self.create() for _ in range(20)])()
+        # 방금 많은 설문이 들어왔어도 새 연결은 끊기지 않고, 연결한 뒤의 설문부터 받습니다.
+        stream = EventStream()
+        await stream.start()
+        await asyncio.wait_for(broadcaster.started.wait(), 5)
+        survey = await sync_to_async(self.create)()
+        self.assertEqual((await stream.event())[1]['id'], survey.id)
+
+        # 밀린 이벤트가 큐보다 많아도 다시 연결한 클라이언트는 DB 에서 읽어 모두 받습니다.
+        first_seq = await sync_to_async(lambda: SurveyChange.objects.get(survey_id=surveys[0].id).seq)()
+        resumed = EventStream(headers=[('last-event-id', str(first_seq))])
+        await resumed.start()
+        received = [(await resumed.event())[1]['id'] for _ in range(20)]
+        self.assertEqual(received, [survey.id for survey in surveys[1:]] + [survey.id])
+        await resumed.close()
+        await stream.close()
+
+
+def route(request, reads=1):
+    """Return (the alias the router reads SurveyResult from while handling `request`, the response)."""
+    routed = []
+
+    def get_response(request):
+        routed.extend(ReplicaRouter().db_for_read(SurveyResult) for _ in range(reads))
+        return HttpResponse()
+
+    response = replica_routing_middleware(get_response)(request)
+    return (routed[0] if reads == 1 else routed), response
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRoutingTest(SimpleTestCase):
+    # 요청마다 router 가 어느 DB 에서 읽으려 하는지만 확인하므로 실제 replica 는 필요 없습니다.
+    # (TestCase 는 테스트를 트랜잭션으로 감싸서 모든 읽기가 primary 로 갑니다)
+
+    def test_reads(self):
+        factory = RequestFactory()
+        self.assertEqual(route(factory.get('/api/v1/survey/'))[0], 'replica1')
+        self.assertEqual(route(factory.get('/api/v1/os/1/'))[0], 'replica1')
+        self.assertEqual(route(factory.get('/api/v1/template'))[0], 'replica1')
+        self.assertEqual(route(factory.get('/api/v1/async/survey/'))[0], 'replica1')
+        # 표시하지 않은 뷰와 쓰기 요청은 primary 를 씁니다.
+        self.assertEqual(route(factory.get('/api/v1/user/me/'))[0], 'default')
+        self.assertEqual(route(factory.post('/api/v1/survey/'))[0], 'default')
+        # 요청 밖 (management command 등) 에서도 primary 를 씁니다.
+        self.assertEqual(ReplicaRouter().db_for_read(SurveyResult), 'default')
+
+    def setUp(self):
+        cache.clear()
+        authentication.clear()
+
+    @override_settings(DATABASE_REPLICAS=['replica1', 'replica2', 'replica3'])
+    def test_one_replica_per_request(self):
+        # 한 요청 안의 읽기 (목록, 개수, 버전 등) 는 모두 같은 replica 에서 합니다.
+        for _ in range(20):
+            routed, _ = route(RequestFactory().get('/api/v1/survey/'), reads=5)
+            self.assertEqual(len(set(routed)), 1)
+            self.assertIn(routed[0], ['replica1', 'replica2', 'replica3'])
+
+    def test_read_your_writes(self):
+        factory = RequestFactory()
+        _, response = route(factory.post('/api/v1/survey/'))
+        self.assertIn(STICKY_COOKIE, response.cookies)
+
+        request = factory.get('/api/v1/survey/')
+        request.COOKIES[STICKY_COOKIE] = response.cookies[STICKY_COOKIE].value
+        self.assertEqual(route(request)[0], 'default')
+
+    def test_read_your_writes_without_cookie(self):
+        factory = RequestFactory()
+        writer = User(id=1, email='writer@waffle.com', username='writer')
+        other = User(id=2, email='other@waffle.com', username='other')
+        request = factory.post('/api/v1/survey/')
+        request.user = writer  # DRF 가 인증한 유저
+        route(request)
+
+        # 쿠키를 보내지 않는 클라이언트도 같은 유저의 토큰이라면 primary 에서 읽습니다.
+        request = factory.get('/api/v1/survey/', HTTP_AUTHORIZATION=f'JWT {jwt_token_of(writer)}')
+        self.assertEqual(route(request)[0], 'default')
+        request = factory.get('/api/v1/survey/', HTTP_AUTHORIZATION=f'JWT {jwt_token_of(other)}')
+        self.assertEqual(route(request)[0], 'replica1')
+        request = factory.get('/api/v1/survey/', HTTP_AUTHORIZATION='JWT invalid')
+        self.assertEqual(route(request)[0], 'replica1')
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRoutingTransactionTest(TestCase):
+
+    def test_transaction(self):
+        # TestCase 가 테스트를 트랜잭션으로 감싸고 있으므로, 방금 쓴 값을 볼 수 있도록 primary 에서 읽습니다.
+        routed, _ = route(RequestFactory().get('/api/v1/survey/'))
+        self.assertEqual(routed, 'default')
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = False
+        self.broken = False
+
+    def ping(self):
+        if self.broken:
+            raise OSError('server has gone away')
+
+
+class ConnectionPoolTest(SimpleTestCase):
+    # waffle_backend.db_pool 의 풀은 DB-API 연결을 만들고 닫는 함수만 받으므로 MySQL 없이 확인합니다.
+
+    def pool(self, **options):
+        options = dict({'max_size': 2, 'timeout': 0.05, 'ping_after': 60, 'max_lifetime': 3600}, **options)
+        return ConnectionPool(ping=FakeConnection.ping, close=lambda connection: setattr(connection, 'closed', True),
+                              **options)
+
+    def test_reuse(self):
+        pool = self.pool()
+        connection = pool.acquire(FakeConnection)
+        self.assertEqual(pool.snapshot()['in_use'], 1)
+        pool.release(connection)
+        self.assertIs(pool.acquire(FakeConnection), connection)
+        snapshot = pool.snapshot()
+        self.assertEqual((snapshot['created'], snapshot['reused'], snapshot['open'], snapshot['idle']), (1, 1, 1, 0))
+
+    def test_max_size(self):
+        pool = self.pool()
+        first, _ = pool.acquire(FakeConnection), pool.acquire(FakeConnection)
+        # 연결이 모두 사용 중이면 timeout 만큼 기다린 뒤 실패합니다.
+        with self.assertRaises(PoolTimeout):
+            pool.acquire(FakeConnection)
+        self.assertEqual(pool.snapshot()['timeouts'], 1)
+
+        # 기다리는 동안 연결이 돌아오면 그 연결을 씁니다.
+        pool.timeout = 5
+        releaser = threading.Timer(0.05, pool.release, (first, ))
+        releaser.start()
+        self.assertIs(pool.acquire(FakeConnection), first)
+        releaser.join()
+        self.assertEqual(pool.snapshot()['created'], 2)
+
+    def test_discard_broken(self):
+        pool = self.pool()
+        connection = pool.acquire(FakeConnection)
+        # 에러가 났던 연결은 돌려받을 때 닫고, 다음에는 새로 연결합니다.
+        pool.release(connection, reusable=False)
+        self.assertTrue(connection.closed)
+        self.assertEqual(pool.snapshot()['open'], 0)
+        self.assertIsNot(pool.acquire(FakeConnection), connection)
+        self.assertEqual(pool.snapshot()['discarded'], 1)
+
+    def test_ping_idle(self):
+        pool = self.pool(ping_after=0)
+        connection = pool.acquire(FakeConnection)
+        pool.release(connection)
+        # 서버가 끊은 연결은 ping 에 실패하므로 버립니다.
+        connection.broken = True
+        fresh = pool.acquire(FakeConnection)
+        self.assertIsNot(fresh, connection)
+        self.assertTrue(connection.closed)
+        pool.release(fresh)
+        self.assertIs(pool.acquire(FakeConnection), fresh)
+        snapshot = pool.snapshot()
+        self.assertEqual((snapshot['pinged'], snapshot['discarded'], snapshot['created']), (2, 1, 2))
+
+    def test_max_lifetime(self):
+        pool = self.pool(max_lifetime=0)
+        connection = pool.acquire(FakeConnection)
+        pool.release(connection)
+        self.assertIsNot(pool.acquire(FakeConnection), connection)
+        self.assertTrue(connection.closed)
+
+    def test_connect_failure(self):
+        pool = self.pool(max_size=1)
+
+        def refuse():
+            raise OSError('connection refused')
+
+        with self.assertRaises(OSError):
+            pool.acquire(refuse)
+        # 연결에 실패해도 자리는 돌려놓습니다.
+        pool.acquire(FakeConnection)
+        self.assertEqual(pool.snapshot()['in_use'], 1)
+
+    def test_settings_change(self):
+        self.addCleanup(pools.pop, 'pool-test', None)
+        pool = get_pool('pool-test', 'host-a', self.pool)
+        self.assertIs(get_pool('pool-test', 'host-a', self.pool), pool)
+        idle, in_use = pool.acquire(FakeConnection), pool.acquire(FakeConnection)
+        pool.release(idle)
+
+        # 연결 설정이 바뀌면 새 풀을 만들고, 예전 풀의 연결은 놀던 것은 바로, 사용 중인 것은 돌려받을 때 닫습니다.
+        fresh = get_pool('pool-test', 'host-b', self.pool)
+        self.assertIsNot(fresh, pool)
+        self.assertIs(pools['pool-test'], fresh)
+        self.assertTrue(idle.closed)
+        self.assertFalse(in_use.closed)
+        pool.release(in_use)
+        self.assertTrue(in_use.closed)
+        self.assertEqual(pool.snapshot()['open'], 0)
+        self.assertIsNot(fresh.acquire(FakeConnection), in_use)
@@ -0,0 +1,102 @@
+import hashlib
+import multiprocessing
+import os
+from collections import deque
+from datetime import datetime
+
+from django.utils import timezone
+
+# 이 모듈은 model 을 import 하지 않습니다.
+# --workers 로 띄운 프로세스들이 Django app 초기화 없이 parse_range 만 불러 쓸 수 있도록 하기 위함입니다.
+
+TSV_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+# 한 번에 파싱하는 파일 구간 크기. worker 에 나눠주는 단위이기도 합니다.
+RANGE_BYTES = 4 * 1024 * 1024
+
+
+def fingerprint_of(line):
+    return hashlib.sha1(line.rstrip('\r\n').encode('utf-8')).hexdigest()
+
+
+def parse_survey_line(line):
+    """Parse one line of example_surveyresult.tsv into SurveyResult field values (os is still a name)."""
+    data = line.rstrip('\r\n').split('\t')
+    return {
+        'timestamp': timezone.make_aware(datetime.strptime(data[0], TSV_DATETIME_FORMAT)),
+        'os_name': data[1],
+        'python': int(data[2]),
+        'rdb': int(data[3]),
+        'programming': int(data[4]),
+        'major': data[5],
+        'grade': data[6],
+        'backend_reason': data[7],
+        'waffle_reason': data[8],
+        'say_something': data[9],
+        'fingerprint': fingerprint_of(line),
+    }
+
+
+def split_ranges(path, start, range_bytes=RANGE_BYTES):
+    """Split `path` from byte `start` to EOF into (begin, end) ranges that end on line boundaries."""
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, 'rb') as f:
+        begin = start
+        while begin < size:
+            end = begin + range_bytes
+            if end < size:
+                # end 가 가리키는 줄의 끝까지 늘립니다. (end 가 이미 줄의 시작이라면 그대로)
+                f.seek(end - 1)
+                f.readline()
+                end = f.tell()
+            ranges.append((begin, min(end, size)))
+            begin = end
+    return ranges
+
+
+def parse_range(task):
+    """
+    Parse the lines of one (path, begin, end) range.
+
+    Return (rows, offset, tail_fingerprint). `offset` is where the last newline-terminated line ends;
+    a final line without a newline may still be being written, so it is parsed if possible but not counted in `offset`.
+    """
+    path, begin, end = task
+    rows, offset, tail_fingerprint = [], begin, ''
+    with open(path, 'rb') as f:
+        f.seek(begin)
+        while offset < end:
+            raw = f.readline()
+            if not raw:
+                break
+            if raw.endswith(b'\n'):
+                offset += len(raw)
+                if raw.strip():
+                    rows.append(parse_survey_line(raw.decode('utf-8')))
+                continue
+            try:
+                row = parse_survey_line(raw.decode('utf-8'))
+            except (IndexError, ValueError):
+                # 덜 쓰인 줄이라 아직 파싱할 수 없습니다.
+                break
+            rows.append(row)
+            tail_fingerprint = row['fingerprint']
+            break
+    return rows, offset, tail_fingerprint
+
+
+def parse_ranges(tasks, workers=1):
+    """Yield parse_range() results in file order, parsing up to `workers` ranges in parallel."""
+    if workers <= 1:
+        yield from map(parse_range, tasks)
+        return
+
+    with multiprocessing.Pool(workers) as pool:
+        # 결과는 파일 순서대로 내보내되, 쓰는 쪽이 느려도 메모리가 늘지 않도록 미리 파싱하는 구간 수를 제한합니다.
+        pending = deque()
+        for task in tasks:
+            pending.append(pool.apply_async(parse_range, (task, )))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().get()
+        while pending:
+            yield pending.popleft().get()
@@ -1,6 +1,9 @@
 from django.urls import include, path
 from rest_framework.routers import SimpleRouter
-from survey.views import OperatingSystemViewSet, SurveyResultViewSet, top_50
+from survey.views import (
+    OperatingSystemViewSet, SurveyResultViewSet, async_os_list, async_os_retrieve, async_survey_list,
+    async_survey_retrieve, async_top_50, top_50,
+)
 
 app_name = 'survey'
 
@@ -10,5 +13,11 @@ router.register('os', OperatingSystemViewSet, basename='os')
 
 urlpatterns = [
     path('', include(router.urls)),
-    path('template', top_50)
+    path('template', top_50),
+    # ASGI 용 async 버전 (survey.views 참고)
+    path('async/survey/', async_survey_list),
+    path('async/survey/<int:pk>/', async_survey_retrieve),
+    path('async/os/', async_os_list),
+    path('async/os/<int:pk>/', async_os_retrieve),
+    path('async/template', async_top_50),
 ]
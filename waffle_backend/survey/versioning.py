@@ -0,0 +1,98 @@
+import functools
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from survey.models import ResourceVersion
+from waffle_backend.asyncdb import database_sync_to_async
+
+SURVEY = 'survey'
+OPERATING_SYSTEM = 'os'
+# 설문 응답에는 유저 정보가 들어가므로, 유저가 바뀌어도 설문 API 의 ETag 가 바뀌어야 합니다.
+USER = 'user'
+
+# 버전은 자원마다 ResourceVersion 한 행이라, 같은 자원을 바꾸는 쓰기는 모두 이 행의 UPDATE 에서 차례로 기다립니다.
+# bump 는 변경과 함께 커밋되도록 쓰기 트랜잭션 안에서 실행되므로, 행의 잠금은 bump 부터 커밋까지 잡힙니다.
+# 그래서 signal (survey.signals) 은 bump 를 마지막에 불러 잠금을 짧게 잡습니다.
+# 로그인 (last_login) 처럼 잦지만 응답에 중요하지 않은 변경은 버전을 올리지 않습니다.
+# 버전 행을 나누면 (shard) 버전을 읽을 때마다 여러 행을 합쳐야 하므로, 쓰기가 이 행에서 막히기 전까지는 한 행으로 둡니다.
+
+
+def bump(name):
+    now = timezone.now()
+    if ResourceVersion.objects.filter(name=name).update(counter=F('counter') + 1, updated_at=now):
+        return
+    try:
+        with transaction.atomic():
+            ResourceVersion.objects.create(name=name, counter=1, updated_at=now)
+    except IntegrityError:
+        ResourceVersion.objects.filter(name=name).update(counter=F('counter') + 1, updated_at=now)
+
+
+def get_versions(*names, using=None):
+    """Return {name: (counter, updated_at)}; resources that never changed are (0, None)."""
+    versions = {name: (0, None) for name in names}
+    for name, counter, updated_at in ResourceVersion.objects.using(using).filter(name__in=names).values_list(
+            'name', 'counter', 'updated_at'):
+        versions[name] = (counter, updated_at)
+    return versions
+
+
+def validators_of(versions):
+    """ETag (without the representation suffix) and Last-Modified timestamp of a {name: (counter, updated_at)}."""
+    etag = '.'.join(f'{name}-{counter}' for name, (counter, _) in sorted(versions.items()))
+    updated = [updated_at for _, updated_at in versions.values() if updated_at is not None]
+    return etag, int(max(updated).timestamp()) if updated else None
+
+
+def conditional(get_validators):
+    """
+    ViewSet method decorator answering GET with 304 Not Modified while the client's copy is current.
+
+    `get_validators(view, request)` returns (etag, last_modified) from version markers only,
+    so an unchanged resource is answered without running the view or serializing anything.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            etag, last_modified = get_validators(self, request)
+            # 같은 URL 이라도 JSON 과 browsable API 는 다른 표현이므로 ETag 를 구분합니다.
+            etag = f'"{etag}-{request.accepted_renderer.format}"'
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = method(self, request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response['ETag'] = etag
+                if last_modified is not None:
+                    response['Last-Modified'] = http_date(last_modified)
+            return response
+        return wrapper
+    return decorator
+
+
+def async_conditional(get_validators):
+    """
+    `conditional` for the plain Django async views in survey.views.
+
+    `get_validators(view, request)` is called with view=None in a worker thread; responses are JSON.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            etag, last_modified = await database_sync_to_async(get_validators)(None, request)
+            etag = f'"{etag}-json"'
+
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = await view(request, *args, **kwargs)
+            if response.status_code in (200, 304):
+                response['ETag'] = etag
+                if last_modified is not None:
+                    response['Last-Modified'] = http_date(last_modified)
+            return response
+        return wrapper
+    return decorator
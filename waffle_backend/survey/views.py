@@ -1,29 +1,103 @@
-from django.shortcuts import get_object_or_404, render
+import functools
+import uuid
+
+from django.conf import settings
+from django.db import transaction
+from django.http import Http404, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.shortcuts import render
 from django.views.decorators.http import require_http_methods
 from rest_framework import status, viewsets, permissions
+from rest_framework.decorators import action
+from rest_framework.exceptions import AuthenticationFailed, NotFound, ParseError, ValidationError
+from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from survey import analytics, catalog, changes, ingestion, search, stats, versioning
+from survey.export import csv_stream, export_rows, ndjson_stream
+from survey.fast_serializers import SURVEY_RESULT_POSITION, sparse_survey_result_serializer
+from survey.filters import SurveyResultFilterBackend, validated_filters
+from survey.importer import insert_surveys, resolve_operating_systems
+from survey.pagination import KEYSET_ORDERING, SurveyResultCursorPagination, SurveySearchPagination
+from survey.serializers import CrosstabSerializer, OperatingSystemSerializer, SurveyResultSerializer
+from survey.models import OperatingSystem, SurveyChange, SurveyResult
+from survey.versioning import async_conditional, conditional
+from waffle_backend.asyncdb import database_sync_to_async
+from waffle_backend.routers import read_from_replica
+
+
+# 설문 응답에는 OS 와 유저 정보가 함께 들어갑니다.
+def survey_validators(view, request):
+    return versioning.validators_of(
+        versioning.get_versions(versioning.SURVEY, versioning.OPERATING_SYSTEM, versioning.USER)
+    )
+
+
+def survey_stats_validators(view, request):
+    return versioning.validators_of(versioning.get_versions(versioning.SURVEY, versioning.OPERATING_SYSTEM))
+
+
+def os_validators(view, request):
+    return versioning.validators_of(catalog.get_catalog()['version'])
+
+
+def survey_serializer_of(request):
+    # ?fields=id,os.name,timestamp 와 ?expand=os,user 로 필요한 필드만 읽고, 고른 관계만 JOIN 합니다.
+    return sparse_survey_result_serializer(request.query_params.get('fields'), request.query_params.get('expand'))
+
+
+def survey_page_data(queryset, request, paginator):
+    serializer = survey_serializer_of(request)
+    rows = paginator.paginate_queryset(
+        queryset.values_list(*serializer.columns), request, position=serializer.getter(*SURVEY_RESULT_POSITION),
+    )
+    return serializer.to_representation(rows)
+
+
+def survey_data_by_id(queryset, request, ids):
+    serializer = survey_serializer_of(request)
+    id_of = serializer.getter('id')
+    return {id_of(row): serializer.build(row) for row in queryset.filter(id__in=ids).values_list(*serializer.columns)}
+
 
-from survey.serializers import OperatingSystemSerializer, SurveyResultSerializer
-from survey.models import OperatingSystem, SurveyResult
+def survey_list_data(queryset, request, ids):
+    # ids 순서대로
+    surveys = survey_data_by_id(queryset, request, ids)
+    return [surveys[pk] for pk in ids if pk in surveys]
 
 
+def survey_detail_data(queryset, request, pk):
+    serializer = survey_serializer_of(request)
+    row = queryset.filter(pk=pk).values_list(*serializer.columns).first()
+    return None if row is None else serializer.build(row)
+
+
+# GET 요청은 replica 에서 읽습니다. (waffle_backend.routers)
+@read_from_replica
 class SurveyResultViewSet(viewsets.GenericViewSet):
     queryset = SurveyResult.objects.all()
     serializer_class = SurveyResultSerializer
     permission_classes = (permissions.IsAuthenticated(), )
+    pagination_class = SurveyResultCursorPagination
+    filter_backends = (SurveyResultFilterBackend, )
 
     def get_permissions(self):
-        if self.action in ('list', 'retrieve'):
+        if self.action in ('list', 'retrieve', 'export', 'statistics', 'search_surveys', 'crosstab', 'survey_changes'):
             return (permissions.AllowAny(), )
         return self.permission_classes
 
+    # 조회는 SurveyResultSerializer 대신 같은 결과를 내는 survey.fast_serializers 를 씁니다.
+    @conditional(survey_validators)
     def list(self, request):
-        surveys = self.get_queryset().select_related('os')
-        return Response(self.get_serializer(surveys, many=True).data)
+        surveys = self.filter_queryset(self.get_queryset())
+        return self.get_paginated_response(survey_page_data(surveys, request, self.paginator))
 
+    @conditional(survey_validators)
     def retrieve(self, request, pk=None):
-        survey = get_object_or_404(SurveyResult, pk=pk)
-        return Response(self.get_serializer(survey).data)
+        data = survey_detail_data(self.get_queryset(), request, pk)
+        if data is None:
+            raise Http404
+        return Response(data)
 
     def create(self, request):
         # copy makes request.data mutable
@@ -32,27 +106,277 @@ class SurveyResultViewSet(viewsets.GenericViewSet):
 
         serializer = self.get_serializer(data=data)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        if settings.SURVEY_INGESTION_MODE == 'queue':
+            # 로컬 큐에만 저장하고 응답합니다. DB 에는 drain_survey_queue 가 모아서 넣습니다.
+            ingestion.enqueue(serializer.validated_data, request.user)
+            return Response({'queued': True}, status=status.HTTP_202_ACCEPTED)
+        # 설문 INSERT 와 post_save 의 통계, 검색 색인, 변경 기록, 버전 갱신 (survey.signals) 을 한 트랜잭션으로 씁니다.
+        # 하나라도 실패하면 설문도 저장되지 않으므로, 500 을 받은 클라이언트가 다시 보내도 설문이 두 번 생기지 않습니다.
+        with transaction.atomic():
+            serializer.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=['post'], url_path='batch')
+    def batch(self, request):
+        # 여러 설문을 한 번에 받습니다. 잘못된 설문은 index 와 함께 에러로 돌려주고, 나머지는 저장합니다.
+        items = request.data
+        if not isinstance(items, list):
+            return Response(status=status.HTTP_400_BAD_REQUEST, data='설문 목록(list)을 보내주세요.')
+        if len(items) > settings.SURVEY_BATCH_MAX_SIZE:
+            return Response(status=status.HTTP_400_BAD_REQUEST,
+                            data=f'한 번에 {settings.SURVEY_BATCH_MAX_SIZE}개까지 보낼 수 있습니다.')
+
+        valid, errors = [], []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                errors.append({'index': index, 'errors': {'non_field_errors': ['설문 객체가 아닙니다.']}})
+                continue
+            serializer = self.get_serializer(data=dict(item, os_name=item.get('os')))
+            if serializer.is_valid():
+                valid.append((index, serializer.validated_data))
+            else:
+                errors.append({'index': index, 'errors': serializer.errors})
+
+        # OS 이름은 한 번에 찾고, 설문은 한 트랜잭션에서 bulk_create 합니다.
+        os_ids = resolve_operating_systems({data['os_name'] for _, data in valid})
+        surveys = []
+        for index, data in valid:
+            data = dict(data)
+            surveys.append(SurveyResult(
+                os_id=os_ids[data.pop('os_name')], user=request.user, fingerprint=uuid.uuid4().hex, **data
+            ))
+        with transaction.atomic():
+            insert_surveys(surveys)
 
+        created = [{'index': index, 'id': survey.id} for (index, _), survey in zip(valid, surveys)]
+        return Response(
+            {'created': created, 'errors': errors},
+            status=status.HTTP_201_CREATED if created or not errors else status.HTTP_400_BAD_REQUEST,
+        )
+
+    @action(detail=False, url_path=r'export/(?P<fmt>csv|ndjson)')
+    def export(self, request, fmt=None):
+        # 전체 목록을 메모리에 만들지 않고, 일정 크기씩 읽어서 바로 내보냅니다.
+        # 응답 본문은 middleware 가 끝난 뒤에 만들어지므로, 읽을 DB (replica) 는 지금 정해 둡니다.
+        queryset = self.get_queryset()
+        rows = export_rows(queryset.using(queryset.db))
+        if fmt == 'csv':
+            response = StreamingHttpResponse(csv_stream(rows), content_type='text/csv; charset=utf-8')
+        else:
+            response = StreamingHttpResponse(ndjson_stream(rows), content_type='application/x-ndjson; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="surveys.{fmt}"'
+        return response
+
+    @action(detail=False, url_path='stats')
+    @conditional(survey_stats_validators)
+    def statistics(self, request):
+        # 설문 전체를 읽지 않고, 설문이 생기고 지워질 때마다 갱신해둔 요약 테이블만 읽습니다.
+        return Response(stats.summary())
+
+    @action(detail=False, url_path='changes')
+    def survey_changes(self, request):
+        # cursor 뒤에 생기고 (created), 바뀌고 (updated), 지워진 (deleted) 설문. cursor 없이 부르면 처음부터 받습니다.
+        # 응답의 cursor 를 저장해두었다가 다음에 넘기면 그 사이의 변경만 받습니다. has_more 가 false 면 지금은 다 받은 것입니다.
+        # 한 응답 안에서 같은 설문이 여러 번 바뀌었다면 마지막 변경만, 그 설문의 현재 내용과 함께 돌려줍니다.
+        try:
+            seq = changes.decode_cursor(request.query_params.get('cursor'))
+        except ValueError:
+            raise NotFound('Invalid cursor')
+        limit = self.paginator.get_page_size(request)
+        batch = changes.changes_after(seq, limit)
+        latest = changes.latest(batch)
+        alive = [change.survey_id for change in latest if change.kind != SurveyChange.DELETED]
+        surveys = survey_data_by_id(self.get_queryset(), request, alive)
+        results = []
+        for change in latest:
+            if change.kind == SurveyChange.DELETED or change.survey_id not in surveys:
+                # 이 batch 뒤에 지워진 설문입니다. (뒤의 deleted 기록으로 한 번 더 옵니다)
+                results.append({'type': SurveyChange.DELETED, 'id': change.survey_id})
+            else:
+                results.append({'type': change.kind, 'id': change.survey_id, 'survey': surveys[change.survey_id]})
+        return Response({
+            'cursor': changes.encode_cursor(batch[-1].seq if batch else seq),
+            'has_more': len(batch) == limit,
+            'changes': results,
+        })
+
+    @action(detail=False, url_path='crosstab')
+    @conditional(survey_stats_validators)
+    def crosstab(self, request):
+        # 예) ?rows=major&columns=grade&aggregate=mean&value=programming, ?rows=week&columns=os&normalize=rows
+        # 목록과 같은 필터 (survey.filters) 를 쓸 수 있습니다. 설문은 메모리의 스냅샷 (survey.analytics) 에서 집계합니다.
+        query = CrosstabSerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        return Response(analytics.crosstab(filters=validated_filters(request.query_params), **query.validated_data))
+
+    @action(detail=False, url_path='search')
+    @conditional(survey_validators)
+    def search_surveys(self, request):
+        # 자유 응답 (backend_reason, waffle_reason, say_something) 에서 q 의 모든 토큰이 나오는 설문을 관련도 순으로 찾습니다.
+        query = request.query_params.get('q', '')
+        if not query.strip():
+            return Response(status=status.HTTP_400_BAD_REQUEST, data='검색어(q)를 입력해주세요.')
+        paginator = SurveySearchPagination()
+        ids, paginator.truncated = search.search(query)
+        ids = paginator.paginate_queryset(ids, request, view=self)
+        return paginator.get_paginated_response(survey_list_data(self.get_queryset(), request, ids))
+
+
+@read_from_replica
 class OperatingSystemViewSet(viewsets.GenericViewSet):
     queryset = OperatingSystem.objects.all()
     serializer_class = OperatingSystemSerializer
 
+    # OS 목록은 거의 바뀌지 않으므로 DB 대신 survey.catalog 의 캐시에서 읽습니다.
+    @conditional(os_validators)
     def list(self, request):
-        return Response(self.get_serializer(self.get_queryset(), many=True).data)
+        return Response(self.get_serializer(catalog.list_operating_systems(), many=True).data)
 
+    @conditional(os_validators)
     def retrieve(self, request, pk=None):
-        try:
-            os = OperatingSystem.objects.get(id=pk)
-        except OperatingSystem.DoesNotExist:
+        os = catalog.get_operating_system(pk)
+        if os is None:
             return Response(status=status.HTTP_404_NOT_FOUND)
         return Response(self.get_serializer(os).data)
 
 
+@read_from_replica
 @require_http_methods('GET')
 def top_50(request):
+    return render_top_50(request)
+
+
+def render_top_50(request):
+    # 최신순 50개. (timestamp, id) 인덱스를 역순으로 읽고 끝냅니다.
+    surveys = SurveyResult.objects.select_related('os').order_by(*KEYSET_ORDERING)[:50]
+    # 렌더링된 목록은 설문/OS 버전을 key 로 캐시합니다. 새 설문이 저장되면 버전이 바뀌어 다시 렌더링되고,
+    # 캐시가 살아있는 동안에는 queryset 이 평가되지 않으므로 버전 조회 한 번으로 끝납니다.
+    version, _ = versioning.validators_of(versioning.get_versions(versioning.SURVEY, versioning.OPERATING_SYSTEM))
+    return render(request, 'index.html', context={
+        'surveys': surveys,
+        'version': version,
+        'fragment_timeout': settings.SURVEY_TOP_50_CACHE_TIMEOUT,
+    })
+
+
+# 아래는 asgi.py 로 띄운 서버에서 쓰는 async 버전입니다. (/api/v1/async/...)
+# Django 3.2 의 ORM 은 async 를 지원하지 않으므로, 요청마다 DB 작업 (조회 + 직렬화) 을 한 번의 database_sync_to_async 로 묶고
+# 나머지 (ETag 비교, 응답 전송) 는 이벤트 루프에서 처리합니다. 느린 클라이언트가 많아도 스레드를 붙잡지 않습니다.
+# DRF 의 ViewSet 은 async 를 지원하지 않으므로 Django 의 async 함수 뷰로 작성했습니다.
+
+def json_response(data, code=status.HTTP_200_OK):
+    return JsonResponse(data, status=code, safe=False, json_dumps_params={'ensure_ascii': False})
+
+
+@database_sync_to_async
+def authenticate(request):
+    # APIView 와 같은 인증 클래스를 씁니다. (캐시에 있는 토큰이면 DB 를 읽지 않습니다)
+    drf_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+    try:
+        return drf_request.user.is_authenticated
+    except AuthenticationFailed:
+        return False
+
+
+@database_sync_to_async
+def survey_page(request):
+    paginator = SurveyResultCursorPagination()
+    request = Request(request)
+    try:
+        surveys = SurveyResultFilterBackend().filter_queryset(request, SurveyResult.objects.all(), None)
+        data = survey_page_data(surveys, request, paginator)
+    except ValidationError as e:
+        return e.detail, e.status_code
+    except (NotFound, ParseError) as e:
+        return {'detail': e.detail}, e.status_code
+    return {'next': paginator.get_next_link(), 'results': data}, status.HTTP_200_OK
+
+
+@database_sync_to_async
+def survey_detail(request, pk):
+    try:
+        data = survey_detail_data(SurveyResult.objects.all(), Request(request), pk)
+    except ParseError as e:
+        return {'detail': e.detail}, e.status_code
+    if data is None:
+        return {'detail': 'Not found.'}, status.HTTP_404_NOT_FOUND
+    return data, status.HTTP_200_OK
+
+
+@database_sync_to_async
+def operating_system_list():
+    return OperatingSystemSerializer(catalog.list_operating_systems(), many=True).data
+
+
+@database_sync_to_async
+def operating_system_detail(pk):
+    os = catalog.get_operating_system(pk)
+    return None if os is None else OperatingSystemSerializer(os).data
+
+
+def async_get(view):
+    # require_http_methods 와 csrf_exempt 는 Django 3.2 에서 async 뷰를 감싸지 못합니다.
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return HttpResponseNotAllowed(['GET', 'HEAD'])
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+@read_from_replica
+@async_get
+@async_conditional(survey_validators)
+async def async_survey_list(request):
+    data, code = await survey_page(request)
+    return json_response(data, code)
+
+
+@read_from_replica
+@async_get
+@async_conditional(survey_validators)
+async def async_survey_retrieve(request, pk):
+    data, code = await survey_detail(request, pk)
+    return json_response(data, code)
+
+
+def unauthorized():
+    response = json_response({'detail': 'Authentication credentials were not provided.'}, status.HTTP_401_UNAUTHORIZED)
+    response['WWW-Authenticate'] = 'JWT realm="api"'
+    return response
+
+
+@read_from_replica
+@async_get
+async def async_os_list(request):
+    if not await authenticate(request):
+        return unauthorized()
+    return await async_os_list_response(request)
+
+
+@async_conditional(os_validators)
+async def async_os_list_response(request):
+    return json_response(await operating_system_list())
+
+
+@read_from_replica
+@async_get
+async def async_os_retrieve(request, pk):
+    if not await authenticate(request):
+        return unauthorized()
+    return await async_os_retrieve_response(request, pk)
+
+
+@async_conditional(os_validators)
+async def async_os_retrieve_response(request, pk):
+    data = await operating_system_detail(pk)
+    if data is None:
+        return json_response({'detail': 'Not found.'}, status.HTTP_404_NOT_FOUND)
+    return json_response(data)
+
 
-    surveys = SurveyResult.objects.all()[:50]
-    return render(request, 'index.html', context={'surveys': surveys})
+@read_from_replica
+@async_get
+async def async_top_50(request):
+    # 템플릿이 (캐시되지 않은 경우에만) queryset 을 읽으므로, 렌더링까지 한 번에 스레드에서 합니다.
+    return await database_sync_to_async(render_top_50)(request)
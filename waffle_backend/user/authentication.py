@@ -0,0 +1,120 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+from django.conf import settings
+from django.utils.translation import gettext as _
+from rest_framework import exceptions
+from rest_framework_jwt.authentication import (
+    JSONWebTokenAuthentication, jwt_decode_handler, jwt_get_username_from_payload,
+)
+from rest_framework_jwt.settings import api_settings
+
+
+class ExpiringLRU:
+    # 만료 시각이 있는 LRU. 프로세스 메모리에만 있으며, 여러 스레드에서 같이 씁니다.
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires_at):
+        with self.lock:
+            self.entries[key] = (value, expires_at)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def pop(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+# 서명 검증을 마친 토큰 -> payload. 토큰 전체를 key 로 써야 서명만 같고 payload 가 다른 토큰을 통과시키지 않습니다.
+verified_tokens = ExpiringLRU(settings.JWT_VERIFIED_TOKEN_CACHE_SIZE)
+# user id -> User. User 가 저장/삭제되면 user.signals 에서 지웁니다.
+# 다른 프로세스에서 저장된 경우는 알 수 없으므로 JWT_USER_CACHE_TIMEOUT 이 지나야 반영됩니다.
+users = ExpiringLRU(settings.JWT_USER_CACHE_SIZE)
+
+
+def forget_user(user_id):
+    users.pop(user_id)
+
+
+def clear():
+    verified_tokens.clear()
+    users.clear()
+
+
+class CachedJSONWebTokenAuthentication(JSONWebTokenAuthentication):
+    """
+    JSONWebTokenAuthentication that remembers verified tokens and the users they resolve to,
+    so a client repeating its token skips both the HMAC check and the User query.
+    """
+
+    def authenticate(self, request):
+        jwt_value = self.get_jwt_value(request)
+        if jwt_value is None:
+            return None
+
+        return self.authenticate_credentials(self.verified_payload(jwt_value)), jwt_value
+
+    def verified_payload(self, jwt_value):
+        payload = verified_tokens.get(jwt_value)
+        if payload is None:
+            # 처음 보는 (또는 만료된) 토큰만 서명을 검증합니다.
+            payload = self.decode(jwt_value)
+            if 'exp' in payload:
+                verified_tokens.set(jwt_value, payload, payload['exp'] + api_settings.JWT_LEEWAY)
+        return payload
+
+    def decode(self, jwt_value):
+        # BaseJSONWebTokenAuthentication.authenticate 와 같은 에러를 냅니다.
+        try:
+            return jwt_decode_handler(jwt_value)
+        except jwt.ExpiredSignature:
+            raise exceptions.AuthenticationFailed(_('Signature has expired.'))
+        except jwt.DecodeError:
+            raise exceptions.AuthenticationFailed(_('Error decoding signature.'))
+        except jwt.InvalidTokenError:
+            raise exceptions.AuthenticationFailed()
+
+    def authenticate_credentials(self, payload):
+        user_id = payload.get('user_id')
+        user = users.get(user_id) if user_id is not None else None
+        if user is None or user.get_username() != jwt_get_username_from_payload(payload):
+            user = super().authenticate_credentials(payload)
+            users.set(user.pk, user, time.time() + settings.JWT_USER_CACHE_TIMEOUT)
+        elif not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User account is disabled.'))
+        # 요청마다 user 를 고쳐 쓸 수 있으므로 (request.user.save() 등) 캐시된 객체를 그대로 넘기지 않습니다.
+        return copy.copy(user)
+
+
+def user_id_of(request):
+    """The user id of the JWT `request` carries, without reading the DB; None if there is no valid token."""
+    authentication = CachedJSONWebTokenAuthentication()
+    try:
+        jwt_value = authentication.get_jwt_value(request)
+        return None if jwt_value is None else authentication.verified_payload(jwt_value).get('user_id')
+    except exceptions.AuthenticationFailed:
+        return None
@@ -0,0 +1,34 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from waffle_backend.asyncdb import closing_connections
+
+# 비밀번호 해시 (PBKDF2) 는 일부러 느리게 만들어져 있습니다.
+# async 로그인/회원가입 뷰는 이 작업을 이벤트 루프가 아니라 크기가 정해진 전용 스레드 풀에서 돌립니다.
+# 풀이 다 차면 요청은 풀의 큐에서 기다리고, 큐마저 PASSWORD_HASHING_MAX_QUEUE 만큼 차면 바로 거절합니다.
+# 로그인이 몰려도 다른 API 는 이벤트 루프에서 계속 처리됩니다.
+
+executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASHING_WORKERS, thread_name_prefix='password-hashing')
+pending = 0
+pending_lock = threading.Lock()
+
+
+class HashingPoolFull(Exception):
+    pass
+
+
+async def run(func, *args):
+    """Run `func(*args)` on the password hashing pool; raise HashingPoolFull if too many calls are waiting."""
+    global pending
+    with pending_lock:
+        if pending >= settings.PASSWORD_HASHING_WORKERS + settings.PASSWORD_HASHING_MAX_QUEUE:
+            raise HashingPoolFull()
+        pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(executor, closing_connections(func), *args)
+    finally:
+        with pending_lock:
+            pending -= 1
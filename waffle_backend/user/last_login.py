@@ -0,0 +1,89 @@
+import atexit
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import update_last_login
+from django.db import close_old_connections
+from django.utils import timezone
+
+from user import authentication
+
+# LAST_LOGIN_MODE = 'coalesce' 이면 로그인마다 last_login 을 UPDATE 하지 않고,
+# 유저별 마지막 로그인 시각을 메모리에 모아두었다가 LAST_LOGIN_FLUSH_INTERVAL 초마다 bulk_update 한 번으로 씁니다.
+# last_login 이 LAST_LOGIN_MIN_INTERVAL 초 이내인 유저는 기록하지 않습니다. (토큰을 자주 갱신하는 클라이언트)
+# 프로세스가 죽으면 아직 쓰지 않은 시각은 사라집니다. last_login 은 그 정도로 정확할 필요가 없는 값입니다.
+# 쓰다가 DB 오류가 나면 그 시각들은 pending 에 되돌려 두고 다음 flush 에서 다시 씁니다.
+
+logger = logging.getLogger(__name__)
+pending = {}
+pending_lock = threading.Lock()
+flusher = None
+
+
+def record(user):
+    # 처음 로그인하는 유저 (last_login 이 NULL) 는 모아두지 않고 바로 씁니다.
+    if settings.LAST_LOGIN_MODE != 'coalesce' or user.last_login is None:
+        update_last_login(None, user)
+        return
+
+    now = timezone.now()
+    if user.last_login and now - user.last_login < timedelta(seconds=settings.LAST_LOGIN_MIN_INTERVAL):
+        return
+    user.last_login = now
+    with pending_lock:
+        pending[user.pk] = now
+    start_flusher()
+
+
+def flush():
+    """Write the pending last_login values with one bulk UPDATE; return how many users were updated."""
+    global pending
+    with pending_lock:
+        logins, pending = pending, {}
+    if not logins:
+        return 0
+
+    User = get_user_model()
+    try:
+        # 로그인 하나씩 저장할 때처럼 (survey.signals.user_saved) 유저 버전은 올리지 않습니다.
+        User.objects.bulk_update([User(pk=pk, last_login=at) for pk, at in logins.items()], ['last_login'])
+    except BaseException:
+        # 그 사이에 더 최근의 로그인이 기록되었다면 그 시각을 남깁니다.
+        with pending_lock:
+            for pk, at in logins.items():
+                if pk not in pending or pending[pk] < at:
+                    pending[pk] = at
+        raise
+    # bulk_update 는 post_save 를 보내지 않으므로 인증 캐시는 직접 비웁니다. (user.signals)
+    for pk in logins:
+        authentication.forget_user(pk)
+    return len(logins)
+
+
+def start_flusher():
+    global flusher
+    if flusher is not None:
+        return
+    with pending_lock:
+        if flusher is None:
+            flusher = threading.Thread(target=flush_forever, name='last-login-flusher', daemon=True)
+            flusher.start()
+            atexit.register(flush)
+
+
+def flush_forever():
+    while True:
+        time.sleep(settings.LAST_LOGIN_FLUSH_INTERVAL)
+        # 요청 스레드가 아니므로 Django 가 요청 전후에 하는 DB 연결 정리를 직접 합니다.
+        close_old_connections()
+        try:
+            flush()
+        except Exception:
+            # 이 스레드가 멈추면 다시 시작되지 않으므로, 기록만 하고 다음 주기에 다시 씁니다.
+            logger.exception('last_login flush failed')
+        finally:
+            close_old_connections()
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from waffle_backend.benchmark import request, run_load, start_load
+
+
+class Command(BaseCommand):
+    help = "Measure the throughput of a non-auth endpoint on a running server, before and during a login storm"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--read-path', default='/api/v1/survey/?page_size=10',
+                            help="endpoint whose throughput is measured")
+        parser.add_argument('--login-path', default='/api/v1/async/login/',
+                            help="login endpoint to storm (/api/v1/login/ for the sync view)")
+        parser.add_argument('--readers', type=int, default=8, help="concurrent clients on --read-path")
+        parser.add_argument('--logins', type=int, default=32, help="concurrent clients logging in")
+        parser.add_argument('--duration', type=float, default=10.0, help="seconds per phase")
+        parser.add_argument('--email', default='storm@waffle.com')
+        parser.add_argument('--password', default='storm-password')
+
+    def handle(self, *args, **options):
+        base_url = options['base_url'].rstrip('/')
+        credentials = {'email': options['email'], 'password': options['password']}
+        # 로그인할 유저를 만들어 둡니다. 이미 있으면 409 가 오고, 그대로 진행합니다.
+        request(f"{base_url}/api/v1/signup/", dict(credentials, username='storm'))
+
+        read_url = base_url + options['read_path']
+        self.stdout.write(f"{'phase':<12} {'read req/s':>10} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'logins/s':>9}")
+
+        baseline = run_load(read_url, options['readers'], options['duration'])
+        self.report('baseline', baseline)
+
+        storm = start_load(base_url + options['login_path'], options['logins'], data=credentials)
+        during = run_load(read_url, options['readers'], options['duration'])
+        self.report('login storm', during, storm.stop())
+
+    def report(self, phase, reads, logins=None):
+        login_rate = f"{logins.rate:>9.1f}" if logins else f"{'-':>9}"
+        self.stdout.write(
+            f"{phase:<12} {reads.rate:>10.1f} {reads.percentile(50) * 1000:>8.1f} {reads.percentile(99) * 1000:>8.1f} "
+            f"{reads.errors:>7} {login_rate}"
+        )
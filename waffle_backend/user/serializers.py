@@ -1,10 +1,12 @@
 from abc import ABC
 from django.contrib.auth import get_user_model, authenticate
 from django.contrib.auth.hashers import make_password
-from django.contrib.auth.models import update_last_login
+from django.db import transaction
 from rest_framework import serializers
 from rest_framework_jwt.settings import api_settings
 
+from user import last_login
+
 # 토큰 사용을 위한 기본 세팅
 User = get_user_model()
 JWT_PAYLOAD_HANDLER = api_settings.JWT_PAYLOAD_HANDLER
@@ -34,8 +36,11 @@ class UserCreateSerializer(serializers.Serializer):
         return data
 
     def create(self, validated_data):
-        # TODO (1. 유저 만들고 (ORM) , 2. 비밀번호 설정하기; 아래 코드를 수정해주세요.)
-        user = None
+        # create_user 가 set_password 로 비밀번호를 해시합니다. async 회원가입에서는 이 함수 전체가 user.hashing 의 풀에서 돕니다.
+        # 유저 INSERT 와 post_save 의 유저 버전 갱신 (survey.signals) 을 한 트랜잭션으로 묶고,
+        # 이메일이 겹쳐 IntegrityError 가 나도 바깥 트랜잭션은 계속 쓸 수 있게 합니다.
+        with transaction.atomic():
+            user = User.objects.create_user(**validated_data)
         return user, jwt_token_of(user)
 
 
@@ -53,7 +58,7 @@ class UserLoginSerializer(serializers.Serializer):
         if user is None:
             raise serializers.ValidationError("이메일 또는 비밀번호가 잘못되었습니다.")
 
-        update_last_login(None, user)
+        last_login.record(user)
         return {
             'email': user.email,
             'token': jwt_token_of(user)
@@ -1,3 +1,188 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.db import OperationalError
+from django.db.models import QuerySet
+from django.test import AsyncClient, Client, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from survey import versioning
+from user import authentication, last_login
+from user.serializers import jwt_token_of
+
+User = get_user_model()
+
 
 # Create your tests here.
+class UserQueryBudgetMixin:
+    # 유저 수와 무관하게 각 API 의 쿼리 수가 일정한지 확인합니다. (survey/tests.py 참고)
+    rows = None
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create(
+            [User(email=f'user{i}@waffle.com', username=f'user{i}') for i in range(1, cls.rows)],
+            batch_size=1000,
+        )
+        cls.user = User.objects.create_user(email='waffle@waffle.com', password='password', username='waffle')
+        cls.other = User.objects.exclude(id=cls.user.id).first() or cls.user
+
+    def setUp(self):
+        self.auth_client = Client(HTTP_AUTHORIZATION=f'JWT {jwt_token_of(self.user)}')
+        # 테스트 사이의 rollback 은 signal 을 보내지 않으므로 인증 캐시를 직접 비웁니다.
+        authentication.clear()
+
+    def test_login(self):
+        # authenticate() 의 유저 조회, last_login UPDATE. 로그인은 유저 버전 (survey.versioning) 을 올리지 않으므로
+        # 설문 API 의 ETag 가 바뀌지 않습니다.
+        version = versioning.get_versions(versioning.USER)
+        with self.assertNumQueries(2):
+            response = self.client.post('/api/v1/login/', {'email': 'waffle@waffle.com', 'password': 'password'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(versioning.get_versions(versioning.USER), version)
+
+    @override_settings(LAST_LOGIN_MODE='coalesce')
+    def test_login_coalesced(self):
+        long_ago = timezone.now() - timedelta(days=1)
+        User.objects.filter(id=self.user.id).update(last_login=long_ago)
+        # authenticate() 의 유저 조회만 하고, last_login 은 flush 때 씁니다.
+        with self.assertNumQueries(1):
+            response = self.client.post('/api/v1/login/', {'email': 'waffle@waffle.com', 'password': 'password'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(User.objects.get(id=self.user.id).last_login, long_ago)
+
+        # 유저 수와 관계없이 bulk UPDATE 한 번
+        with self.assertNumQueries(1):
+            self.assertEqual(last_login.flush(), 1)
+        self.assertGreater(User.objects.get(id=self.user.id).last_login, long_ago)
+
+        # LAST_LOGIN_MIN_INTERVAL 이내의 로그인은 다시 기록하지 않습니다.
+        self.client.post('/api/v1/login/', {'email': 'waffle@waffle.com', 'password': 'password'})
+        self.assertEqual(last_login.flush(), 0)
+
+    @override_settings(LAST_LOGIN_MODE='coalesce')
+    def test_first_login_coalesced(self):
+        # 가입만 한 유저는 last_login 이 없고, 첫 로그인은 flush 를 기다리지 않고 바로 씁니다.
+        self.assertIsNone(User.objects.get(id=self.user.id).last_login)
+        with self.assertNumQueries(2):
+            response = self.client.post('/api/v1/login/', {'email': 'waffle@waffle.com', 'password': 'password'})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNotNone(User.objects.get(id=self.user.id).last_login)
+        self.assertEqual(last_login.flush(), 0)
+
+    @override_settings(LAST_LOGIN_MODE='coalesce')
+    def test_login_flush_failure(self):
+        other = User.objects.create(email='other@waffle.com', username='other')
+        first, later = timezone.now() - timedelta(minutes=1), timezone.now()
+        last_login.pending.update({self.user.id: first, other.id: first})
+
+        def lost_connection(*args, **kwargs):
+            # 쓰는 도중에 같은 유저가 다시 로그인했습니다.
+            last_login.pending[self.user.id] = later
+            raise OperationalError('lost connection')
+
+        with mock.patch.object(QuerySet, 'bulk_update', lost_connection), self.assertRaises(OperationalError):
+            last_login.flush()
+        # 쓰지 못한 시각은 다음 flush 에서 쓰고, 더 최근의 시각이 있다면 그것을 씁니다.
+        self.assertEqual(last_login.flush(), 2)
+        self.assertEqual(User.objects.get(id=self.user.id).last_login, later)
+        self.assertEqual(User.objects.get(id=other.id).last_login, first)
+
+    def test_sign_up(self):
+        data = {'email': 'new@waffle.com', 'username': 'new', 'password': 'password'}
+        response = self.client.post('/api/v1/signup/', data)
+        self.assertEqual(response.status_code, 201)
+        user = User.objects.get(email='new@waffle.com')
+        self.assertTrue(user.check_password('password'))
+        client = Client(HTTP_AUTHORIZATION=f"JWT {response.json()['token']}")
+        self.assertEqual(client.get('/api/v1/user/me/').json()['id'], user.id)
+        self.assertEqual(self.client.post('/api/v1/signup/', data).status_code, 409)
+
+    def test_retrieve_me(self):
+        with self.assertNumQueries(1):
+            response = self.auth_client.get('/api/v1/user/me/')
+        self.assertEqual(response.json()['id'], self.user.id)
+
+    def test_retrieve_me_cached(self):
+        self.auth_client.get('/api/v1/user/me/')
+        # 같은 토큰의 두 번째 요청은 서명 검증도, 유저 조회도 하지 않습니다.
+        with self.assertNumQueries(0):
+            response = self.auth_client.get('/api/v1/user/me/')
+        self.assertEqual(response.json()['id'], self.user.id)
+
+    def test_user_cache_invalidation(self):
+        self.auth_client.get('/api/v1/user/me/')
+        User.objects.filter(id=self.user.id).update(is_active=False)
+        self.assertEqual(self.auth_client.get('/api/v1/user/me/').status_code, 200)
+        # save() 가 post_save 를 보내면 캐시에서 빠져 다음 요청은 DB 의 유저를 봅니다.
+        User.objects.get(id=self.user.id).save()
+        self.assertEqual(self.auth_client.get('/api/v1/user/me/').status_code, 401)
+
+    def test_invalid_token(self):
+        if self.other == self.user:
+            return
+        self.auth_client.get('/api/v1/user/me/')
+        token = jwt_token_of(self.user)
+        header, payload, signature = token.split('.')
+        other = jwt_token_of(self.other).split('.')[1]
+        # 캐시에 있는 토큰과 서명이 같아도 payload 가 다르면 통과하지 않습니다.
+        client = Client(HTTP_AUTHORIZATION=f'JWT {header}.{other}.{signature}')
+        self.assertEqual(client.get('/api/v1/user/me/').status_code, 401)
+
+    def test_retrieve_other(self):
+        with self.assertNumQueries(2):
+            response = self.auth_client.get(f'/api/v1/user/{self.other.id}/')
+        self.assertEqual(response.json()['id'], self.other.id)
+
+    def test_update_me(self):
+        # 인증, UPDATE, 유저 버전 UPDATE
+        with self.assertNumQueries(3):
+            response = self.auth_client.put('/api/v1/user/me/', {'username': 'new'}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+
+class UserQueryBudgetOneRowTest(UserQueryBudgetMixin, TestCase):
+    rows = 1
+
+
+class UserQueryBudgetHundredRowsTest(UserQueryBudgetMixin, TestCase):
+    rows = 100
+
+
+class UserQueryBudgetTenThousandRowsTest(UserQueryBudgetMixin, TestCase):
+    rows = 10000
+
+
+class AsyncLoginTest(TransactionTestCase):
+    # 비밀번호 해시는 다른 스레드 (user.hashing) 에서 실행되므로, 그 스레드가 유저를 볼 수 있도록 트랜잭션을 커밋합니다.
+
+    def setUp(self):
+        User.objects.create_user(email='waffle@waffle.com', password='password', username='waffle')
+
+    async def test_login(self):
+        client = AsyncClient()
+        response = await client.post('/api/v1/async/login/', {'email': 'waffle@waffle.com', 'password': 'password'},
+                                     content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['token'])
+
+        response = await client.post('/api/v1/async/login/', {'email': 'waffle@waffle.com', 'password': 'wrong'},
+                                     content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    async def test_sign_up(self):
+        client = AsyncClient()
+        response = await client.post('/api/v1/async/signup/',
+                                     {'email': 'new@waffle.com', 'username': 'new', 'password': 'password'},
+                                     content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        # 받은 토큰으로 인증하고, 같은 비밀번호로 로그인할 수 있습니다.
+        # (Django 3.2 의 AsyncClient 는 HTTP_AUTHORIZATION 을 헤더로 넘기지 않으므로 Client 를 씁니다)
+        auth_client = Client(HTTP_AUTHORIZATION=f"JWT {response.json()['token']}")
+        response = await sync_to_async(auth_client.get)('/api/v1/user/me/')
+        self.assertEqual(response.json()['email'], 'new@waffle.com')
+        response = await client.post('/api/v1/async/login/', {'email': 'new@waffle.com', 'password': 'password'},
+                                     content_type='application/json')
+        self.assertEqual(response.status_code, 200)
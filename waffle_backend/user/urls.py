@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import SimpleRouter
-from .views import UserViewSet, UserLoginView, UserSignUpView
+from .views import UserViewSet, UserLoginView, UserSignUpView, async_login_view, async_sign_up_view
 
 from survey import views
 router = SimpleRouter()
@@ -9,5 +9,7 @@ router.register('user', UserViewSet, basename='user')  # /api/v1/user/
 urlpatterns = [
     path('signup/', UserSignUpView.as_view(), name='signup'),  # /api/v1/signup/
     path('login/', UserLoginView.as_view(), name='login'),  # /api/v1/login/
+    path('async/signup/', async_sign_up_view, name='async-signup'),  # /api/v1/async/signup/ (ASGI)
+    path('async/login/', async_login_view, name='async-login'),  # /api/v1/async/login/ (ASGI)
     path('', include(router.urls), name='auth-user')
 ]
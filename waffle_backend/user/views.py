@@ -1,40 +1,89 @@
+import json
+
 from django.contrib.auth import authenticate, login, logout, get_user_model
 from django.db import IntegrityError
+from django.http import HttpResponseNotAllowed, JsonResponse
 from rest_framework import status, viewsets, permissions
 from rest_framework.views import APIView
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from user import hashing
 from user.serializers import UserSerializer, UserLoginSerializer, UserCreateSerializer
 
 User = get_user_model()
 
 
-class UserSignUpView(APIView):
-    permission_classes = (permissions.AllowAny, )
+def sign_up(data):
+    serializer = UserCreateSerializer(data=data)
+    if not serializer.is_valid():
+        return serializer.errors, status.HTTP_400_BAD_REQUEST
 
-    def post(self, request, *args, **kwargs):
+    try:
+        user, jwt_token = serializer.save()
+    except IntegrityError:
+        return '이미 존재하는 유저 이메일입니다.', status.HTTP_409_CONFLICT
+
+    return {'user': user.email, 'token': jwt_token}, status.HTTP_201_CREATED
 
-        serializer = UserCreateSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
 
-        try:
-            user, jwt_token = serializer.save()
-        except IntegrityError:
-            return Response(status=status.HTTP_409_CONFLICT, data='이미 존재하는 유저 이메일입니다.')
+def log_in(data):
+    serializer = UserLoginSerializer(data=data)
+    if not serializer.is_valid():
+        return serializer.errors, status.HTTP_400_BAD_REQUEST
+    token = serializer.validated_data['token']
 
-        return Response({'user': user.email, 'token': jwt_token}, status=status.HTTP_201_CREATED)
+    return {'success': True, 'token': token}, status.HTTP_200_OK
+
+
+class UserSignUpView(APIView):
+    permission_classes = (permissions.AllowAny, )
+
+    def post(self, request, *args, **kwargs):
+        data, code = sign_up(request.data)
+        return Response(data, status=code)
 
 
 class UserLoginView(APIView):
     permission_classes = (permissions.AllowAny, )
 
     def post(self, request):
+        data, code = log_in(request.data)
+        return Response(data, status=code)
+
+
+# 아래는 asgi.py 로 띄운 서버에서 쓰는 async 버전입니다. (/api/v1/async/signup/, /api/v1/async/login/)
+# 비밀번호 해시와 그에 딸린 DB 작업은 user.hashing 의 전용 스레드 풀에서 돌립니다.
+# DRF 의 APIView 는 async 를 지원하지 않으므로 Django 의 async 함수 뷰로 작성했습니다.
+
+async def async_password_view(request, handler):
+    if request.method != 'POST':
+        return HttpResponseNotAllowed(['POST'])
+    try:
+        data = json.loads(request.body) if request.content_type == 'application/json' else request.POST.dict()
+    except ValueError:
+        return JsonResponse({'detail': 'JSON parse error'}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        data, code = await hashing.run(handler, data)
+    except hashing.HashingPoolFull:
+        response = JsonResponse({'detail': '요청이 많습니다. 잠시 후 다시 시도해주세요.'},
+                                status=status.HTTP_503_SERVICE_UNAVAILABLE, json_dumps_params={'ensure_ascii': False})
+        response['Retry-After'] = '1'
+        return response
+    return JsonResponse(data, status=code, safe=False, json_dumps_params={'ensure_ascii': False})
+
+
+async def async_sign_up_view(request):
+    return await async_password_view(request, sign_up)
+
+
+async def async_login_view(request):
+    return await async_password_view(request, log_in)
 
-        serializer = UserLoginSerializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        token = serializer.validated_data['token']
 
-        return Response({'success': True, 'token': token}, status=status.HTTP_200_OK)
+# csrf_exempt 데코레이터는 Django 3.2 에서 async 뷰를 감싸지 못하므로 속성만 붙입니다. (APIView 와 같이 CSRF 검사 없음)
+async_sign_up_view.csrf_exempt = True
+async_login_view.csrf_exempt = True
 
 
 class UserViewSet(viewsets.GenericViewSet):
@@ -13,4 +13,15 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'waffle_backend.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# 앱을 불러오려면 get_asgi_application() 이 django.setup() 을 먼저 해야 합니다.
+from survey.events import SURVEY_EVENTS_PATH, survey_events_app  # noqa: E402
+
+
+async def application(scope, receive, send):
+    # 새 설문 이벤트 스트림은 연결을 오래 열어두므로, 요청마다 스레드를 쓰는 Django 를 거치지 않고 직접 처리합니다.
+    if scope['type'] == 'http' and scope['path'] == SURVEY_EVENTS_PATH:
+        await survey_events_app(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
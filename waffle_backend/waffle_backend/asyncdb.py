@@ -0,0 +1,29 @@
+import functools
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+# async 뷰에서 ORM 을 쓰기 위한 도구입니다. (Django 3.2 의 ORM 은 async 를 지원하지 않습니다)
+
+
+def closing_connections(func):
+    """Wrap `func` to do the DB connection cleanup Django does around a request, for use outside request threads."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return wrapper
+
+
+def database_sync_to_async(func):
+    """
+    sync_to_async for independent, short DB work called from async views.
+
+    sync_to_async's default (thread_sensitive=True) runs every call on one shared thread, which would let
+    only one request touch the DB at a time; these calls run on the event loop's thread pool instead,
+    each thread with its own connection.
+    """
+    return sync_to_async(closing_connections(func), thread_sensitive=False)
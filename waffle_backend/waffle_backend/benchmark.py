@@ -0,0 +1,112 @@
+import json
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import urlsplit
+
+# 실행 중인 서버 (runserver / gunicorn / uvicorn) 에 HTTP 요청을 보내는 부하 테스트 도구입니다.
+# 외부 패키지 없이 표준 라이브러리 스레드로 동시 요청을 만듭니다. 각 벤치마크 management command 가 사용합니다.
+
+
+class LoadResult:
+
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.elapsed = 0.0
+        self.lock = threading.Lock()
+
+    def add(self, latency, ok):
+        with self.lock:
+            self.latencies.append(latency)
+            self.errors += not ok
+
+    @property
+    def requests(self):
+        return len(self.latencies)
+
+    @property
+    def rate(self):
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, p):
+        if not self.latencies:
+            return 0.0
+        latencies = sorted(self.latencies)
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p / 100))]
+
+
+def request(url, data=None, headers=None, timeout=30):
+    """Send one request (POST with a JSON body if `data` is given); return the status code, 0 on connection errors."""
+    body = None if data is None else json.dumps(data).encode('utf-8')
+    req = urllib.request.Request(url, data=body, headers=dict(headers or {}))
+    if body is not None:
+        req.add_header('Content-Type', 'application/json')
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except (urllib.error.URLError, OSError):
+        return 0
+
+
+def start_load(url, concurrency, data=None, headers=None, ok=(200, )):
+    """Start `concurrency` threads sending requests to `url` until stop() is called on the returned object."""
+    result = LoadResult()
+    stop_event = threading.Event()
+
+    def worker():
+        while not stop_event.is_set():
+            started_at = time.perf_counter()
+            code = request(url, data, headers)
+            result.add(time.perf_counter() - started_at, code in ok)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    started_at = time.perf_counter()
+    for thread in threads:
+        thread.start()
+
+    def stop():
+        stop_event.set()
+        for thread in threads:
+            thread.join()
+        result.elapsed = time.perf_counter() - started_at
+        return result
+
+    result.stop = stop
+    return result
+
+
+def run_load(url, concurrency, duration, data=None, headers=None, ok=(200, )):
+    load = start_load(url, concurrency, data, headers, ok)
+    time.sleep(duration)
+    return load.stop()
+
+
+def open_slow_clients(url, count):
+    """
+    Open `count` connections that send an unfinished request to `url` and keep waiting, like clients on a bad network.
+
+    Returns a function closing them. Servers that give each connection a thread (or a sync worker) run out of them;
+    an event loop only keeps a socket per client.
+    """
+    parts = urlsplit(url)
+    sockets = []
+    for _ in range(count):
+        try:
+            sock = socket.create_connection((parts.hostname, parts.port or 80), timeout=10)
+            sock.sendall(f'GET {parts.path or "/"} HTTP/1.1\r\nHost: {parts.netloc}\r\n'.encode('ascii'))
+        except OSError:
+            break
+        sockets.append(sock)
+
+    def close():
+        for sock in sockets:
+            sock.close()
+        return len(sockets)
+
+    return close
@@ -0,0 +1,53 @@
+from django.db.backends.mysql import base as mysql
+
+from waffle_backend.db_pool.pool import ConnectionPool, PoolTimeout, get_pool
+
+# MySQL backend + 프로세스 단위 connection pool. (ENGINE = 'waffle_backend.db_pool')
+# Django 는 스레드마다 DatabaseWrapper 를 두고, 요청이 끝나면 (CONN_MAX_AGE 가 지나면) 연결을 닫습니다.
+# 이 backend 는 새 연결이 필요할 때 풀에서 꺼내고, 닫을 때 실제로 닫지 않고 풀에 돌려줍니다.
+# WSGI 의 요청 스레드든 ASGI 의 sync_to_async 스레드든 같은 풀을 씁니다.
+# 풀 설정은 DATABASES[alias]['POOL'] 에 있고, SIZE 가 0 이면 풀 없이 원래 MySQL backend 와 같게 동작합니다.
+# 풀은 alias 와 연결 설정으로 찾으므로, 설정이 바뀌면 (테스트의 override_settings 등) 새 풀을 만듭니다.
+POOL_KEY_SETTINGS = ('ENGINE', 'NAME', 'USER', 'PASSWORD', 'HOST', 'PORT', 'OPTIONS', 'POOL')
+
+
+class DatabaseWrapper(mysql.DatabaseWrapper):
+
+    @property
+    def pool(self):
+        options = self.settings_dict.get('POOL') or {}
+        if not options.get('SIZE'):
+            return None
+        key = repr([self.settings_dict.get(name) for name in POOL_KEY_SETTINGS])
+        return get_pool(self.alias, key, lambda: ConnectionPool(
+            ping=lambda connection: connection.ping(),
+            close=lambda connection: connection.close(),
+            max_size=options['SIZE'],
+            timeout=options.get('TIMEOUT', 10),
+            ping_after=options.get('PING_AFTER', 30),
+            max_lifetime=options.get('MAX_LIFETIME', 3600),
+        ))
+
+    def get_new_connection(self, conn_params):
+        # 연결은 꺼내 온 풀에 돌려줍니다. (그 사이에 설정이 바뀌었더라도)
+        self.connection_pool = self.pool
+        if self.connection_pool is None:
+            return super().get_new_connection(conn_params)
+        try:
+            return self.connection_pool.acquire(lambda: super(DatabaseWrapper, self).get_new_connection(conn_params))
+        except PoolTimeout as e:
+            raise mysql.Database.OperationalError(str(e))
+
+    def _close(self):
+        pool = getattr(self, 'connection_pool', None)
+        if pool is None or self.connection is None:
+            return super()._close()
+        # 에러가 났던 연결 (close_if_unusable_or_obsolete 가 쓸 수 없다고 판단한 연결) 은 버립니다.
+        reusable = not self.errors_occurred
+        if reusable and not self.autocommit:
+            # 트랜잭션 중에 닫히는 연결은 다음 사용자가 이어받지 않도록 rollback 합니다.
+            try:
+                self.connection.rollback()
+            except mysql.Database.Error:
+                reusable = False
+        pool.release(self.connection, reusable)
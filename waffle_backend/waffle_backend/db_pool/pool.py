@@ -0,0 +1,140 @@
+import threading
+import time
+from collections import Counter, deque
+
+# DB alias -> ConnectionPool. 이 모듈은 MySQLdb 를 import 하지 않으므로 다른 backend 를 쓸 때도 불러올 수 있습니다.
+pools = {}
+pools_lock = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+def get_pool(alias, key, create):
+    """
+    The pool of `alias`, made by `create()` the first time.
+
+    `key` describes the connection settings the pool was made with; when it changes (override_settings in tests,
+    reconfiguration), a new pool replaces the old one, which is retired.
+    """
+    with pools_lock:
+        current = pools.get(alias)
+        if current is not None and current.key == key:
+            return current
+        pool = create()
+        pool.key = key
+        pools[alias] = pool
+    if current is not None:
+        current.retire()
+    return pool
+
+
+class ConnectionPool:
+    """
+    A bounded pool of raw DB-API connections shared by every thread of the process.
+
+    At most `max_size` connections exist at once; acquire() waits up to `timeout` seconds for one to be released.
+    Idle connections are pinged before reuse once they have been idle for `ping_after` seconds,
+    and closed instead of reused once they are older than `max_lifetime` seconds.
+    """
+
+    def __init__(self, ping, close, max_size, timeout, ping_after, max_lifetime):
+        self.ping = ping
+        self.close = close
+        self.max_size = max_size
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self.max_lifetime = max_lifetime
+        self.slots = threading.BoundedSemaphore(max_size)
+        self.lock = threading.Lock()
+        # 가장 최근에 돌려받은 연결부터 씁니다. 오래 놀던 연결은 ping 없이 재사용될 일이 줄어듭니다.
+        self.idle = deque()
+        self.created_at = {}
+        self.stats = Counter()
+        self.key = None  # get_pool() 이 쓰는 연결 설정
+        self.retired = False
+
+    def acquire(self, connect):
+        if not self.slots.acquire(timeout=self.timeout):
+            with self.lock:
+                self.stats['timeouts'] += 1
+            raise PoolTimeout(f'No database connection became free within {self.timeout} seconds')
+        try:
+            return self.checkout(connect)
+        except BaseException:
+            self.slots.release()
+            raise
+
+    def checkout(self, connect):
+        while True:
+            with self.lock:
+                if not self.idle:
+                    break
+                connection, returned_at = self.idle.pop()
+            now = time.monotonic()
+            if now - self.created_at[id(connection)] > self.max_lifetime:
+                self.discard(connection)
+                continue
+            if now - returned_at > self.ping_after:
+                with self.lock:
+                    self.stats['pinged'] += 1
+                try:
+                    self.ping(connection)
+                except Exception:
+                    # 서버가 끊은 연결 (wait_timeout, 재시작 등)
+                    self.discard(connection)
+                    continue
+            with self.lock:
+                self.stats['reused'] += 1
+            return connection
+
+        connection = connect()
+        with self.lock:
+            self.created_at[id(connection)] = time.monotonic()
+            self.stats['created'] += 1
+        return connection
+
+    def release(self, connection, reusable=True):
+        try:
+            with self.lock:
+                # 설정이 바뀌어 물러난 풀의 연결은 예전 설정으로 맺은 것이므로 돌려받지 않고 닫습니다.
+                reusable = reusable and not self.retired
+                if reusable:
+                    self.idle.append((connection, time.monotonic()))
+            if not reusable:
+                self.discard(connection)
+        finally:
+            self.slots.release()
+
+    def retire(self):
+        """Stop reusing connections: close the idle ones now, and the ones in use when they are released."""
+        with self.lock:
+            self.retired = True
+            idle, self.idle = self.idle, deque()
+        for connection, _ in idle:
+            self.discard(connection)
+
+    def discard(self, connection):
+        with self.lock:
+            self.created_at.pop(id(connection), None)
+            self.stats['discarded'] += 1
+        try:
+            self.close(connection)
+        except Exception:
+            pass
+
+    def snapshot(self):
+        with self.lock:
+            idle = len(self.idle)
+            return {
+                'max_size': self.max_size,
+                'open': len(self.created_at),
+                'idle': idle,
+                'in_use': len(self.created_at) - idle,
+                'created': self.stats['created'],
+                'reused': self.stats['reused'],
+                'pinged': self.stats['pinged'],
+                'discarded': self.stats['discarded'],
+                'timeouts': self.stats['timeouts'],
+            }
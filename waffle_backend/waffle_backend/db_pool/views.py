@@ -0,0 +1,17 @@
+from django.db import connections
+from rest_framework import permissions
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from waffle_backend.db_pool.pool import pools
+
+
+class PoolStatsView(APIView):
+    # 이 프로세스의 connection pool 상태. (worker 프로세스마다 풀이 따로 있습니다)
+    permission_classes = (permissions.IsAdminUser, )
+
+    def get(self, request):
+        return Response({
+            alias: pools[alias].snapshot() if alias in pools else None
+            for alias in connections
+        })
@@ -0,0 +1,52 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # requirements.txt 에 있지만, 없으면 DRF 의 JSONRenderer 로 동작합니다.
+    orjson = None
+
+# orjson 과 JSONRenderer 가 같은 byte 를 내는 값의 타입
+PLAIN_TYPES = (str, int, bool, type(None))
+
+
+def is_plain(data):
+    """Whether `data` is made of str/int/bool/None values in lists, tuples and str-keyed dicts only."""
+    kind = type(data)
+    if kind is dict:
+        for key, value in data.items():
+            if type(key) is not str or (type(value) not in PLAIN_TYPES and not is_plain(value)):
+                return False
+        return True
+    if kind is list or kind is tuple:
+        for value in data:
+            if type(value) not in PLAIN_TYPES and not is_plain(value):
+                return False
+        return True
+    return kind in PLAIN_TYPES
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson when it is installed, producing the same bytes.
+
+    orjson formats floats differently (1e16 vs 1e+16), writes NaN/Infinity as null where JSONRenderer raises
+    (or writes NaN, without STRICT_JSON), and has its own datetime format; so only data made of strings, ints,
+    bools and None (what survey.fast_serializers produces) goes to orjson, and everything else, as well as
+    indented output (`?indent=` / browsable API requests), is left to JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.ensure_ascii or not self.compact or not is_plain(data):
+            # UNICODE_JSON / COMPACT_JSON 을 끈 설정의 출력도 JSONRenderer 에 맡깁니다.
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data)
+        except orjson.JSONEncodeError:
+            # 64 bit 를 넘는 정수 등
+            return super().render(data, accepted_media_type, renderer_context)
+        # JSONRenderer 처럼, JavaScript 에서 줄바꿈으로 해석되는 U+2028 / U+2029 를 escape 합니다.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
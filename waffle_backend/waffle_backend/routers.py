@@ -0,0 +1,103 @@
+import asyncio
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.urls import Resolver404, resolve
+from django.utils.decorators import sync_and_async_middleware
+
+from user import authentication
+
+# 읽기 요청을 replica 로 보내기 위한 router 와 middleware.
+# read_from_replica 로 표시한 뷰의 GET/HEAD 요청만 replica 에서 읽고, 나머지는 모두 default (primary) 를 씁니다.
+# 한 요청의 읽기는 모두 middleware 가 고른 replica 하나에서 합니다. replica 마다 복제 지연이 다르므로,
+# 쿼리마다 고르면 목록과 ETag (버전) 가 서로 다른 시점의 데이터가 될 수 있습니다.
+# replica 는 primary 보다 늦게 반영되므로, 쓰기 요청을 보낸 클라이언트는 REPLICA_STICKY_SECONDS 동안 primary 에서 읽습니다.
+# 쿠키를 쓰지 않는 API 클라이언트를 위해 인증된 유저로도 기억합니다. (Django 캐시에 저장하므로, 여러 프로세스에서
+# 같이 적용하려면 프로세스 사이에 공유되는 캐시 backend 가 필요합니다. LocMemCache 는 같은 프로세스 안에서만 적용됩니다)
+
+# 이 요청이 읽을 replica 의 alias. None 이면 primary 에서 읽습니다.
+use_replica = ContextVar('use_replica', default=None)
+STICKY_COOKIE = 'read_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def read_from_replica(view):
+    """Mark a view function or class as safe to serve its GET/HEAD requests from a read replica."""
+    view.read_from_replica = True
+    return view
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        alias = use_replica.get()
+        # primary 에서 트랜잭션 중이라면 방금 쓴 값을 읽어야 하므로 primary 에서 읽습니다.
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replica 는 primary 의 복사본이므로 어느 DB 에서 읽은 객체끼리든 관계를 맺을 수 있습니다.
+        return True
+
+
+def reads_from_replica(request):
+    if request.method not in ('GET', 'HEAD') or request.COOKIES.get(STICKY_COOKIE):
+        return False
+    try:
+        view = resolve(request.path_info).func
+    except Resolver404:
+        return False
+    # DRF 의 as_view() 는 class 를 .cls 로 들고 있습니다.
+    return getattr(getattr(view, 'cls', view), 'read_from_replica', False)
+
+
+def sticky_key(user_id):
+    return f'replica-sticky:{user_id}'
+
+
+def replica_for(request):
+    """The replica alias every read of `request` goes to, or None to read from the primary."""
+    if not settings.DATABASE_REPLICAS or not reads_from_replica(request):
+        return None
+    user_id = authentication.user_id_of(request)
+    if user_id is not None and cache.get(sticky_key(user_id)):
+        return None
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+def stick_to_primary(request, response):
+    if request.method not in SAFE_METHODS and response.status_code < 400:
+        response.set_cookie(STICKY_COOKIE, '1', max_age=settings.REPLICA_STICKY_SECONDS, httponly=True, samesite='Lax')
+        # DRF 가 인증한 유저만 봅니다. (AuthenticationMiddleware 의 lazy user 를 여기서 읽으면 세션을 조회합니다)
+        user = request.__dict__.get('user')
+        if isinstance(user, get_user_model()):
+            cache.set(sticky_key(user.pk), True, settings.REPLICA_STICKY_SECONDS)
+    return response
+
+
+@sync_and_async_middleware
+def replica_routing_middleware(get_response):
+    # async 뷰 (/api/v1/async/...) 가 이 middleware 때문에 스레드로 옮겨지지 않도록 sync/async 둘 다 지원합니다.
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = use_replica.set(replica_for(request))
+            try:
+                return stick_to_primary(request, await get_response(request))
+            finally:
+                use_replica.reset(token)
+    else:
+        def middleware(request):
+            token = use_replica.set(replica_for(request))
+            try:
+                return stick_to_primary(request, get_response(request))
+            finally:
+                use_replica.reset(token)
+    return middleware
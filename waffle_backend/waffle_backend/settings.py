@@ -48,6 +48,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'waffle_backend.routers.replica_routing_middleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -86,18 +87,64 @@ WSGI_APPLICATION = 'waffle_backend.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        # MySQL backend + connection pool (waffle_backend/db_pool)
+        'ENGINE': 'waffle_backend.db_pool',
         'HOST': 'localhost',
         'PORT': 3306,
         'NAME': 'waffle_backend_2',  # database name 변경
         'USER': 'waffle-backend',
         'PASSWORD': 'seminar',
+        # 한 스레드가 연결을 붙잡고 있는 시간 (초). 0 이면 요청이 끝날 때마다 풀에 돌려줍니다.
+        # 0 보다 크면 스레드 수만큼 연결이 필요하므로 DB_POOL_SIZE 를 worker 스레드 수 이상으로 잡아야 합니다.
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 0)),
+        'POOL': {
+            'SIZE': int(os.getenv('DB_POOL_SIZE', 10)),  # 프로세스당 최대 연결 수 (0 이면 풀 사용 안 함)
+            'TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 10)),  # 연결이 모두 사용 중일 때 기다리는 시간 (초)
+            'PING_AFTER': float(os.getenv('DB_POOL_PING_AFTER', 30)),  # 이보다 오래 놀던 연결은 ping 후 사용
+            'MAX_LIFETIME': float(os.getenv('DB_POOL_MAX_LIFETIME', 3600)),  # 이보다 오래된 연결은 닫고 새로 연결
+        },
     }
 }
 
+# 읽기 전용 replica. DB_REPLICA_HOSTS=host1,host2 (계정, DB 이름, 풀 설정은 default 와 같습니다)
+# 설문/OS 조회와 top_50 의 GET 요청만 replica 에서 읽습니다. (waffle_backend.routers)
+for index, host in enumerate(filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    DATABASES[f'replica{index}'] = dict(DATABASES['default'], HOST=host.strip(), TEST={'MIRROR': 'default'})
+
+# DATABASE_BACKEND=sqlite 이면 MySQL 없이 로컬에서 실행합니다. replica 자리에는 다른 SQLite 파일을 씁니다.
+# (replica 파일은 복제되지 않으므로 migrate --database replica1 로 따로 만들어야 합니다)
+if os.getenv('DATABASE_BACKEND') == 'sqlite':
+    DATABASES = {
+        'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'db.sqlite3'},
+        'replica1': {
+            'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'db_replica.sqlite3', 'TEST': {'MIRROR': 'default'},
+        },
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['waffle_backend.routers.ReplicaRouter']
+# 쓰기 요청을 보낸 클라이언트가 이 시간 (초) 동안은 primary 에서 읽습니다. (replica 복제 지연보다 길게)
+REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 5))
+
 # You should clarify which field type to use when auto-creating primary keys; Since Django 3.2
 DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+
+# 프로세스마다 따로 두는 메모리 캐시입니다. 다른 프로세스에서 바뀐 내용은 각 항목의 timeout 이 지나야 반영됩니다.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# survey.catalog 의 OS 목록 캐시 유지 시간 (초). 같은 프로세스에서의 변경은 signal 로 바로 지워집니다.
+OS_CATALOG_CACHE_TIMEOUT = 300
+
+# /api/v1/template 의 렌더링된 설문 목록 캐시 유지 시간 (초). 새 설문이 저장되면 key 가 바뀌어 바로 갱신됩니다.
+SURVEY_TOP_50_CACHE_TIMEOUT = 600
+
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
 
@@ -142,15 +189,43 @@ REST_FRAMEWORK = {
     ),
 
     'DEFAULT_RENDERER_CLASSES': (
-        'rest_framework.renderers.JSONRenderer',
+        'waffle_backend.renderers.FastJSONRenderer',  # orjson 을 쓰는 JSONRenderer
         'rest_framework.renderers.BrowsableAPIRenderer',
     ),
 
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_jwt.authentication.JSONWebTokenAuthentication',
+        'user.authentication.CachedJSONWebTokenAuthentication',
     ),
 }
 
+# 설문 목록 API 페이지 크기 (?page_size= 로 SURVEY_MAX_PAGE_SIZE 까지 조절 가능)
+SURVEY_PAGE_SIZE = int(os.getenv('SURVEY_PAGE_SIZE', 100))
+SURVEY_MAX_PAGE_SIZE = int(os.getenv('SURVEY_MAX_PAGE_SIZE', 1000))
+# POST /api/v1/survey/batch/ 한 번에 받을 수 있는 설문 수
+SURVEY_BATCH_MAX_SIZE = int(os.getenv('SURVEY_BATCH_MAX_SIZE', 5000))
+
+# 설문 제출 (POST /api/v1/survey/) 처리 방식
+# 'sync': 요청마다 바로 INSERT 후 201, 'queue': 로컬 큐 파일에 쌓고 202 (manage.py drain_survey_queue 가 DB 에 저장)
+SURVEY_INGESTION_MODE = os.getenv('SURVEY_INGESTION_MODE', 'sync')
+SURVEY_INGESTION_QUEUE_PATH = os.getenv('SURVEY_INGESTION_QUEUE_PATH', str(BASE_DIR / 'survey_queue.sqlite3'))
+
+# 설문 검색 (GET /api/v1/survey/search/) 에서 가장 드문 토큰의 posting 을 최대 몇 개까지 후보로 읽을지 (최신 설문부터)
+# 넘으면 더 오래된 설문은 찾지 않고, 응답의 truncated 가 true 가 됩니다.
+SURVEY_SEARCH_MAX_CANDIDATES = int(os.getenv('SURVEY_SEARCH_MAX_CANDIDATES', 1000))
+# 교차 집계 (GET /api/v1/survey/crosstab/) 의 메모리 스냅샷은 변경 기록에 나온 설문만 다시 읽고, 기록되지 않는 변경 (.update() 등) 을
+# 반영하도록 이 간격 (초) 마다 처음부터 다시 읽습니다.
+SURVEY_ANALYTICS_REBUILD_INTERVAL = int(os.getenv('SURVEY_ANALYTICS_REBUILD_INTERVAL', 600))
+# 변경 피드 (GET /api/v1/survey/changes/) 는 아직 커밋되지 않았을 수 있는 seq 의 빈 자리를 이 시간 (초) 동안 기다립니다.
+# 설문을 쓰는 가장 긴 트랜잭션 (import batch) 보다 길어야 합니다.
+SURVEY_CHANGES_SETTLE_SECONDS = int(os.getenv('SURVEY_CHANGES_SETTLE_SECONDS', 30))
+# 새 설문 이벤트 스트림 (GET /api/v1/async/survey/events/, ASGI 에서만) 이 SurveyChange 를 읽는 간격 (초)
+SURVEY_EVENTS_POLL_INTERVAL = float(os.getenv('SURVEY_EVENTS_POLL_INTERVAL', 0.5))
+# 연결마다 보내지 못하고 쌓아둘 수 있는 이벤트 수. 넘으면 연결을 끊고, 클라이언트는 Last-Event-ID 로 이어 받습니다.
+SURVEY_EVENTS_QUEUE_SIZE = int(os.getenv('SURVEY_EVENTS_QUEUE_SIZE', 100))
+# 새 설문이 없을 때 연결 유지를 위해 보내는 주석 줄의 간격 (초), 끊긴 클라이언트가 다시 연결하기까지 기다릴 시간 (ms)
+SURVEY_EVENTS_HEARTBEAT = float(os.getenv('SURVEY_EVENTS_HEARTBEAT', 15))
+SURVEY_EVENTS_RETRY_MS = int(os.getenv('SURVEY_EVENTS_RETRY_MS', 3000))
+
 # 밑은 인증 구현을 위한 기반
 
 # 아래는 JWT 모듈 설정입니다.
@@ -167,5 +242,22 @@ JWT_AUTH = {
     'JWT_REFRESH_EXPIRATION_DELTA': datetime.timedelta(days=3),  # JWT 토큰 갱신 유효기간
 }
 
+# 검증을 마친 토큰과 토큰의 유저를 프로세스 메모리에 캐시합니다. (user.authentication)
+JWT_VERIFIED_TOKEN_CACHE_SIZE = int(os.getenv('JWT_VERIFIED_TOKEN_CACHE_SIZE', 10000))
+JWT_USER_CACHE_SIZE = int(os.getenv('JWT_USER_CACHE_SIZE', 10000))
+# 다른 프로세스에서 바뀐 유저 정보가 반영되기까지 걸릴 수 있는 최대 시간 (초)
+JWT_USER_CACHE_TIMEOUT = int(os.getenv('JWT_USER_CACHE_TIMEOUT', 30))
+
+# async 로그인/회원가입 뷰의 비밀번호 해시 전용 스레드 수, 그리고 스레드가 모두 바쁠 때 기다릴 수 있는 요청 수 (user.hashing)
+PASSWORD_HASHING_WORKERS = int(os.getenv('PASSWORD_HASHING_WORKERS', 4))
+PASSWORD_HASHING_MAX_QUEUE = int(os.getenv('PASSWORD_HASHING_MAX_QUEUE', 256))
+
+# 로그인 시 last_login 기록 방식 (user.last_login)
+# 'sync': 로그인마다 UPDATE, 'coalesce': 메모리에 모아 LAST_LOGIN_FLUSH_INTERVAL 초마다 한 번에 UPDATE
+LAST_LOGIN_MODE = os.getenv('LAST_LOGIN_MODE', 'sync')
+LAST_LOGIN_FLUSH_INTERVAL = float(os.getenv('LAST_LOGIN_FLUSH_INTERVAL', 5))
+# coalesce 모드에서 last_login 이 이 시간 (초) 이내면 다시 기록하지 않습니다.
+LAST_LOGIN_MIN_INTERVAL = int(os.getenv('LAST_LOGIN_MIN_INTERVAL', 60))
+
 # Custom User Model
 AUTH_USER_MODEL = 'user.User'
\ No newline at end of file
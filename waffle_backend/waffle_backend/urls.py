@@ -17,11 +17,13 @@ from django.conf.urls import url
 from django.contrib import admin
 from django.urls import include, path
 from . import settings
+from .db_pool.views import PoolStatsView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/v1/', include('survey.urls')),
     path('api/v1/', include('user.urls')),
+    path('api/v1/db-pool/', PoolStatsView.as_view(), name='db-pool'),  # staff 전용
 ]
 
 if settings.DEBUG_TOOLBAR: